@@ -0,0 +1,59 @@
+"""Compare the indexing throughput of ElasticsearchBackend write modes.
+
+Usage::
+
+    ELASTICSEARCH_URL=http://localhost:9200 python -m benchmarks.elastic_bulk
+
+The benchmark writes to the regular ``task-logs-*`` indices and deletes them
+afterward, do not point it to a cluster holding real logs.  Start
+``python -m benchmarks.elastic_standin`` to run it without a cluster.
+"""
+
+import argparse
+import os
+import time
+from typing import Any
+
+from task_logs.backends.elastic import INDEX_PREFIX, ElasticsearchBackend
+
+from .utils import make_job
+
+
+def run(backend: ElasticsearchBackend, count: int) -> float:
+    job = make_job()
+    start = time.perf_counter()
+    for i in range(count):
+        job_id = "job-%d" % i
+        backend.write_enqueued(job_id=job_id, task_id="benchmark", job=job)
+        backend.write_dequeued(job_id=job_id, task_id="benchmark")
+        backend.write_completed(job_id=job_id, task_id="benchmark", result="done")
+    backend.flush()
+    elapsed = time.perf_counter() - start
+    return count * 3 / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--url", default=os.getenv("ELASTICSEARCH_URL", "http://localhost:9200")
+    )
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--bulk-max-docs", type=int, default=500)
+    args = parser.parse_args()
+
+    modes: Any = {
+        "per-document": {},
+        "bulk": {"bulk": True, "bulk_max_docs": args.bulk_max_docs},
+    }
+    for name, options in modes.items():
+        backend = ElasticsearchBackend([args.url], **options)
+        try:
+            docs_per_sec = run(backend, args.jobs)
+        finally:
+            backend.close()
+            backend.es.indices.delete(INDEX_PREFIX + "*")
+        print("{:<14} {:>10.0f} docs/sec".format(name, docs_per_sec))
+
+
+if __name__ == "__main__":
+    main()
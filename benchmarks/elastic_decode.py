@@ -0,0 +1,97 @@
+"""Measure the cost per hit of decoding Elasticsearch search responses.
+
+Usage::
+
+    python -m benchmarks.elastic_decode --hits 1000
+
+``strptime`` is the previous decoder, parsing timestamps with
+``datetime.strptime`` and building each log from keyword arguments.
+``decode_logs`` is the decoder used by the backends.  Each run decodes the
+JSON of the response first, its cost is subtracted.
+"""
+
+import argparse
+import functools
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from task_logs.backends.backend import (
+    LOG_TYPE_FACTORIES,
+    CompletedLog,
+    DequeuedLog,
+    EnqueuedLog,
+    JobDetails,
+    Log,
+    LogType,
+)
+from task_logs.backends.elastic import ElasticsearchBackend
+from task_logs.backends.serializer import dumps, encode_log, loads
+
+from .utils import make_job
+
+
+def make_response(count: int, payload_size: int) -> Dict[str, Any]:
+    job = make_job(payload_size)
+    start = datetime(2000, 1, 1, microsecond=123456)
+    logs: List[Log] = []
+    for i in range(0, count, 3):
+        timestamp = start + timedelta(seconds=i)
+        job_id = "job-%d" % i
+        logs += [
+            EnqueuedLog(LogType.ENQUEUED, timestamp, job_id, "benchmark", job),
+            DequeuedLog(LogType.DEQUEUED, timestamp, job_id, "benchmark"),
+            CompletedLog(LogType.COMPLETED, timestamp, job_id, "benchmark", "done"),
+        ]
+    hits = [{"_source": loads(encode_log(log))} for log in logs[:count]]
+    return {"hits": {"hits": hits}}
+
+
+def decode_with_strptime(response: Dict[str, Any]) -> List[Log]:
+    logs = []
+    for hit in response["hits"].get("hits", []):
+        data = hit["_source"]
+        data["timestamp"] = datetime.strptime(
+            data["timestamp"][:19], "%Y-%m-%dT%H:%M:%S"
+        )
+        job = data.get("job")
+        if job:
+            if job.get("execute_at"):
+                job["execute_at"] = datetime.strptime(
+                    job["execute_at"], "%Y-%m-%dT%H:%M:%S"
+                )
+            data["job"] = JobDetails(**job)
+        logs.append(LOG_TYPE_FACTORIES[data["type"]](**data))
+    return logs
+
+
+def decode_raw(decode: Callable[[Dict[str, Any]], List[Log]], raw: bytes) -> None:
+    decode(loads(raw))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hits", type=int, default=1000)
+    parser.add_argument("--payload-size", type=int, default=10)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    decoders = {
+        "strptime": decode_with_strptime,
+        "decode_logs": ElasticsearchBackend._load_response,
+    }
+    raw = dumps(make_response(args.hits, args.payload_size))
+    parsing = _best(functools.partial(loads, raw), args.number)
+    print("{:<12} {:>8} {:>14}".format("decoder", "hits", "us/hit"))
+    for name, decode in decoders.items():
+        elapsed = _best(functools.partial(decode_raw, decode, raw), args.number)
+        per_hit = (elapsed - parsing) / args.hits
+        print("{:<12} {:>8} {:>14.2f}".format(name, args.hits, per_hit * 1e6))
+
+
+def _best(function: Callable[[], Any], number: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=5)) / number
+
+
+if __name__ == "__main__":
+    main()
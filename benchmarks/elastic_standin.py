@@ -0,0 +1,454 @@
+"""A local stand-in for the Elasticsearch API used by ElasticsearchBackend.
+
+Usage::
+
+    python -m benchmarks.elastic_standin --port 9200
+
+It answers the requests of the backend over HTTP, so the client,
+serialization and decoding costs can be measured offline.  Documents are kept
+in memory, sorted by timestamp, with ``job_id`` and ``type`` lookups.  Only
+the queries sent by the readers are supported: ``term``, ``terms``,
+``match_all``, ``query_string`` (a case insensitive substring match of the
+source) and ``range`` on ``timestamp``.  Update scripts and aggregations are
+acknowledged but not run, and every response is immediately searchable.
+Timings against the stand-in are not those of a cluster.
+"""
+
+import argparse
+import bisect
+import fnmatch
+import heapq
+import itertools
+import operator
+import re
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, cast
+from urllib.parse import urlsplit
+
+from task_logs.backends.serializer import dumps, loads
+
+VERSION = "7.17.0"
+
+EPOCH = datetime(1970, 1, 1)
+
+# (-timestamp in milliseconds, -sequence), so ascending keys are newest first.
+_Key = Tuple[int, int]
+
+# Searches over a point in time also sort on an ascending, positive
+# ``_shard_doc``, the -sequence of the key shifted by this offset.
+SHARD_DOC_OFFSET = 1 << 62
+
+
+class _Document:
+    __slots__ = ("key", "id", "source", "raw")
+
+    def __init__(self, key: _Key, id: str, source: Dict[str, Any], raw: bytes) -> None:
+        self.key = key
+        self.id = id
+        self.source = source
+        self.raw = raw
+
+
+class _Postings:
+    """Documents sorted by key, sorted lazily after appends."""
+
+    def __init__(self) -> None:
+        self.keys: List[_Key] = []
+        self.documents: List[_Document] = []
+        self._sorted = True
+
+    def append(self, document: _Document) -> None:
+        if self.keys and document.key < self.keys[-1]:
+            self._sorted = False
+        self.keys.append(document.key)
+        self.documents.append(document)
+
+    def after(self, key: Optional[_Key]) -> Iterator[_Document]:
+        if not self._sorted:
+            self.documents.sort(key=lambda document: document.key)
+            self.keys = [document.key for document in self.documents]
+            self._sorted = True
+        start = 0 if key is None else bisect.bisect_right(self.keys, key)
+        return itertools.islice(self.documents, start, None)
+
+
+class _Index:
+    def __init__(self) -> None:
+        self.all = _Postings()
+        self.by_field: Dict[Tuple[str, str], _Postings] = {}
+        self.by_id: Dict[str, _Document] = {}
+
+    def add(self, document: _Document) -> None:
+        previous = self.by_id.get(document.id)
+        if previous is not None:
+            # Replaced in place, its position doesn't matter to the readers
+            # of documents with an id.
+            previous.source = document.source
+            previous.raw = document.raw
+            return
+        self.by_id[document.id] = document
+        self.all.append(document)
+        for field in ("job_id", "type"):
+            value = document.source.get(field)
+            if value is not None:
+                postings = self.by_field.setdefault((field, value), _Postings())
+                postings.append(document)
+
+    def postings(self, query: Dict[str, Any]) -> _Postings:
+        term = query.get("term")
+        if term:
+            ((field, value),) = term.items()
+            if isinstance(value, dict):
+                value = value["value"]
+            if field in ("job_id", "type"):
+                return self.by_field.get((field, value), _Postings())
+        return self.all
+
+
+class Store:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.indices: Dict[str, _Index] = {}
+        self.templates: Dict[str, Any] = {}
+        self.pits: Dict[str, List[str]] = {}
+        self._sequence = itertools.count()
+
+    def index(self, name: str, id: Optional[str], source: Dict[str, Any]) -> str:
+        sequence = next(self._sequence)
+        timestamp = source.get("timestamp")
+        millis = 0 if timestamp is None else _millis(timestamp)
+        id = id or "doc-%d" % sequence
+        document = _Document((-millis, -sequence), id, source, dumps(source))
+        self.indices.setdefault(name, _Index()).add(document)
+        return id
+
+    def resolve(self, patterns: str) -> List[str]:
+        names = []
+        for pattern in patterns.split(","):
+            names.extend(fnmatch.filter(self.indices, pattern))
+        return sorted(set(names))
+
+
+def _millis(timestamp: str) -> int:
+    value = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // _MILLISECOND
+
+
+_MILLISECOND = datetime(1970, 1, 1, 0, 0, 0, 1000) - EPOCH
+
+
+_COMPARISONS = {
+    "gte": operator.ge,
+    "gt": operator.gt,
+    "lte": operator.le,
+    "lt": operator.lt,
+}
+
+
+def _range_matcher(bounds: Dict[str, str]) -> Callable[[int], bool]:
+    limits = [(_COMPARISONS[name], _millis(value)) for name, value in bounds.items()]
+    return lambda millis: all(compare(millis, limit) for compare, limit in limits)
+
+
+def _matcher(query: Dict[str, Any]) -> Callable[[_Document], bool]:
+    """Compile the parts of a query the postings didn't select."""
+    (kind, value), *_ = query.items()
+    if kind == "match_all":
+        return lambda document: True
+    if kind == "term":
+        ((field, term),) = value.items()
+        if isinstance(term, dict):
+            term = term["value"]
+        return lambda document: document.source.get(field) == term
+    if kind == "terms":
+        ((field, terms),) = value.items()
+        terms = set(terms)
+        return lambda document: document.source.get(field) in terms
+    if kind == "query_string":
+        pattern = re.compile(re.escape(value["query"].strip('"')).encode(), re.I)
+        return lambda document: pattern.search(document.raw) is not None
+    if kind == "range":
+        ((field, bounds),) = value.items()
+        if field != "timestamp":
+            raise ValueError("Unsupported range field: %r" % field)
+        in_range = _range_matcher(bounds)
+        return lambda document: in_range(-document.key[0])
+    if kind == "bool":
+        clauses = [
+            _matcher(clause)
+            for occur in ("must", "filter")
+            for clause in _as_list(value.get(occur))
+        ]
+        return lambda document: all(clause(document) for clause in clauses)
+    raise ValueError("Unsupported query: %r" % kind)
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _selective_query(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the clause whose postings a query should be read from."""
+    if "bool" in query:
+        for clause in _as_list(query["bool"].get("must")):
+            if "term" in clause:
+                return cast(Dict[str, Any], clause)
+    return query
+
+
+def _search(store: Store, indices: List[str], body: Dict[str, Any]) -> bytes:
+    query = body.get("query", {"match_all": {}})
+    size = body.get("size", 10)
+    search_after = body.get("search_after")
+    after: Optional[_Key] = None
+    if search_after is not None:
+        if len(search_after) > 1:
+            after = (-search_after[0], search_after[1] - SHARD_DOC_OFFSET)
+        else:
+            after = (-search_after[0], 1)
+
+    matches = _matcher(query)
+    selective = _selective_query(query)
+    hits: List[_Document] = []
+    with store.lock:
+        streams = [
+            store.indices[name].postings(selective).after(after)
+            for name in indices
+            if name in store.indices
+        ]
+        # The streams are sorted, merge them until a page is filled.
+        for document in _merge(streams):
+            if len(hits) >= size:
+                break
+            if matches(document):
+                hits.append(document)
+
+    if "pit" in body:
+        sorts = [
+            b"%d,%d" % (-document.key[0], document.key[1] + SHARD_DOC_OFFSET)
+            for document in hits
+        ]
+    else:
+        sorts = [b"%d" % -document.key[0] for document in hits]
+    parts = [
+        b'{"_id":%s,"_source":%s,"sort":[%s]}'
+        % (dumps(document.id), document.raw, sort)
+        for document, sort in zip(hits, sorts)
+    ]
+    response = b'{"took":0,"timed_out":false,"hits":{"total":{"value":%d,' % len(hits)
+    response += b'"relation":"gte"},"hits":[%s]}' % b",".join(parts)
+    if "pit" in body:
+        response += b',"pit_id":%s' % dumps(body["pit"]["id"])
+    return response + b"}"
+
+
+def _merge(streams: List[Iterator[_Document]]) -> Iterator[_Document]:
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=lambda document: document.key)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StandInServer"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_HEAD(self) -> None:
+        self._dispatch("HEAD")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_PUT(self) -> None:
+        self._dispatch("PUT")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path = urlsplit(self.path).path.strip("/")
+        parts = path.split("/") if path else []
+        try:
+            status, response = self.server.route(method, parts, body)
+        except Exception as error:
+            status = 400
+            response = dumps(
+                {"error": {"type": "stand_in_exception", "reason": str(error)}}
+            )
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        if method != "HEAD":
+            self.wfile.write(response)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.store = Store()
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return "http://%s:%d" % (str(host), port)
+
+    def route(self, method: str, parts: List[str], body: bytes) -> Tuple[int, bytes]:
+        store = self.store
+        if not parts:
+            return 200, dumps(
+                {
+                    "name": "stand-in",
+                    "cluster_name": "stand-in",
+                    "version": {"number": VERSION, "build_flavor": "default"},
+                    "tagline": "You Know, for Search",
+                }
+            )
+
+        if parts[0] == "_template":
+            name = parts[1]
+            with store.lock:
+                if method == "PUT":
+                    store.templates[name] = loads(body)
+                    return 200, b'{"acknowledged":true}'
+                if name not in store.templates:
+                    return 404, b"{}"
+                return 200, dumps({name: store.templates[name]})
+
+        if parts[0] == "_bulk":
+            return 200, self._bulk(body)
+
+        if parts[0] == "_pit":
+            with store.lock:
+                store.pits.pop(loads(body)["id"], None)
+            return 200, b'{"succeeded":true,"num_freed":1}'
+
+        if parts[0] == "_search":
+            body_data = loads(body) if body else {}
+            with store.lock:
+                indices = store.pits[body_data["pit"]["id"]]
+            return 200, _search(store, indices, body_data)
+
+        if parts[0] == "_cluster":
+            return 200, b'{"status":"green"}'
+
+        return self._route_index(method, parts[0], parts[1:], body)
+
+    def _route_index(
+        self, method: str, index: str, parts: List[str], body: bytes
+    ) -> Tuple[int, bytes]:
+        store = self.store
+        action = parts[0] if parts else None
+        if action is None:
+            if method == "DELETE":
+                with store.lock:
+                    for name in store.resolve(index):
+                        del store.indices[name]
+                return 200, b'{"acknowledged":true}'
+            return 200, b"{}"
+        if action == "_doc" and method in ("POST", "PUT"):
+            id = parts[1] if len(parts) > 1 else None
+            with store.lock:
+                id = store.index(index, id, loads(body))
+            return 201, dumps({"_index": index, "_id": id, "result": "created"})
+        if action == "_doc":
+            with store.lock:
+                target = store.indices.get(index, _Index())
+                document = target.by_id.get(parts[1])
+            if document is None:
+                return 404, dumps({"_index": index, "_id": parts[1], "found": False})
+            return 200, b'{"_index":%s,"_id":%s,"found":true,"_source":%s}' % (
+                dumps(index),
+                dumps(document.id),
+                document.raw,
+            )
+        if action == "_update":
+            return 200, dumps({"_index": index, "_id": parts[1], "result": "noop"})
+        if action == "_pit":
+            with store.lock:
+                pit_id = "pit-%d" % next(store._sequence)
+                store.pits[pit_id] = store.resolve(index)
+            return 200, dumps({"id": pit_id})
+        if action == "_search":
+            body_data = loads(body) if body else {}
+            with store.lock:
+                indices = store.resolve(index)
+            return 200, _search(store, indices, body_data)
+        if action in ("_mapping", "_refresh", "_forcemerge"):
+            return 200, b'{"acknowledged":true}'
+        raise ValueError("Unsupported request: %s /%s/%s" % (method, index, action))
+
+    def _bulk(self, body: bytes) -> bytes:
+        lines = body.splitlines()
+        items = []
+        with self.store.lock:
+            # Every action sent by the backends is followed by a source.
+            for i in range(0, len(lines), 2):
+                ((action, meta),) = loads(lines[i]).items()
+                if action in ("index", "create"):
+                    id = self.store.index(
+                        meta["_index"], meta.get("_id"), loads(lines[i + 1])
+                    )
+                    items.append({action: {"_id": id, "status": 201}})
+                else:
+                    items.append({action: {"_id": meta.get("_id"), "status": 200}})
+        return dumps({"took": 0, "errors": False, "items": items})
+
+
+class ElasticsearchStandIn:
+    """Serve a StandInServer from a thread, as a context manager."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.server = StandInServer(host, port)
+        self.url = self.server.url
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="elastic-standin", daemon=True
+        )
+
+    def __enter__(self) -> "ElasticsearchStandIn":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.server.shutdown()
+        self._thread.join()
+        self.server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port)
+    print("Serving on %s" % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Measure the memory and allocations needed to hold logs in memory.
+
+Usage::
+
+    python -m benchmarks.log_memory --count 1000000
+
+The slotted log classes are compared with the same dataclasses declared
+without ``__slots__``, which is how they were defined before.
+"""
+
+import argparse
+import dataclasses
+import gc
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, List, Tuple
+
+from task_logs.backends.backend import DequeuedLog, EnqueuedLog, JobDetails, LogType
+
+
+@dataclasses.dataclass
+class DictJobDetails:
+    queue: str
+    task_path: Any
+    execute_at: Any
+    args: Any
+    kwargs: Any
+    options: Any
+
+
+@dataclasses.dataclass
+class DictLog:
+    type: LogType
+    timestamp: datetime
+    job_id: str
+    task_id: str
+
+
+@dataclasses.dataclass
+class DictEnqueuedLog(DictLog):
+    job: DictJobDetails
+
+
+def build(count: int, log_class: Any, enqueued_class: Any, job_class: Any) -> List[Any]:
+    now = datetime.now()
+    logs: List[Any] = []
+    for i in range(count):
+        job_id = str(i)
+        if i % 4 == 0:
+            job = job_class(
+                queue="benchmark",
+                task_path="benchmarks.task",
+                execute_at=None,
+                args=[],
+                kwargs={},
+                options={},
+            )
+            logs.append(
+                enqueued_class(
+                    type=LogType.ENQUEUED,
+                    timestamp=now,
+                    job_id=job_id,
+                    task_id="task",
+                    job=job,
+                )
+            )
+        else:
+            logs.append(
+                log_class(
+                    type=LogType.DEQUEUED, timestamp=now, job_id=job_id, task_id="task"
+                )
+            )
+    return logs
+
+
+def measure(factory: Callable[[], List[Any]]) -> Tuple[float, int, int]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    logs = factory()
+    elapsed = time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    del logs
+    return elapsed, size, blocks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000000)
+    args = parser.parse_args()
+
+    variants = {
+        "dataclass": lambda: build(
+            args.count, DictLog, DictEnqueuedLog, DictJobDetails
+        ),
+        "slots": lambda: build(args.count, DequeuedLog, EnqueuedLog, JobDetails),
+    }
+    print(
+        "{:<10} {:>10} {:>12} {:>14}".format("variant", "seconds", "MiB", "allocations")
+    )
+    for name, factory in variants.items():
+        elapsed, size, blocks = measure(factory)
+        print(
+            "{:<10} {:>10.2f} {:>12.1f} {:>14,}".format(
+                name, elapsed, size / 2**20, blocks
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
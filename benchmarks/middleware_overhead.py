@@ -0,0 +1,70 @@
+"""Measure the overhead of TaskLogsMiddleware per message.
+
+Usage::
+
+    python -m benchmarks.middleware_overhead --messages 100000
+
+The middleware hooks called for a successful job are invoked directly, with
+a backend dropping every log, so only the middleware itself is measured.
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+import dramatiq
+from dramatiq import Message
+from dramatiq.brokers.stub import StubBroker
+
+from task_logs.backends.backend import Log, WriterBackend
+from task_logs.dramatiq import TaskLogsMiddleware
+from task_logs.sampling import LogPolicy
+
+
+class NullBackend(WriterBackend):
+    def write(self, log: Log) -> None:
+        pass
+
+
+def run(
+    broker: StubBroker, middleware: TaskLogsMiddleware, messages: List[Message]
+) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        middleware.before_enqueue(broker, message, 0)
+        middleware.after_enqueue(broker, message, 0)
+        middleware.before_process_message(broker, message)
+        middleware.after_process_message(broker, message, result=None)
+    return (time.perf_counter() - start) / len(messages)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+
+    middleware = TaskLogsMiddleware(NullBackend())
+    broker = StubBroker(middleware=[middleware])
+
+    actors: Dict[str, Any] = {
+        "default": dramatiq.actor(lambda: None, actor_name="default", broker=broker),
+        "disabled": dramatiq.actor(
+            lambda: None, actor_name="disabled", broker=broker, log=False
+        ),
+        "sampled": dramatiq.actor(
+            lambda: None,
+            actor_name="sampled",
+            broker=broker,
+            log=LogPolicy(sample_rate=0.5),
+        ),
+    }
+
+    print("{:<10} {:>12}".format("actor", "us/message"))
+    for name, actor in actors.items():
+        messages = [actor.message() for _ in range(args.messages)]
+        per_message = run(broker, middleware, messages)
+        print("{:<10} {:>12.2f}".format(name, per_message * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compare log serialization through ``dataclasses.asdict`` and ``encode_log``.
+
+Usage::
+
+    python -m benchmarks.serialization
+"""
+
+import argparse
+import dataclasses
+import functools
+import timeit
+from datetime import datetime
+from typing import Dict
+
+from task_logs.backends.backend import CompletedLog, EnqueuedLog, Log, LogType
+from task_logs.backends.elastic import JSONSerializerWithError
+from task_logs.backends.serializer import encode_log, orjson
+
+from .utils import make_job, make_payload
+
+
+def make_logs(payload_size: int) -> Dict[str, Log]:
+    return {
+        "enqueued": EnqueuedLog(
+            type=LogType.ENQUEUED,
+            timestamp=datetime.now(),
+            job_id="job",
+            task_id="benchmark",
+            job=make_job(payload_size),
+        ),
+        "completed": CompletedLog(
+            type=LogType.COMPLETED,
+            timestamp=datetime.now(),
+            job_id="job",
+            task_id="benchmark",
+            result=make_payload(payload_size),
+        ),
+    }
+
+
+def encode_with_asdict(serializer: JSONSerializerWithError, log: Log) -> str:
+    return serializer.dumps(dataclasses.asdict(log))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    serializer = JSONSerializerWithError()
+    print("orjson installed: %s" % (orjson is not None))
+    print("{:<10} {:>8} {:>16} {:>16}".format("log", "items", "asdict", "encode_log"))
+    for payload_size in (10, 100, 1000):
+        for name, log in make_logs(payload_size).items():
+            baseline = timeit.timeit(
+                functools.partial(encode_with_asdict, serializer, log),
+                number=args.number,
+            )
+            fast = timeit.timeit(functools.partial(encode_log, log), number=args.number)
+            print(
+                "{:<10} {:>8} {:>13.1f} us {:>13.1f} us".format(
+                    name,
+                    payload_size,
+                    baseline / args.number * 1e6,
+                    fast / args.number * 1e6,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measure the write and read throughput of SQLiteBackend.
+
+Usage::
+
+    python -m benchmarks.sqlite_throughput --jobs 20000
+
+Writes are timed until the writer thread has committed every log.  Reads
+look up single jobs, which go through the ``job_id`` index.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from task_logs.backends import SQLiteBackend
+
+from .utils import make_job
+
+
+def write(backend: SQLiteBackend, count: int) -> float:
+    job = make_job()
+    start = time.perf_counter()
+    for i in range(count):
+        job_id = "job-%d" % i
+        backend.write_enqueued(job_id=job_id, task_id="benchmark", job=job)
+        backend.write_dequeued(job_id=job_id, task_id="benchmark")
+        backend.write_completed(job_id=job_id, task_id="benchmark", result="done")
+    backend.flush()
+    return count * 3 / (time.perf_counter() - start)
+
+
+def find_jobs(backend: SQLiteBackend, count: int, lookups: int) -> float:
+    job_ids = ["job-%d" % random.randrange(count) for _ in range(lookups)]
+    start = time.perf_counter()
+    for job_id in job_ids:
+        backend.find_job(job_id)
+    return lookups / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(
+        "{:<12} {:>10} {:>16} {:>16}".format(
+            "batch size", "logs", "logs/sec", "jobs/sec"
+        )
+    )
+    for batch_size in (1, 100, 500):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = SQLiteBackend(
+                os.path.join(directory, "task_logs.db"), batch_size=batch_size
+            )
+            try:
+                logs_per_sec = write(backend, args.jobs)
+                jobs_per_sec = find_jobs(backend, args.jobs, args.lookups)
+            finally:
+                backend.close()
+        print(
+            "{:<12} {:>10} {:>16.0f} {:>16.0f}".format(
+                batch_size, args.jobs * 3, logs_per_sec, jobs_per_sec
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
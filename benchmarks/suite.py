@@ -0,0 +1,457 @@
+"""Run the benchmark suite and save its results as JSON.
+
+Usage::
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --sizes 10000 --compare results.json
+
+Three groups of benchmarks are run, select them with ``--only``:
+
+``middleware``
+    Time a StubBroker worker processing no-op messages with and without
+    TaskLogsMiddleware, the difference is the overhead per message.
+``write``
+    Write the logs of ``--jobs`` jobs to each WriterBackend, timing every
+    write call.  The throughput includes the final ``flush()``.
+``read``
+    Load ``--sizes`` events in each ReaderBackend, then time ``find_job()``
+    of random jobs, ``find_jobs()`` of ``FIND_JOBS_COUNT`` random jobs,
+    ``logs_by_type()`` of the exceptions and a ``search()`` matching them,
+    about 1% of the events.
+
+Elasticsearch backends run against the local stand-in of
+``benchmarks.elastic_standin`` unless ``--elasticsearch-url`` is given,
+their timings then only cover the client side.  With ``--compare``, the
+median of each result is compared to the baseline file and the command
+fails when one is more than ``--tolerance`` slower.
+
+The suite deletes the ``task-logs-*`` indices it writes, do not point it to
+a cluster holding real logs.
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import dramatiq
+from dramatiq import Worker
+from dramatiq.brokers.stub import StubBroker
+
+import task_logs
+from task_logs.backends import (
+    AsyncWriterBackend,
+    ElasticsearchBackend,
+    LogShipper,
+    MemoryBackend,
+    ShippingBackend,
+    SQLiteBackend,
+    StubBackend,
+)
+from task_logs.backends.backend import (
+    CompletedLog,
+    DequeuedLog,
+    EnqueuedLog,
+    ExceptionLog,
+    Log,
+    LogType,
+    WriterBackend,
+    compute_percentiles,
+)
+from task_logs.backends.elastic import INDEX_PREFIX, JOB_STATES_INDEX
+from task_logs.dramatiq import TaskLogsMiddleware
+
+from .elastic_standin import ElasticsearchStandIn
+from .middleware_overhead import NullBackend
+from .utils import make_job
+
+# Version of the results format.
+RESULTS_VERSION = 1
+
+PERCENTILES = (50, 90, 99)
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+# One job out of EXCEPTION_RATE fails, its last log is an exception.
+EXCEPTION_RATE = 100
+
+# Jobs fetched by each find_jobs() call, a page of a job dashboard.
+FIND_JOBS_COUNT = 200
+
+
+class Results:
+    def __init__(self) -> None:
+        self.results: List[Dict[str, Any]] = []
+
+    def add(
+        self,
+        name: str,
+        timings: Sequence[float],
+        *,
+        unit: str = "us",
+        scale: float = 1e6,
+        **extra: Any,
+    ) -> Dict[str, Any]:
+        """Summarize timings, in seconds, as a result in ``unit``."""
+        percentiles = compute_percentiles([t * scale for t in timings], PERCENTILES)
+        result: Dict[str, Any] = {
+            "name": name,
+            "unit": unit,
+            "samples": len(timings),
+            "mean": statistics.mean(timings) * scale,
+            "min": min(timings) * scale,
+            "max": max(timings) * scale,
+        }
+        for percentile, value in percentiles.items():
+            result["p%d" % percentile] = value
+        result.update(extra)
+        self.results.append(result)
+        print(
+            "{:<40} {:>12.2f} {:>12.2f} {:>12.2f} {:>4}".format(
+                name, result["p50"], result["p90"], result["p99"], unit
+            )
+        )
+        return result
+
+
+# Middleware overhead.
+
+
+def _worker_run(middleware: List[Any], messages: int) -> float:
+    broker = StubBroker(middleware=middleware)
+    broker.emit_after("process_boot")
+    actor = dramatiq.actor(lambda: None, actor_name="benchmark", broker=broker)
+    worker = Worker(broker, worker_timeout=100, worker_threads=1)
+    worker.start()
+    try:
+        start = time.perf_counter()
+        for _ in range(messages):
+            actor.send()
+        broker.join(actor.queue_name)
+        worker.join()
+        return (time.perf_counter() - start) / messages
+    finally:
+        worker.stop()
+        broker.close()
+
+
+def bench_middleware(results: Results, args: argparse.Namespace) -> None:
+    factories: Dict[str, Callable[[], WriterBackend]] = {
+        "null": NullBackend,
+        "memory": MemoryBackend,
+    }
+    baseline: List[float] = []
+    timings: Dict[str, List[float]] = {name: [] for name in factories}
+    # Alternate the runs so they are equally affected by noise.
+    for _ in range(args.rounds):
+        baseline.append(_worker_run([], args.messages))
+        for name, factory in factories.items():
+            middleware = TaskLogsMiddleware(factory())
+            timings[name].append(_worker_run([middleware], args.messages))
+
+    results.add("middleware/baseline", baseline, messages=args.messages)
+    median = statistics.median(baseline)
+    for name, values in timings.items():
+        overheads = [value - median for value in values]
+        results.add("middleware/overhead/%s" % name, overheads, messages=args.messages)
+
+
+# Write throughput and latency.
+
+
+def _elastic_writer(url: str, **options: Any) -> Callable[[], WriterBackend]:
+    return lambda: ElasticsearchBackend([url], job_states=True, **options)
+
+
+def _shipping_writer(directory: str, stack: ExitStack) -> ShippingBackend:
+    path = os.path.join(directory, "shipper.sock")
+    shipper = LogShipper(path, MemoryBackend())
+    stack.callback(shipper.close)
+    return ShippingBackend(path)
+
+
+def bench_write(
+    results: Results, args: argparse.Namespace, elastic_url: str, directory: str
+) -> None:
+    stack = ExitStack()
+    writers: Dict[str, Callable[[], WriterBackend]] = {
+        "memory": MemoryBackend,
+        "stub": StubBackend,
+        "sqlite": lambda: SQLiteBackend(os.path.join(directory, "write.db")),
+        "async": lambda: AsyncWriterBackend(MemoryBackend()),
+        "shipping": lambda: _shipping_writer(directory, stack),
+        "elastic": _elastic_writer(elastic_url),
+        "elastic-bulk": _elastic_writer(elastic_url, bulk=True, bulk_max_age=None),
+    }
+    job = make_job()
+    clock = time.perf_counter
+    with stack:
+        for name, factory in _selected(writers, args.backends):
+            backend = factory()
+            timings: List[float] = []
+            start = clock()
+            for i in range(args.jobs):
+                job_id = "write-%d" % i
+                before = clock()
+                backend.write_enqueued(job_id=job_id, task_id="benchmark", job=job)
+                enqueued = clock()
+                backend.write_dequeued(job_id=job_id, task_id="benchmark")
+                dequeued = clock()
+                backend.write_completed(
+                    job_id=job_id, task_id="benchmark", result="done"
+                )
+                completed = clock()
+                timings += [
+                    enqueued - before,
+                    dequeued - enqueued,
+                    completed - dequeued,
+                ]
+            backend.close()
+            elapsed = clock() - start
+            _cleanup(backend)
+            results.add(
+                "write/%s" % name,
+                timings,
+                logs=len(timings),
+                logs_per_sec=len(timings) / elapsed,
+            )
+
+
+def _cleanup(backend: Any) -> None:
+    if isinstance(backend, ElasticsearchBackend):
+        backend.es.indices.delete(index=INDEX_PREFIX + "*")
+        backend.es.indices.delete(index=JOB_STATES_INDEX, ignore_unavailable=True)
+
+
+# Read latency.
+
+
+def make_events(count: int) -> Iterator[Log]:
+    """Yield the logs of count events, one second apart, oldest first."""
+    job = make_job(payload_size=1)
+    start = datetime(2000, 1, 1)
+    for i in range(count):
+        job_id = "job-%d" % (i // 3)
+        timestamp = start + timedelta(seconds=i)
+        step = i % 3
+        if step == 0:
+            yield EnqueuedLog(
+                type=LogType.ENQUEUED,
+                timestamp=timestamp,
+                job_id=job_id,
+                task_id="benchmark",
+                job=job,
+            )
+        elif step == 1:
+            yield DequeuedLog(
+                type=LogType.DEQUEUED,
+                timestamp=timestamp,
+                job_id=job_id,
+                task_id="benchmark",
+            )
+        elif (i // 3) % EXCEPTION_RATE == 0:
+            yield ExceptionLog(
+                type=LogType.EXCEPTION,
+                timestamp=timestamp,
+                job_id=job_id,
+                task_id="benchmark",
+                exception="ValueError: benchmark failure",
+                exception_class="ValueError",
+            )
+        else:
+            yield CompletedLog(
+                type=LogType.COMPLETED,
+                timestamp=timestamp,
+                job_id=job_id,
+                task_id="benchmark",
+                result="done",
+            )
+
+
+def _load(backend: Any, count: int) -> None:
+    batch: List[Log] = []
+    for log in make_events(count):
+        batch.append(log)
+        if len(batch) >= 5000:
+            backend.write_many(batch)
+            batch = []
+    backend.write_many(batch)
+    backend.flush()
+
+
+def bench_read(
+    results: Results, args: argparse.Namespace, elastic_url: str, directory: str
+) -> None:
+    readers: Dict[str, Callable[[int], Any]] = {
+        "memory": lambda size: MemoryBackend(),
+        "sqlite": lambda size: SQLiteBackend(
+            os.path.join(directory, "read-%d.db" % size)
+        ),
+        "elastic": lambda size: ElasticsearchBackend(
+            [elastic_url], bulk=True, bulk_max_docs=5000, bulk_max_age=None
+        ),
+    }
+    for size in args.sizes:
+        for name, factory in _selected(readers, args.backends):
+            backend = factory(size)
+            _load(backend, size)
+            if isinstance(backend, ElasticsearchBackend):
+                backend.es.indices.refresh(index=INDEX_PREFIX + "*")
+
+            find_job = []
+            for _ in range(args.lookups):
+                job_id = "job-%d" % random.randrange(size // 3)
+                start = time.perf_counter()
+                backend.find_job(job_id)
+                find_job.append(time.perf_counter() - start)
+            job_ids = [
+                "job-%d" % random.randrange(size // 3) for _ in range(FIND_JOBS_COUNT)
+            ]
+            find_jobs = _repeat(
+                args.repeats, functools.partial(backend.find_jobs, job_ids)
+            )
+            by_type = _repeat(
+                args.repeats, functools.partial(backend.logs_by_type, LogType.EXCEPTION)
+            )
+            search = _repeat(args.repeats, functools.partial(backend.search, "failure"))
+            backend.close()
+            _cleanup(backend)
+
+            for case, timings in (
+                ("find_job", find_job),
+                ("find_jobs", find_jobs),
+                ("logs_by_type", by_type),
+                ("search", search),
+            ):
+                results.add(
+                    "read/%s/%s/%d" % (case, name, size),
+                    timings,
+                    unit="ms",
+                    scale=1e3,
+                    events=size,
+                )
+
+
+def _repeat(count: int, function: Callable[[], Any]) -> List[float]:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _selected(factories: Dict[str, Any], names: Optional[List[str]]) -> Iterator[Any]:
+    for name, factory in factories.items():
+        if names is None or name in names:
+            yield name, factory
+
+
+# Results.
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Return the names of the results slower than their baseline."""
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    print()
+    print("{:<40} {:>12} {:>12} {:>8}".format("name", "baseline", "p50", "change"))
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None or before["p50"] <= 0:
+            continue
+        change = result["p50"] / before["p50"] - 1
+        print(
+            "{:<40} {:>12.2f} {:>12.2f} {:>+7.0%}".format(
+                result["name"], before["p50"], result["p50"], change
+            )
+        )
+        if change > tolerance:
+            regressions.append(result["name"])
+    return regressions
+
+
+def _environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "task_logs": task_logs.__version__,
+        "dramatiq": dramatiq.__version__,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--only", action="append", choices=["middleware", "write", "read"]
+    )
+    parser.add_argument(
+        "--backends", type=lambda value: value.split(","), help="e.g. memory,sqlite"
+    )
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=DEFAULT_SIZES,
+    )
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--elasticsearch-url")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Compare to the results of a JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    groups = args.only or ["middleware", "write", "read"]
+
+    print("{:<40} {:>12} {:>12} {:>12}".format("name", "p50", "p90", "p99"))
+    results = Results()
+    with ExitStack() as stack:
+        elastic_url = args.elasticsearch_url
+        if elastic_url is None:
+            elastic_url = stack.enter_context(ElasticsearchStandIn()).url
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        if "middleware" in groups:
+            bench_middleware(results, args)
+        if "write" in groups:
+            bench_write(results, args, elastic_url, directory)
+        if "read" in groups:
+            bench_read(results, args, elastic_url, directory)
+
+    document = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "environment": _environment(),
+        "elasticsearch": "url" if args.elasticsearch_url else "stand-in",
+        "results": results.results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results.results, baseline, args.tolerance)
+        if regressions:
+            print("\n%d regression(s): %s" % (len(regressions), ", ".join(regressions)))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+from typing import Any, Dict
+
+from task_logs.backends.backend import JobDetails
+
+
+def make_payload(size: int) -> Dict[str, Any]:
+    """Build a kwargs payload similar to what our actors receive."""
+    return {
+        "ids": list(range(size)),
+        "items": [
+            {"id": i, "name": "item-%d" % i, "tags": ["a", "b"], "score": i / 3}
+            for i in range(size)
+        ],
+        "options": {"retry": True, "priority": 5, "source": "benchmark"},
+    }
+
+
+def make_job(payload_size: int = 10) -> JobDetails:
+    return JobDetails(
+        queue="benchmark",
+        task_path="benchmarks.tasks.benchmark",
+        execute_at=None,
+        args=["a", 1],
+        kwargs=make_payload(payload_size),
+        options={"max_retries": 3},
+    )
@@ -30,8 +30,10 @@ dependencies = [
 
 extra_dependencies = {
     "redis": ["redis>=2.0,<4.0"],
-    "elasticsearch": ["elasticsearch>=6.0.0"],
+    "elasticsearch": ["elasticsearch>=7.12.0"],
+    "async": ["elasticsearch[async]>=7.12.0"],
     "dramatiq": ["dramatiq"],
+    "orjson": ["orjson"],
 }
 
 extra_dependencies["all"] = list(set(sum(extra_dependencies.values(), [])))
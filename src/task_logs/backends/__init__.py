@@ -1,9 +1,19 @@
 import warnings
 
+from .async_writer import AsyncWriterBackend, OverflowPolicy
+from .memory import MemoryBackend
+from .spool import SpoolingBackend
+from .sqlite import SQLiteBackend
 from .stub import StubBackend
 
 try:
-    from .elastic import ElasticsearchBackend
+    from .shipping import LogShipper, ShippingBackend
+except AttributeError:  # pragma: no cover
+    # socketserver.UnixStreamServer is only defined on POSIX.
+    pass
+
+try:
+    from .elastic import ElasticsearchBackend, IndexRollover
 except ImportError:  # pragma: no cover
     warnings.warn(
         "ElasticsearchBackend is not available.  Run `pip install "
@@ -11,4 +21,25 @@ except ImportError:  # pragma: no cover
         ImportWarning,
     )
 
-__all__ = ["ElasticsearchBackend", "StubBackend"]
+try:
+    from .aio_elastic import AioElasticsearchBackend
+except ImportError:  # pragma: no cover
+    warnings.warn(
+        "AioElasticsearchBackend is not available.  Run `pip install "
+        "task_logs[async]` to add support for that backend.",
+        ImportWarning,
+    )
+
+__all__ = [
+    "AioElasticsearchBackend",
+    "AsyncWriterBackend",
+    "ElasticsearchBackend",
+    "IndexRollover",
+    "LogShipper",
+    "MemoryBackend",
+    "OverflowPolicy",
+    "SQLiteBackend",
+    "ShippingBackend",
+    "SpoolingBackend",
+    "StubBackend",
+]
@@ -0,0 +1,420 @@
+"""Asyncio versions of WriterBackend and ReaderBackend.
+
+The methods mirror the synchronous backends, as coroutines, and the
+``iter_*`` readers are asynchronous iterators.
+"""
+
+import abc
+import asyncio
+from datetime import datetime, timedelta
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Union,
+    cast,
+)
+
+from .backend import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_PERCENTILES,
+    DEFAULT_STATS_INTERVAL,
+    CompletedLog,
+    DequeuedLog,
+    EnqueuedLog,
+    ExceptionLog,
+    FingerprintedExceptionLog,
+    JobDetails,
+    JobState,
+    JobStatus,
+    Log,
+    LogCount,
+    LogFilter,
+    LogPage,
+    LogStats,
+    LogType,
+    Task,
+    _slice_page,
+    apply_job_log,
+    check_stats_group,
+    count_fingerprints,
+    count_logs,
+    exception_log,
+    format_exception,
+    job_latencies,
+    job_queue,
+    regroup_log_counts,
+)
+
+
+class AioWriterBackend(abc.ABC):
+    # See WriterBackend.fingerprint_exceptions.
+    fingerprint_exceptions = False
+
+    @abc.abstractmethod
+    async def write(self, log: Log) -> None:
+        raise NotImplementedError
+
+    async def write_many(self, logs: Iterable[Log]) -> None:
+        for log in logs:
+            await self.write(log)
+
+    async def flush(self) -> None:
+        """Persist any log buffered by the backend."""
+        return None
+
+    async def close(self) -> None:
+        """Flush and release the resources held by the backend."""
+        await self.flush()
+
+    async def write_enqueued(
+        self, *, job_id: str, task_id: str, job: JobDetails
+    ) -> None:
+        await self.write(
+            EnqueuedLog(
+                type=LogType.ENQUEUED,
+                job=job,
+                job_id=job_id,
+                task_id=task_id,
+                timestamp=datetime.now(),
+            )
+        )
+
+    async def write_dequeued(self, *, job_id: str, task_id: str) -> None:
+        await self.write(
+            DequeuedLog(
+                type=LogType.DEQUEUED,
+                job_id=job_id,
+                task_id=task_id,
+                timestamp=datetime.now(),
+            )
+        )
+
+    async def write_completed(self, *, job_id: str, task_id: str, result: Any) -> None:
+        await self.write(
+            CompletedLog(
+                type=LogType.COMPLETED,
+                job_id=job_id,
+                task_id=task_id,
+                result=result,
+                timestamp=datetime.now(),
+            )
+        )
+
+    async def write_exception(
+        self, *, job_id: str, task_id: str, exception: Union[BaseException, str]
+    ) -> None:
+        await self.write(
+            exception_log(
+                job_id=job_id,
+                task_id=task_id,
+                exception=exception,
+                fingerprint=self.fingerprint_exceptions,
+            )
+        )
+
+
+class AioReaderBackend(abc.ABC):
+    """Read logs back from a backend, see ReaderBackend."""
+
+    async def enqueued(self) -> List[EnqueuedLog]:
+        return cast(List[EnqueuedLog], await self.logs_by_type(LogType.ENQUEUED))
+
+    async def dequeued(self) -> List[DequeuedLog]:
+        return cast(List[DequeuedLog], await self.logs_by_type(LogType.DEQUEUED))
+
+    async def completed(self) -> List[CompletedLog]:
+        return cast(List[CompletedLog], await self.logs_by_type(LogType.COMPLETED))
+
+    async def exception(self) -> List[ExceptionLog]:
+        return cast(List[ExceptionLog], await self.logs_by_type(LogType.EXCEPTION))
+
+    async def all(self) -> List[Log]:
+        return await self.logs_by_type(None)
+
+    def iter_all(self, *, page_size: int = DEFAULT_PAGE_SIZE) -> AsyncIterator[Log]:
+        return self.iter_logs_by_type(None, page_size=page_size)
+
+    @abc.abstractmethod
+    async def find_job(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def logs_by_type(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        raise NotImplementedError
+
+    # Paginated readers.  Backends able to page natively should override the
+    # *_page methods, the default implementations slice the full result.
+
+    async def find_job_page(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        logs = await self.find_job(job_id, since=since, until=until)
+        return _slice_page(logs, page_size, cursor)
+
+    async def logs_by_type_page(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        logs = await self.logs_by_type(type, since=since, until=until)
+        return _slice_page(logs, page_size, cursor)
+
+    async def search_page(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        logs = await self.search(query, since=since, until=until)
+        return _slice_page(logs, page_size, cursor)
+
+    def iter_find_job(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> AsyncIterator[Log]:
+        return _iter_pages(
+            lambda cursor: self.find_job_page(
+                job_id, since=since, until=until, page_size=page_size, cursor=cursor
+            ),
+            cursor,
+        )
+
+    def iter_logs_by_type(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> AsyncIterator[Log]:
+        return _iter_pages(
+            lambda cursor: self.logs_by_type_page(
+                type, since=since, until=until, page_size=page_size, cursor=cursor
+            ),
+            cursor,
+        )
+
+    def iter_search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> AsyncIterator[Log]:
+        return _iter_pages(
+            lambda cursor: self.search_page(
+                query, since=since, until=until, page_size=page_size, cursor=cursor
+            ),
+            cursor,
+        )
+
+    async def find_jobs(
+        self,
+        job_ids: Iterable[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, List[Log]]:
+        """See ReaderBackend.find_jobs(), the default finds the jobs concurrently."""
+        job_ids = list(dict.fromkeys(job_ids))
+        jobs = await asyncio.gather(
+            *(self.find_job(job_id, since=since, until=until) for job_id in job_ids)
+        )
+        return dict(zip(job_ids, jobs))
+
+    # Structured filters, see ReaderBackend.
+
+    async def filter_logs(self, log_filter: LogFilter) -> List[Log]:
+        logs = await self.logs_by_type(
+            log_filter.type, since=log_filter.since, until=log_filter.until
+        )
+        return [log for log in logs if log_filter.matches(log)]
+
+    async def filter_logs_page(
+        self,
+        log_filter: LogFilter,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return _slice_page(await self.filter_logs(log_filter), page_size, cursor)
+
+    def iter_filter_logs(
+        self,
+        log_filter: LogFilter,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> AsyncIterator[Log]:
+        return _iter_pages(
+            lambda cursor: self.filter_logs_page(
+                log_filter, page_size=page_size, cursor=cursor
+            ),
+            cursor,
+        )
+
+    async def list_task(self) -> List[Task]:
+        raise NotImplementedError
+
+    # Job states, for backends keeping a summary of each job.
+
+    async def job_state(self, job_id: str) -> Optional[JobState]:
+        raise NotImplementedError
+
+    async def jobs_by_status(
+        self, *statuses: JobStatus, limit: int = DEFAULT_PAGE_SIZE
+    ) -> List[JobState]:
+        """Return the most recently updated jobs with one of the statuses."""
+        raise NotImplementedError
+
+    async def in_flight_jobs(self, *, limit: int = DEFAULT_PAGE_SIZE) -> List[JobState]:
+        return await self.jobs_by_status(
+            JobStatus.ENQUEUED, JobStatus.RUNNING, limit=limit
+        )
+
+    async def failed_jobs(self, *, limit: int = DEFAULT_PAGE_SIZE) -> List[JobState]:
+        return await self.jobs_by_status(JobStatus.FAILED, limit=limit)
+
+    # Fingerprinted exceptions, see ReaderBackend.
+
+    async def traceback(self, fingerprint: str) -> Optional[str]:
+        return None
+
+    async def full_exception(self, log: ExceptionLog) -> str:
+        if isinstance(log, FingerprintedExceptionLog):
+            text = log.traceback or await self.traceback(log.fingerprint)
+            if text is not None:
+                return text
+        return format_exception(log.exception)
+
+    async def exception_fingerprints(
+        self, *, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        logs = [
+            log
+            async for log in self.iter_logs_by_type(
+                LogType.EXCEPTION, since=since, until=until
+            )
+        ]
+        return count_fingerprints(logs)
+
+    # Statistics, see ReaderBackend.
+
+    async def log_counts(
+        self,
+        *,
+        interval: timedelta = DEFAULT_STATS_INTERVAL,
+        group_by: str = "task_id",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[LogCount]:
+        check_stats_group(group_by)
+        logs = [
+            log async for log in self.iter_logs_by_type(None, since=since, until=until)
+        ]
+        if group_by == "task_id":
+            return count_logs(logs, interval, lambda log: log.task_id)
+
+        counts = count_logs(logs, interval, lambda log: log.job_id)
+        queues = await self._job_queues(count.key for count in counts)
+        return regroup_log_counts(counts, queues)
+
+    async def _job_queues(self, job_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """See ReaderBackend._job_queues()."""
+        jobs = await self.find_jobs(job_ids)
+        return {job_id: job_queue(logs) for job_id, logs in jobs.items()}
+
+    async def queue_latency(
+        self,
+        *,
+        group_by: str = "task_id",
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Dict[float, float]]:
+        check_stats_group(group_by)
+        states: Dict[str, JobState] = {}
+        async for log in self.iter_logs_by_type(None, since=since):
+            apply_job_log(states, log)
+        return job_latencies(states.values(), group_by, percentiles, since, until)
+
+    async def stats(
+        self,
+        *,
+        interval: timedelta = DEFAULT_STATS_INTERVAL,
+        group_by: str = "task_id",
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> LogStats:
+        counts, latency = await asyncio.gather(
+            self.log_counts(
+                interval=interval, group_by=group_by, since=since, until=until
+            ),
+            self.queue_latency(
+                group_by=group_by, percentiles=percentiles, since=since, until=until
+            ),
+        )
+        return LogStats(counts=counts, latency=latency)
+
+
+async def _iter_pages(
+    fetch: Callable[[Optional[str]], Awaitable[LogPage]], cursor: Optional[str]
+) -> AsyncIterator[Log]:
+    while True:
+        page = await fetch(cursor)
+        for log in page.logs:
+            yield log
+        if page.cursor is None:
+            return
+        cursor = page.cursor
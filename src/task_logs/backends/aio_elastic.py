@@ -0,0 +1,350 @@
+import asyncio
+import collections
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, TypeVar, cast
+
+from elasticsearch import AsyncElasticsearch
+
+from .aio import AioReaderBackend, AioWriterBackend
+from .backend import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_PERCENTILES,
+    DEFAULT_STATS_INTERVAL,
+    JobState,
+    JobStatus,
+    Log,
+    LogCount,
+    LogFilter,
+    LogPage,
+    check_stats_group,
+)
+from .elastic import (
+    JOB_STATE_RETRIES,
+    JOB_STATES_INDEX,
+    TRACEBACKS_INDEX,
+    IndexRollover,
+    JSONSerializerWithError,
+    Requests,
+    _check_bulk_response,
+    _client_method,
+    _ElasticsearchBase,
+    _filter_query,
+    _job_state_update,
+    _logs_by_type_query,
+    _traceback_source,
+)
+from .serializer import dumps, encode_log
+
+T = TypeVar("T")
+
+
+def create_async_client(connections: Any, **options: Any) -> AsyncElasticsearch:
+    """Create a client, and its connection pool, to share between backends."""
+    return AsyncElasticsearch(
+        connections, serializer=JSONSerializerWithError(), **options
+    )
+
+
+class AioElasticsearchBackend(_ElasticsearchBase, AioWriterBackend, AioReaderBackend):
+    """Store logs in Elasticsearch from an asyncio event loop.
+
+    Uses the same indices, templates and job states as ElasticsearchBackend.
+    Every request goes through one AsyncElasticsearch client, so concurrent
+    lookups share its aiohttp connection pool (``maxsize`` connections per
+    node).  ``write_many()`` sends its logs in a single ``_bulk`` request.
+    The index templates are installed before the first write.  ``rollover``
+    and ``fingerprint_exceptions`` work as in ElasticsearchBackend.  A
+    ``client`` passed in is shared, and isn't closed by ``close()``.
+    """
+
+    def __init__(
+        self,
+        connections: Any = None,
+        *,
+        client: Optional[AsyncElasticsearch] = None,
+        index_postfix: str = "%Y.%m.%d",
+        rollover: Optional[IndexRollover] = None,
+        force_refresh: bool = False,
+        job_states: bool = False,
+        fingerprint_exceptions: bool = False,
+        **options: Any,
+    ) -> None:
+        self._owns_client = client is None
+        if client is None:
+            client = create_async_client(connections, **options)
+        elif connections is not None or options:
+            raise ValueError("Pass either a client or connections and options.")
+        self.es = client
+        self.index_postfix = index_postfix
+        self.rollover = rollover
+        self.force_refresh = force_refresh
+        self.job_states = job_states
+        self.fingerprint_exceptions = fingerprint_exceptions
+        self._stored_fingerprints = collections.OrderedDict()
+        self._pending_fingerprints = set()
+        self._stored_fingerprints_lock = threading.Lock()
+        self._initialized = False
+        self._init_lock: Optional[asyncio.Lock] = None
+
+    async def write(self, log: Log) -> None:
+        await self._init()
+        requests = [
+            self.es.index(
+                index=self._index_name(log),
+                body=encode_log(log),
+                refresh=self.force_refresh,
+            )
+        ]
+        traceback = self._new_traceback(log)
+        if traceback is not None:
+            requests.append(
+                self.es.index(
+                    index=TRACEBACKS_INDEX,
+                    id=traceback.fingerprint,
+                    body=dumps(_traceback_source(traceback)),
+                    refresh=self.force_refresh,
+                )
+            )
+        if self.job_states:
+            requests.append(
+                self.es.update(
+                    index=JOB_STATES_INDEX,
+                    id=log.job_id,
+                    body=dumps(_job_state_update(log)),
+                    retry_on_conflict=JOB_STATE_RETRIES,
+                    refresh=self.force_refresh,
+                )
+            )
+        if traceback is None:
+            await asyncio.gather(*requests)
+            return
+
+        try:
+            await asyncio.gather(*requests)
+        except Exception:
+            self._traceback_written(traceback.fingerprint, stored=False)
+            raise
+        self._traceback_written(traceback.fingerprint, stored=True)
+
+    async def write_many(self, logs: Iterable[Log]) -> None:
+        actions = [self._bulk_action(log) for log in logs]
+        if not actions:
+            return
+
+        await self._init()
+        try:
+            response = await self.es.bulk(
+                body=b"".join(actions), refresh=self.force_refresh
+            )
+        except Exception:
+            self._bulk_written(None)
+            raise
+        self._bulk_written(response)
+        _check_bulk_response(response)
+
+    async def close(self) -> None:
+        if self._owns_client:
+            await self.es.close()
+
+    async def _init(self) -> None:
+        if self._initialized:
+            return
+        if self._init_lock is None:
+            # Created in the running loop, locks are bound to a loop before
+            # Python 3.10.
+            self._init_lock = asyncio.Lock()
+        # Concurrent first writes wait for a single installation.
+        async with self._init_lock:
+            if self._initialized:
+                return
+            await self._send(self._init_requests())
+            self._initialized = True
+
+    async def _send(self, requests: Requests[T]) -> T:
+        """See ElasticsearchBackend._send()."""
+        try:
+            request = next(requests)
+            while True:
+                method, kwargs = request
+                try:
+                    response = await _client_method(self.es, method)(**kwargs)
+                except Exception as error:
+                    request = requests.throw(error)
+                else:
+                    request = requests.send(response)
+        except StopIteration as stop:
+            return cast(T, stop.value)
+
+    async def job_state(self, job_id: str) -> Optional[JobState]:
+        return await self._send(self._job_state_requests(job_id))
+
+    async def jobs_by_status(
+        self, *statuses: JobStatus, limit: int = DEFAULT_PAGE_SIZE
+    ) -> List[JobState]:
+        return await self._send(self._jobs_by_status_requests(statuses, limit))
+
+    async def traceback(self, fingerprint: str) -> Optional[str]:
+        return await self._send(self._traceback_requests(fingerprint))
+
+    async def exception_fingerprints(
+        self, *, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        return await self._send(self._exception_fingerprints_requests(since, until))
+
+    async def log_counts(
+        self,
+        *,
+        interval: timedelta = DEFAULT_STATS_INTERVAL,
+        group_by: str = "task_id",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[LogCount]:
+        check_stats_group(group_by)
+        if group_by == "queue":
+            return await super().log_counts(
+                interval=interval, group_by=group_by, since=since, until=until
+            )
+        return await self._send(self._log_counts_requests(interval, since, until))
+
+    async def _job_queues(self, job_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        if not self.job_states:
+            return await super()._job_queues(job_ids)
+        return await self._send(self._job_queues_requests(job_ids))
+
+    async def queue_latency(
+        self,
+        *,
+        group_by: str = "task_id",
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Dict[float, float]]:
+        return await self._send(
+            self._queue_latency_requests(group_by, percentiles, since, until)
+        )
+
+    async def search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return [log async for log in self.iter_search(query, since=since, until=until)]
+
+    async def find_job(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return [
+            log async for log in self.iter_find_job(job_id, since=since, until=until)
+        ]
+
+    async def find_jobs(
+        self,
+        job_ids: Iterable[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, List[Log]]:
+        """See ElasticsearchBackend.find_jobs()."""
+        return await self._send(self._find_jobs_requests(job_ids, since, until))
+
+    async def logs_by_type(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return [
+            log async for log in self.iter_logs_by_type(type, since=since, until=until)
+        ]
+
+    async def search_page(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return await self._search_page(
+            {"query_string": {"query": query}},
+            since=since,
+            until=until,
+            page_size=page_size,
+            cursor=cursor,
+        )
+
+    async def find_job_page(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return await self._search_page(
+            {"term": {"job_id": job_id}},
+            since=since,
+            until=until,
+            page_size=page_size,
+            cursor=cursor,
+        )
+
+    async def logs_by_type_page(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return await self._search_page(
+            _logs_by_type_query(type),
+            since=since,
+            until=until,
+            page_size=page_size,
+            cursor=cursor,
+        )
+
+    async def filter_logs(self, log_filter: LogFilter) -> List[Log]:
+        return [log async for log in self.iter_filter_logs(log_filter)]
+
+    async def filter_logs_page(
+        self,
+        log_filter: LogFilter,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return await self._search_page(
+            _filter_query(log_filter),
+            since=log_filter.since,
+            until=log_filter.until,
+            page_size=page_size,
+            cursor=cursor,
+        )
+
+    async def _search_page(
+        self,
+        query: Dict[str, Any],
+        *,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        page_size: int,
+        cursor: Optional[str],
+    ) -> LogPage:
+        return await self._send(
+            self._search_page_requests(
+                query, since=since, until=until, page_size=page_size, cursor=cursor
+            )
+        )
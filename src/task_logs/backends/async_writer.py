@@ -0,0 +1,152 @@
+import atexit
+import enum
+import logging
+import queue
+import threading
+from typing import Optional, Union
+
+from .backend import Log, WriterBackend
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(str, enum.Enum):
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+
+class AsyncWriterBackend(WriterBackend):
+    """Hand logs to a writer thread so callers never wait on the log store.
+
+    Logs are put in a queue of at most ``max_size`` logs which is drained by a
+    dedicated thread, in batches of up to ``batch_size`` logs.  When the queue
+    is full, ``overflow`` decides whether the caller blocks, the oldest queued
+    log is dropped or the new log is dropped.  Logs written after ``close()``
+    are dropped too.  Dropped logs are counted in ``dropped``, and logs the
+    wrapped backend failed to write in ``failed``.
+
+    The writer thread is a daemon, so ``close()`` is registered to run at
+    interpreter exit to drain the queue when the backend isn't closed first.
+    """
+
+    def __init__(
+        self,
+        backend: WriterBackend,
+        *,
+        max_size: int = 10000,
+        overflow: Union[OverflowPolicy, str] = OverflowPolicy.BLOCK,
+        batch_size: int = 500,
+    ) -> None:
+        self.backend = backend
+        self.fingerprint_exceptions = backend.fingerprint_exceptions
+        self.overflow = OverflowPolicy(overflow)
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.failed = 0
+        self._dropped_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[Log]]" = queue.Queue(maxsize=max_size)
+        self._closing = False
+        self._putting = 0
+        self._close_lock = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="task-logs-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, log: Log) -> None:
+        with self._close_lock:
+            if self._closing:
+                logger.warning("Dropping a log written after close: %r.", log)
+                self._count_dropped()
+                return
+            self._putting += 1
+
+        # Put outside the lock, a blocked put would stall every other writer
+        # and close().  close() waits for pending puts before queueing the
+        # stop marker, so no log lands after it where the thread never gets it.
+        try:
+            self._put(log)
+        finally:
+            with self._close_lock:
+                self._putting -= 1
+                self._close_lock.notify_all()
+
+    def flush(self) -> None:
+        if not self._closing:
+            self._queue.join()
+        self.backend.flush()
+
+    def close(self) -> None:
+        with self._close_lock:
+            if self._closing:
+                return
+            self._closing = True
+            # The writer thread keeps draining, so blocked puts complete.
+            self._close_lock.wait_for(lambda: not self._putting)
+
+        atexit.unregister(self.close)
+        self._queue.put(None)
+        self._thread.join()
+        self.backend.close()
+
+    def _put(self, log: Log) -> None:
+        if self.overflow is OverflowPolicy.BLOCK:
+            self._queue.put(log)
+            return
+
+        while True:
+            try:
+                self._queue.put_nowait(log)
+                return
+            except queue.Full:
+                pass
+
+            if self.overflow is OverflowPolicy.DROP_NEWEST:
+                self._count_dropped()
+                return
+
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                continue
+            self._queue.task_done()
+            self._count_dropped()
+
+    def _count_dropped(self) -> None:
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            log = self._queue.get()
+            if log is None:
+                self._queue.task_done()
+                return
+
+            batch = [log]
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    log = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if log is None:
+                    stopping = True
+                    break
+                batch.append(log)
+
+            try:
+                self.backend.write_many(batch)
+            except Exception:
+                logger.exception("Failed to write %d log(s).", len(batch))
+                with self._dropped_lock:
+                    self.failed += len(batch)
+
+            for _ in batch:
+                self._queue.task_done()
+            if stopping:
+                self._queue.task_done()
+                return
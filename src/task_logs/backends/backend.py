@@ -1,12 +1,37 @@
 import abc
+import collections
 import dataclasses
 import enum
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Union, cast
+import functools
+import hashlib
+import math
+import os
+import sys
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+
+# Logs are created for every job event and kept in bulk by readers: they
+# declare __slots__ so instances don't carry a __dict__.
 
 
 @dataclasses.dataclass
 class JobDetails:
+    __slots__ = ("queue", "task_path", "execute_at", "args", "kwargs", "options")
+
     queue: str
     task_path: Optional[str]
     execute_at: Optional[datetime]
@@ -25,11 +50,15 @@ class LogType(str, enum.Enum):
 
 @dataclasses.dataclass
 class Task:
+    __slots__ = ("id",)
+
     id: str
 
 
 @dataclasses.dataclass
 class Log:
+    __slots__ = ("type", "timestamp", "job_id", "task_id")
+
     type: LogType
     timestamp: datetime
     job_id: str
@@ -38,38 +67,374 @@ class Log:
 
 @dataclasses.dataclass
 class EnqueuedLog(Log):
-    job: JobDetails
+    __slots__ = ("job",)
 
-    def __post_init__(self) -> None:
-        if isinstance(self.job, dict):
-            self.job = JobDetails(**self.job)
+    job: JobDetails
 
 
 @dataclasses.dataclass
 class DequeuedLog(Log):
-    pass
+    __slots__ = ()
 
 
 @dataclasses.dataclass
 class CompletedLog(Log):
+    __slots__ = ("result",)
+
     result: Any
 
 
 @dataclasses.dataclass
 class ExceptionLog(Log):
+    __slots__ = ("exception", "exception_class")
+
     exception: Union[BaseException, str]
+    # Class of the exception raised, None for failures logged as text.
+    exception_class: Optional[str]
+
+
+@dataclasses.dataclass
+class FingerprintedExceptionLog(ExceptionLog):
+    """An exception whose traceback is stored once per fingerprint.
+
+    ``exception`` only holds the last line of the traceback, the class and
+    message of the exception.  ``traceback`` is set on the logs being written,
+    for the backend to store it, and is None on the logs read back: see
+    ``ReaderBackend.full_exception()``.
+    """
+
+    __slots__ = ("fingerprint", "traceback")
+
+    exception_class: str
+    fingerprint: str
+    traceback: Optional[str]
+
+
+@dataclasses.dataclass
+class StoredTraceback:
+    __slots__ = ("fingerprint", "exception_class", "traceback")
+
+    fingerprint: str
+    exception_class: str
+    traceback: str
 
 
 @dataclasses.dataclass
 class FailedLog(Log):
-    pass
+    __slots__ = ()
+
+
+LOG_TYPE_FACTORIES: Dict[str, Type[Log]] = {
+    LogType.ENQUEUED: EnqueuedLog,
+    LogType.DEQUEUED: DequeuedLog,
+    LogType.COMPLETED: CompletedLog,
+    LogType.EXCEPTION: ExceptionLog,
+    LogType.FAILED: FailedLog,
+}
+
+
+class JobStatus(str, enum.Enum):
+    ENQUEUED = "enqueued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+JOB_STATUS_BY_LOG_TYPE = {
+    LogType.ENQUEUED: JobStatus.ENQUEUED,
+    LogType.DEQUEUED: JobStatus.RUNNING,
+    LogType.COMPLETED: JobStatus.COMPLETED,
+    LogType.EXCEPTION: JobStatus.FAILED,
+    LogType.FAILED: JobStatus.FAILED,
+}
+
+
+@dataclasses.dataclass
+class JobState:
+    """Current state of a job, summarized from its logs."""
+
+    __slots__ = (
+        "job_id",
+        "task_id",
+        "status",
+        "updated_at",
+        "queue",
+        "task_path",
+        "enqueued_at",
+        "dequeued_at",
+        "completed_at",
+        "attempts",
+        "last_exception",
+    )
+
+    job_id: str
+    task_id: str
+    status: JobStatus
+    # Timestamp of the most recent log, which decided the status.
+    updated_at: datetime
+    queue: Optional[str]
+    task_path: Optional[str]
+    enqueued_at: Optional[datetime]
+    # Last time the job was dequeued and when it last completed or failed.
+    dequeued_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    # Number of times the job was dequeued.
+    attempts: int
+    last_exception: Optional[str]
+
+    @classmethod
+    def from_log(cls, log: Log) -> "JobState":
+        state = cls(
+            job_id=log.job_id,
+            task_id=log.task_id,
+            status=JOB_STATUS_BY_LOG_TYPE[log.type],
+            updated_at=log.timestamp,
+            queue=None,
+            task_path=None,
+            enqueued_at=None,
+            dequeued_at=None,
+            completed_at=None,
+            attempts=0,
+            last_exception=None,
+        )
+        state.apply(log)
+        return state
+
+    def apply(self, log: Log) -> None:
+        """Update the state with a log, which can be older than the state.
+
+        ``ElasticsearchBackend`` runs the same logic in ``JOB_STATE_SCRIPT``.
+        """
+        is_latest = log.timestamp >= self.updated_at
+        if isinstance(log, EnqueuedLog):
+            self.enqueued_at = log.timestamp
+            self.queue = log.job.queue
+            self.task_path = log.job.task_path
+        elif log.type == LogType.DEQUEUED:
+            self.attempts += 1
+            if self.dequeued_at is None or self.dequeued_at < log.timestamp:
+                self.dequeued_at = log.timestamp
+        else:
+            if self.completed_at is None or self.completed_at < log.timestamp:
+                self.completed_at = log.timestamp
+            if isinstance(log, ExceptionLog):
+                if is_latest or self.last_exception is None:
+                    self.last_exception = format_exception(log.exception)
+
+        if is_latest:
+            self.updated_at = log.timestamp
+            self.status = JOB_STATUS_BY_LOG_TYPE[log.type]
+
+
+@dataclasses.dataclass
+class LogPage:
+    __slots__ = ("logs", "cursor")
+
+    logs: List[Log]
+    # Opaque token to fetch the next page, None once all logs were returned.
+    cursor: Optional[str]
+
+
+@dataclasses.dataclass
+class LogCount:
+    __slots__ = ("start", "key", "type", "count")
+
+    # Start of the time bucket, buckets are aligned on the Unix epoch.
+    start: datetime
+    # Task id or queue of the counted logs, see ReaderBackend.log_counts().
+    key: str
+    type: LogType
+    count: int
+
+
+@dataclasses.dataclass
+class LogStats:
+    __slots__ = ("counts", "latency")
+
+    counts: List[LogCount]
+    # Queue latency percentiles in seconds, by task id or queue like counts.
+    latency: Dict[str, Dict[float, float]]
+
+
+@dataclasses.dataclass(frozen=True)
+class LogFilter:
+    """Select the logs matching every field set.
+
+    ``queue`` and ``task_path`` match the job details, which only enqueued
+    logs hold.  ``since`` is inclusive and ``until`` exclusive.  ``text`` is
+    matched as by ``search()``.  The other fields are exact filters that
+    backends resolve with their indexes, without scoring.
+    """
+
+    task_id: Optional[str] = None
+    queue: Optional[str] = None
+    task_path: Optional[str] = None
+    type: Optional[LogType] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    text: Optional[str] = None
+
+    @property
+    def job_details(self) -> bool:
+        """Whether only logs with job details can match."""
+        return self.queue is not None or self.task_path is not None
+
+    def matches(self, log: Log) -> bool:
+        """Match a log, ``text`` being a substring of the log's repr."""
+        if self.task_id is not None and log.task_id != self.task_id:
+            return False
+        if self.type is not None and log.type != self.type:
+            return False
+        if self.job_details:
+            if not isinstance(log, EnqueuedLog):
+                return False
+            if self.queue is not None and log.job.queue != self.queue:
+                return False
+            if self.task_path is not None and log.job.task_path != self.task_path:
+                return False
+        if not in_time_range(log, self.since, self.until):
+            return False
+        return self.text is None or self.text in str(log)
+
+
+DEFAULT_PAGE_SIZE = 500
+
+DEFAULT_STATS_INTERVAL = timedelta(hours=1)
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0)
+
+# Fields statistics can be grouped by.
+STATS_GROUPS = ("task_id", "queue")
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def format_exception(exception: Union[BaseException, str]) -> str:
+    if isinstance(exception, str):
+        return exception
+    return "\n".join(
+        traceback.format_exception(type(exception), exception, exception.__traceback__)
+    )
+
+
+def fingerprint_exception(exception: BaseException) -> str:
+    """Hash the classes and stack frames of an exception and its causes.
+
+    Messages and line numbers are left out, so the failures of a same code
+    path share their fingerprint.  Files are relative to their sys.path
+    entry, so the fingerprint doesn't depend on where code is installed.
+    """
+    digest = hashlib.sha1()
+    seen = set()
+    current: Optional[BaseException] = exception
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        digest.update(exception_class(current).encode("utf-8"))
+        for frame in traceback.extract_tb(current.__traceback__):
+            digest.update(
+                "\n{}:{}:{}".format(
+                    _relative_path(frame.filename), frame.name, frame.line
+                ).encode("utf-8")
+            )
+        digest.update(b"\n\n")
+        if current.__cause__ is not None:
+            current = current.__cause__
+        elif not current.__suppress_context__:
+            current = current.__context__
+        else:
+            current = None
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=1024)
+def _relative_path(filename: str) -> str:
+    """Strip the longest sys.path entry holding a file from its path."""
+    if not os.path.isabs(filename):
+        return filename
+    relative = filename
+    for entry in sys.path:
+        entry = os.path.abspath(entry or os.curdir)
+        if filename.startswith(os.path.join(entry, "")):
+            candidate = os.path.relpath(filename, entry)
+            if len(candidate) < len(relative):
+                relative = candidate
+    return relative.replace(os.sep, "/")
+
+
+def exception_class(exception: BaseException) -> str:
+    cls = type(exception)
+    if cls.__module__ == "builtins":
+        return cls.__qualname__
+    return "{}.{}".format(cls.__module__, cls.__qualname__)
+
+
+def exception_log(
+    *,
+    job_id: str,
+    task_id: str,
+    exception: Union[BaseException, str],
+    fingerprint: bool,
+) -> ExceptionLog:
+    """Build the log of an exception, fingerprinted if asked and possible."""
+    if fingerprint and isinstance(exception, BaseException):
+        return FingerprintedExceptionLog(
+            type=LogType.EXCEPTION,
+            job_id=job_id,
+            task_id=task_id,
+            exception="".join(
+                traceback.format_exception_only(type(exception), exception)
+            ).strip(),
+            fingerprint=fingerprint_exception(exception),
+            exception_class=exception_class(exception),
+            traceback=format_exception(exception),
+            timestamp=datetime.now(),
+        )
+
+    return ExceptionLog(
+        type=LogType.EXCEPTION,
+        job_id=job_id,
+        task_id=task_id,
+        exception=format_exception(exception),
+        exception_class=(
+            None if isinstance(exception, str) else exception_class(exception)
+        ),
+        timestamp=datetime.now(),
+    )
+
+
+def split_traceback(log: Log) -> Tuple[Log, Optional[StoredTraceback]]:
+    """Return the log to store without its traceback, and the traceback."""
+    if isinstance(log, FingerprintedExceptionLog) and log.traceback is not None:
+        stored = StoredTraceback(
+            fingerprint=log.fingerprint,
+            exception_class=log.exception_class,
+            traceback=log.traceback,
+        )
+        return dataclasses.replace(log, traceback=None), stored
+    return log, None
 
 
 class WriterBackend(abc.ABC):
+    # With fingerprint_exceptions, write_exception() writes a
+    # FingerprintedExceptionLog and backends store each traceback once.
+    fingerprint_exceptions = False
+
     @abc.abstractmethod
     def write(self, log: Log) -> None:
         raise NotImplementedError
 
+    def write_many(self, logs: Iterable[Log]) -> None:
+        for log in logs:
+            self.write(log)
+
+    def flush(self) -> None:
+        """Persist any log buffered by the backend."""
+        return None
+
+    def close(self) -> None:
+        """Flush and release the resources held by the backend."""
+        self.flush()
+
     def write_enqueued(self, *, job_id: str, task_id: str, job: JobDetails) -> None:
         self.write(
             EnqueuedLog(
@@ -106,17 +471,23 @@ class WriterBackend(abc.ABC):
         self, *, job_id: str, task_id: str, exception: Union[BaseException, str]
     ) -> None:
         self.write(
-            ExceptionLog(
-                type=LogType.EXCEPTION,
+            exception_log(
                 job_id=job_id,
                 task_id=task_id,
                 exception=exception,
-                timestamp=datetime.now(),
+                fingerprint=self.fingerprint_exceptions,
             )
         )
 
 
 class ReaderBackend(abc.ABC):
+    """Read logs back from a backend.
+
+    Readers returning logs accept optional ``since`` (inclusive) and ``until``
+    (exclusive) bounds on the log timestamp, which backends can use to skip
+    the storage that can't hold matching logs.
+    """
+
     def enqueued(self) -> List[EnqueuedLog]:
         return cast(List[EnqueuedLog], self.logs_by_type(LogType.ENQUEUED))
 
@@ -132,17 +503,459 @@ class ReaderBackend(abc.ABC):
     def all(self) -> List[Log]:
         return self.logs_by_type(None)
 
+    def iter_all(self, *, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Log]:
+        return self.iter_logs_by_type(None, page_size=page_size)
+
     @abc.abstractmethod
-    def find_job(self, job_id: str) -> List[Log]:
+    def find_job(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
         raise NotImplementedError
 
     @abc.abstractmethod
-    def logs_by_type(self, type: Optional[str]) -> List[Log]:
+    def logs_by_type(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
         raise NotImplementedError
 
     @abc.abstractmethod
-    def search(self, query: str) -> List[Log]:
+    def search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
         raise NotImplementedError
 
+    # Paginated readers.  Backends able to page natively should override the
+    # *_page methods, the default implementations slice the full result.
+
+    def find_job_page(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        logs = self.find_job(job_id, since=since, until=until)
+        return _slice_page(logs, page_size, cursor)
+
+    def logs_by_type_page(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        logs = self.logs_by_type(type, since=since, until=until)
+        return _slice_page(logs, page_size, cursor)
+
+    def search_page(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        logs = self.search(query, since=since, until=until)
+        return _slice_page(logs, page_size, cursor)
+
+    def iter_find_job(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Iterator[Log]:
+        return _iter_pages(
+            lambda cursor: self.find_job_page(
+                job_id, since=since, until=until, page_size=page_size, cursor=cursor
+            ),
+            cursor,
+        )
+
+    def iter_logs_by_type(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Iterator[Log]:
+        return _iter_pages(
+            lambda cursor: self.logs_by_type_page(
+                type, since=since, until=until, page_size=page_size, cursor=cursor
+            ),
+            cursor,
+        )
+
+    def iter_search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Iterator[Log]:
+        return _iter_pages(
+            lambda cursor: self.search_page(
+                query, since=since, until=until, page_size=page_size, cursor=cursor
+            ),
+            cursor,
+        )
+
+    def find_jobs(
+        self,
+        job_ids: Iterable[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, List[Log]]:
+        """Return the logs of each job, newest first, keyed by job id.
+
+        Every job id is a key, in the given order.  The default
+        implementation calls find_job() for each job, backends override it
+        to fetch every job at once.
+        """
+        return {
+            job_id: self.find_job(job_id, since=since, until=until)
+            for job_id in dict.fromkeys(job_ids)
+        }
+
+    # Structured filters.  The default implementations filter the logs of
+    # the filtered type.
+
+    def filter_logs(self, log_filter: LogFilter) -> List[Log]:
+        """Return the logs matching a LogFilter, newest first."""
+        logs = self.logs_by_type(
+            log_filter.type, since=log_filter.since, until=log_filter.until
+        )
+        return [log for log in logs if log_filter.matches(log)]
+
+    def filter_logs_page(
+        self,
+        log_filter: LogFilter,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return _slice_page(self.filter_logs(log_filter), page_size, cursor)
+
+    def iter_filter_logs(
+        self,
+        log_filter: LogFilter,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Iterator[Log]:
+        return _iter_pages(
+            lambda cursor: self.filter_logs_page(
+                log_filter, page_size=page_size, cursor=cursor
+            ),
+            cursor,
+        )
+
     def list_task(self) -> List[Task]:
         raise NotImplementedError
+
+    # Job states, for backends keeping a summary of each job.
+
+    def job_state(self, job_id: str) -> Optional[JobState]:
+        raise NotImplementedError
+
+    def jobs_by_status(
+        self, *statuses: JobStatus, limit: int = DEFAULT_PAGE_SIZE
+    ) -> List[JobState]:
+        """Return the most recently updated jobs with one of the statuses."""
+        raise NotImplementedError
+
+    def in_flight_jobs(self, *, limit: int = DEFAULT_PAGE_SIZE) -> List[JobState]:
+        return self.jobs_by_status(JobStatus.ENQUEUED, JobStatus.RUNNING, limit=limit)
+
+    def failed_jobs(self, *, limit: int = DEFAULT_PAGE_SIZE) -> List[JobState]:
+        return self.jobs_by_status(JobStatus.FAILED, limit=limit)
+
+    # Fingerprinted exceptions, see WriterBackend.fingerprint_exceptions.
+
+    def traceback(self, fingerprint: str) -> Optional[str]:
+        """Return the traceback stored for a fingerprint, if any."""
+        return None
+
+    def full_exception(self, log: ExceptionLog) -> str:
+        """Return the traceback of an exception log, fetching it if needed.
+
+        A fingerprint keeps the traceback of its first exception, so the
+        message can differ from the one of the log.
+        """
+        if isinstance(log, FingerprintedExceptionLog):
+            text = log.traceback or self.traceback(log.fingerprint)
+            if text is not None:
+                return text
+        return format_exception(log.exception)
+
+    def exception_fingerprints(
+        self, *, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """Count the exception logs of each fingerprint."""
+        logs = self.iter_logs_by_type(LogType.EXCEPTION, since=since, until=until)
+        return count_fingerprints(logs)
+
+    # Statistics.  The default implementations aggregate the logs returned by
+    # the readers, backends able to aggregate natively should override them.
+
+    def log_counts(
+        self,
+        *,
+        interval: timedelta = DEFAULT_STATS_INTERVAL,
+        group_by: str = "task_id",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[LogCount]:
+        """Count the logs of each type, per time bucket of interval.
+
+        Logs are counted by ``task_id`` or by ``queue``.  Only enqueued logs
+        hold a queue, the other logs are counted in the queue their job was
+        last enqueued in, and aren't counted when it's unknown.
+        """
+        check_stats_group(group_by)
+        logs = self.iter_logs_by_type(None, since=since, until=until)
+        if group_by == "task_id":
+            return count_logs(logs, interval, lambda log: log.task_id)
+
+        counts = count_logs(logs, interval, lambda log: log.job_id)
+        return regroup_log_counts(counts, self._job_queues(c.key for c in counts))
+
+    def _job_queues(self, job_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Return the queue each job was last enqueued in, None if unknown."""
+        return {
+            job_id: job_queue(logs) for job_id, logs in self.find_jobs(job_ids).items()
+        }
+
+    def queue_latency(
+        self,
+        *,
+        group_by: str = "task_id",
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Dict[float, float]]:
+        """Return percentiles of the time jobs waited in queue, in seconds.
+
+        The latency of a job is the time between its last enqueue and its
+        last dequeue.  Only jobs enqueued between since and until, and
+        dequeued since, are counted.  Latencies are grouped by ``task_id`` or
+        ``queue``.
+        """
+        check_stats_group(group_by)
+        states: Dict[str, JobState] = {}
+        for log in self.iter_logs_by_type(None, since=since):
+            apply_job_log(states, log)
+        return job_latencies(states.values(), group_by, percentiles, since, until)
+
+    def stats(
+        self,
+        *,
+        interval: timedelta = DEFAULT_STATS_INTERVAL,
+        group_by: str = "task_id",
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> LogStats:
+        return LogStats(
+            counts=self.log_counts(
+                interval=interval, group_by=group_by, since=since, until=until
+            ),
+            latency=self.queue_latency(
+                group_by=group_by, percentiles=percentiles, since=since, until=until
+            ),
+        )
+
+
+def in_time_range(
+    log: Log, since: Optional[datetime], until: Optional[datetime]
+) -> bool:
+    if since is not None and log.timestamp < since:
+        return False
+    if until is not None and log.timestamp >= until:
+        return False
+    return True
+
+
+def count_fingerprints(logs: Iterable[Log]) -> Dict[str, int]:
+    return dict(
+        collections.Counter(
+            log.fingerprint
+            for log in logs
+            if isinstance(log, FingerprintedExceptionLog)
+        )
+    )
+
+
+def utc_naive(timestamp: datetime) -> datetime:
+    """Return an aware timestamp as a naive one in UTC, naive ones unchanged."""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def bucket_start(timestamp: datetime, interval: timedelta) -> datetime:
+    epoch = EPOCH if timestamp.tzinfo is None else EPOCH.replace(tzinfo=timezone.utc)
+    return epoch + (timestamp - epoch) // interval * interval
+
+
+def count_logs(
+    logs: Iterable[Log], interval: timedelta, key: Callable[[Log], Optional[str]]
+) -> List[LogCount]:
+    """Count logs by time bucket, key and type, skipping the None keys.
+
+    Like the counts computed by the databases, bucket starts are naive, in
+    UTC for aware timestamps.
+    """
+    counter = collections.Counter(
+        ((utc_naive(log.timestamp) - EPOCH) // interval, key(log), log.type)
+        for log in logs
+    )
+    return sort_log_counts(
+        LogCount(
+            start=EPOCH + bucket * interval,
+            key=log_key,
+            type=LogType(type),
+            count=count,
+        )
+        for (bucket, log_key, type), count in counter.items()
+        if log_key is not None
+    )
+
+
+def regroup_log_counts(
+    counts: Iterable[LogCount], keys: Dict[str, Optional[str]]
+) -> List[LogCount]:
+    """Sum counts under new keys, dropping the counts of keys mapped to None."""
+    counter: Dict[Tuple[datetime, str, LogType], int] = collections.Counter()
+    for count in counts:
+        key = keys.get(count.key)
+        if key is not None:
+            counter[count.start, key, count.type] += count.count
+    return sort_log_counts(
+        LogCount(start=start, key=key, type=type, count=count)
+        for (start, key, type), count in counter.items()
+    )
+
+
+def sort_log_counts(counts: Iterable[LogCount]) -> List[LogCount]:
+    return sorted(counts, key=lambda c: (c.start, c.key, c.type))
+
+
+def job_queue(logs: Iterable[Log]) -> Optional[str]:
+    """Return the queue of the newest enqueued log of a job, newest first."""
+    for log in logs:
+        if isinstance(log, EnqueuedLog):
+            return log.job.queue
+    return None
+
+
+def apply_job_log(states: Dict[str, JobState], log: Log) -> None:
+    """Update the state of the job of a log, created by its first log."""
+    state = states.get(log.job_id)
+    if state is None:
+        states[log.job_id] = JobState.from_log(log)
+    else:
+        state.apply(log)
+
+
+def check_page_size(page_size: int) -> None:
+    if page_size < 1:
+        raise ValueError("Invalid page_size: {!r}".format(page_size))
+
+
+def check_stats_group(group_by: str) -> None:
+    if group_by not in STATS_GROUPS:
+        raise ValueError("Invalid group_by: {!r}".format(group_by))
+
+
+def job_latencies(
+    states: Iterable[JobState],
+    group_by: str,
+    percentiles: Sequence[float],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> Dict[str, Dict[float, float]]:
+    latencies: Dict[str, List[float]] = {}
+    for state in states:
+        enqueued_at, dequeued_at = state.enqueued_at, state.dequeued_at
+        # Jobs waiting for a retry were enqueued after their last dequeue.
+        if enqueued_at is None or dequeued_at is None or dequeued_at < enqueued_at:
+            continue
+        if since is not None and enqueued_at < since:
+            continue
+        if until is not None and enqueued_at >= until:
+            continue
+        latency = (dequeued_at - enqueued_at).total_seconds()
+        latencies.setdefault(getattr(state, group_by), []).append(latency)
+
+    return {
+        key: compute_percentiles(values, percentiles)
+        for key, values in latencies.items()
+    }
+
+
+def compute_percentiles(
+    values: List[float], percentiles: Sequence[float]
+) -> Dict[float, float]:
+    """Interpolate percentiles between the closest ranks of non-empty values."""
+    values = sorted(values)
+    result = {}
+    for percentile in percentiles:
+        rank = (len(values) - 1) * percentile / 100
+        low, high = values[math.floor(rank)], values[math.ceil(rank)]
+        result[float(percentile)] = low + (high - low) * (rank - math.floor(rank))
+    return result
+
+
+def _group_jobs(job_ids: Iterable[str], logs: Iterable[Log]) -> Dict[str, List[Log]]:
+    """Group logs by job, in the order of job_ids, keeping the logs order."""
+    jobs: Dict[str, List[Log]] = {job_id: [] for job_id in job_ids}
+    for log in logs:
+        jobs[log.job_id].append(log)
+    return jobs
+
+
+def _slice_page(logs: List[Log], page_size: int, cursor: Optional[str]) -> LogPage:
+    check_page_size(page_size)
+    try:
+        start = int(cursor or 0)
+    except ValueError:
+        raise ValueError("Invalid cursor: {!r}".format(cursor)) from None
+
+    end = start + page_size
+    return LogPage(logs=logs[start:end], cursor=str(end) if end < len(logs) else None)
+
+
+def _iter_pages(
+    fetch: Callable[[Optional[str]], LogPage], cursor: Optional[str]
+) -> Iterator[Log]:
+    while True:
+        page = fetch(cursor)
+        yield from page.logs
+        if page.cursor is None:
+            return
+        cursor = page.cursor
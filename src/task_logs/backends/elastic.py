@@ -1,22 +1,68 @@
+import base64
+import collections
 import dataclasses
-import traceback
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import functools
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
 
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch.helpers import BulkIndexError
 from elasticsearch.serializer import JSONSerializer
 
 from .backend import (
-    CompletedLog,
-    DequeuedLog,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_PERCENTILES,
+    DEFAULT_STATS_INTERVAL,
+    EPOCH,
+    JOB_STATUS_BY_LOG_TYPE,
     EnqueuedLog,
     ExceptionLog,
-    FailedLog,
+    JobState,
+    JobStatus,
     Log,
+    LogCount,
+    LogFilter,
+    LogPage,
     LogType,
     ReaderBackend,
+    StoredTraceback,
     WriterBackend,
+    _group_jobs,
+    check_page_size,
+    check_stats_group,
+    format_exception,
+    in_time_range,
+    sort_log_counts,
+    split_traceback,
 )
+from .serializer import LOG_ENCODERS, decode_log, decode_logs, dumps, encode_log
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Generators yielding the requests of an operation, as the name of the client
+# method, dotted for namespaced APIs, and its keyword arguments.  They are
+# sent each response, or thrown the error of the request, and return the
+# result of the operation.
+Requests = Generator[Tuple[str, Dict[str, Any]], Any, T]
 
 INDEX_PREFIX = "task-logs-"
 
@@ -29,6 +75,8 @@ TASK_LOGS_MAPPING = {
         "type": {"type": "keyword"},
         "result": {"enabled": False, "type": "object"},
         "exception": {"type": "text"},
+        "fingerprint": {"type": "keyword"},
+        "exception_class": {"type": "keyword"},
         "job": {
             "dynamic": "false",
             "properties": {
@@ -43,108 +91,1543 @@ TASK_LOGS_MAPPING = {
     },
 }
 
+# Segments are sorted newest first, the order of every reader, so sorted
+# queries stop after their first hits.  Index settings only apply to new
+# indices, indices created by an older template keep theirs.
+TASK_LOGS_SETTINGS = {
+    "index.sort.field": "timestamp",
+    "index.sort.order": "desc",
+    "index.codec": "best_compression",
+}
+
 TASK_LOGS_TEMPLATE = {
     "index_patterns": [INDEX_PREFIX + "*"],
+    "settings": TASK_LOGS_SETTINGS,
     "mappings": TASK_LOGS_MAPPING,
+    "version": 3,
+}
+
+# Properties added since version 1 of TASK_LOGS_TEMPLATE, to add to the
+# existing indices.  ``exception_class`` is set on the logs of exception
+# objects, not on failures logged as text.
+ADDED_LOG_PROPERTIES = {
+    "fingerprint": {"type": "keyword"},
+    "exception_class": {"type": "keyword"},
+}
+
+# With IndexRollover, logs are written through ROLLOVER_ALIAS to indices
+# created by rollover.  Their names match INDEX_PREFIX + "*", so they get
+# TASK_LOGS_TEMPLATE and are read along with daily indices.  The alias name
+# must not match INDEX_PREFIX + "*".
+ROLLOVER_ALIAS = "task-logs"
+ROLLOVER_INDEX_PREFIX = INDEX_PREFIX + "rollover-"
+ROLLOVER_FIRST_INDEX = ROLLOVER_INDEX_PREFIX + "000001"
+ROLLOVER_POLICY = "task-logs-policy"
+
+# Installed along with TASK_LOGS_TEMPLATE, with a higher order.
+ROLLOVER_TEMPLATE = {
+    "index_patterns": [ROLLOVER_INDEX_PREFIX + "*"],
+    "order": 1,
+    "settings": {
+        "index.lifecycle.name": ROLLOVER_POLICY,
+        "index.lifecycle.rollover_alias": ROLLOVER_ALIAS,
+    },
+    "version": 1,
+}
+
+ROLLOVER_FIRST_INDEX_BODY = {"aliases": {ROLLOVER_ALIAS: {"is_write_index": True}}}
+
+# One document per exception fingerprint, keyed by the fingerprint.  The
+# index name must not match INDEX_PREFIX + "*".
+TRACEBACKS_INDEX = "task-tracebacks"
+
+TRACEBACKS_TEMPLATE = {
+    "index_patterns": [TRACEBACKS_INDEX],
+    "mappings": {
+        "dynamic": "strict",
+        "properties": {
+            "fingerprint": {"type": "keyword"},
+            "exception_class": {"type": "keyword"},
+            "traceback": {"type": "text", "index": False},
+        },
+    },
     "version": 1,
 }
 
-LOG_TYPE_FACTORIES = {
-    LogType.ENQUEUED: EnqueuedLog,
-    LogType.DEQUEUED: DequeuedLog,
-    LogType.COMPLETED: CompletedLog,
-    LogType.EXCEPTION: ExceptionLog,
-    LogType.FAILED: FailedLog,
+# Fingerprints remembered as stored by a backend, so their traceback is only
+# sent once per process.
+MAX_STORED_FINGERPRINTS = 10000
+
+# One document per job, keyed by job id and upserted with every log of the job
+# by JOB_STATE_SCRIPT.  The index name must not match INDEX_PREFIX + "*".
+JOB_STATES_INDEX = "task-jobs"
+
+# Only set with job_documents=True.
+JOB_EVENTS_PROPERTIES = {
+    "event_types": {"type": "keyword"},
+    "events": {"enabled": False, "type": "object"},
+}
+
+JOB_STATES_MAPPING = {
+    "dynamic": "strict",
+    "properties": {
+        "job_id": {"type": "keyword"},
+        "task_id": {"type": "keyword"},
+        "status": {"type": "keyword"},
+        "updated_at": {"type": "date"},
+        "queue": {"type": "keyword"},
+        "task_path": {"type": "keyword"},
+        "enqueued_at": {"type": "date"},
+        "dequeued_at": {"type": "date"},
+        "completed_at": {"type": "date"},
+        "attempts": {"type": "integer"},
+        "last_exception": {"type": "text"},
+        **JOB_EVENTS_PROPERTIES,
+    },
+}
+
+JOB_STATES_TEMPLATE = {
+    "index_patterns": [JOB_STATES_INDEX],
+    "mappings": JOB_STATES_MAPPING,
+    "version": 2,
+}
+
+# Painless version of JobState.apply().  Timestamps are compared as ISO
+# strings, they are always formatted with microseconds.
+JOB_STATE_SCRIPT = """
+def s = ctx._source;
+if (s.job_id == null) {
+  s.job_id = params.job_id;
+  s.task_id = params.task_id;
+  s.status = params.status;
+  s.updated_at = params.timestamp;
+  s.attempts = 0;
 }
+boolean latest = s.updated_at.compareTo(params.timestamp) <= 0;
+if (params.type == 'enqueued') {
+  s.enqueued_at = params.timestamp;
+  s.queue = params.queue;
+  s.task_path = params.task_path;
+} else if (params.type == 'dequeued') {
+  s.attempts += 1;
+  if (s.dequeued_at == null || s.dequeued_at.compareTo(params.timestamp) < 0) {
+    s.dequeued_at = params.timestamp;
+  }
+} else {
+  if (s.completed_at == null || s.completed_at.compareTo(params.timestamp) < 0) {
+    s.completed_at = params.timestamp;
+  }
+  if (params.exception != null && (latest || s.last_exception == null)) {
+    s.last_exception = params.exception;
+  }
+}
+if (latest) {
+  s.updated_at = params.timestamp;
+  s.status = params.status;
+}
+"""
+
+# With job_documents=True, the logs themselves are kept in the job document.
+JOB_DOCUMENT_SCRIPT = JOB_STATE_SCRIPT + """
+if (s.events == null) {
+  s.events = [];
+  s.event_types = [];
+}
+s.events.add(params.event);
+if (!s.event_types.contains(params.type)) {
+  s.event_types.add(params.type);
+}
+"""
+
+# Retries when concurrent logs of a job update its state.
+JOB_STATE_RETRIES = 5
+
+# Above that many indices, queries target every index instead of listing them.
+MAX_QUERY_INDICES = 64
+
+# How long a point in time is kept open between two pages.
+PIT_KEEP_ALIVE = "5m"
+
+# Most logs fetched by a find_jobs() search, more are paged through a point
+# in time.  That's the default index.max_result_window.
+FIND_JOBS_SIZE = 10000
+
+# Most tasks or queues returned per time bucket by the statistics, and most
+# fingerprints returned by exception_fingerprints().
+STATS_MAX_GROUPS = 1000
+
+# Seconds between the last enqueue and the last dequeue of a job, for jobs
+# dequeued since they were last enqueued.
+QUEUE_LATENCY_SCRIPT = """
+(doc['dequeued_at'].value.toInstant().toEpochMilli()
+    - doc['enqueued_at'].value.toInstant().toEpochMilli()) / 1000.0
+"""
+
+DEQUEUED_SCRIPT = """
+doc['enqueued_at'].size() > 0 && doc['dequeued_at'].size() > 0
+    && !doc['dequeued_at'].value.isBefore(doc['enqueued_at'].value)
+"""
+
+
+def _postfix_step(index_postfix: str) -> Optional[timedelta]:
+    """Return the time covered by each index, None if it can't be computed."""
+    if any(d in index_postfix for d in ("%M", "%S", "%f", "%I", "%p", "%c", "%X")):
+        return None
+    if "%H" in index_postfix:
+        return timedelta(hours=1)
+    return timedelta(days=1)
+
+
+def _time_range(
+    field: str, since: Optional[datetime], until: Optional[datetime]
+) -> Dict[str, Any]:
+    time_range = {}
+    if since is not None:
+        time_range["gte"] = since.isoformat()
+    if until is not None:
+        time_range["lt"] = until.isoformat()
+    return {"range": {field: time_range}}
+
+
+def _with_time_range(
+    query: Dict[str, Any], since: Optional[datetime], until: Optional[datetime]
+) -> Dict[str, Any]:
+    if since is None and until is None:
+        return query
+
+    return {
+        "bool": {"must": [query], "filter": [_time_range("timestamp", since, until)]}
+    }
+
+
+def _encode_cursor(
+    pit_id: str, search_after: Optional[List[Any]], skip: int = 0
+) -> str:
+    """Encode a point in time cursor.
+
+    ``skip`` counts the logs already returned from the first hit after
+    ``search_after``, for hits holding several logs.
+    """
+    data = dumps({"pit": pit_id, "after": search_after, "skip": skip})
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, Optional[List[Any]], int]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return data["pit"], data["after"], int(data.get("skip", 0))
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor: {!r}".format(cursor)) from None
+
+
+def _job_state_update(log: Log, *, with_event: bool = False) -> Dict[str, Any]:
+    params: Dict[str, Any] = {
+        "job_id": log.job_id,
+        "task_id": log.task_id,
+        "type": log.type,
+        "status": JOB_STATUS_BY_LOG_TYPE[log.type],
+        "timestamp": log.timestamp.isoformat(timespec="microseconds"),
+        "queue": None,
+        "task_path": None,
+        "exception": None,
+    }
+    if isinstance(log, EnqueuedLog):
+        params["queue"] = log.job.queue
+        params["task_path"] = log.job.task_path
+    elif isinstance(log, ExceptionLog):
+        params["exception"] = format_exception(log.exception)
+
+    script = JOB_STATE_SCRIPT
+    if with_event:
+        params["event"] = LOG_ENCODERS[log.type](log)
+        script = JOB_DOCUMENT_SCRIPT
+
+    return {
+        "scripted_upsert": True,
+        "upsert": {},
+        "script": {"source": script, "lang": "painless", "params": params},
+    }
+
+
+def _load_job_state(source: Dict[str, Any]) -> JobState:
+    return JobState(
+        job_id=source["job_id"],
+        task_id=source["task_id"],
+        status=JobStatus(source["status"]),
+        updated_at=datetime.fromisoformat(source["updated_at"]),
+        queue=source.get("queue"),
+        task_path=source.get("task_path"),
+        enqueued_at=_load_optional_datetime(source.get("enqueued_at")),
+        dequeued_at=_load_optional_datetime(source.get("dequeued_at")),
+        completed_at=_load_optional_datetime(source.get("completed_at")),
+        attempts=source.get("attempts", 0),
+        last_exception=source.get("last_exception"),
+    )
+
+
+def _load_optional_datetime(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return datetime.fromisoformat(value)
+
+
+def _check_bulk_response(response: Dict[str, Any]) -> None:
+    if not response.get("errors"):
+        return
+
+    errors = [
+        item
+        for item in response["items"]
+        if not 200 <= next(iter(item.values())).get("status", 500) < 300
+    ]
+    raise BulkIndexError("%i document(s) failed to index." % len(errors), errors)
+
+
+def _filter_query(log_filter: LogFilter) -> Dict[str, Any]:
+    """Compile a filter to non-scoring clauses, cached by the node query cache."""
+    filters: List[Dict[str, Any]] = []
+    for field, value in (
+        ("task_id", log_filter.task_id),
+        ("type", log_filter.type),
+        ("job.queue", log_filter.queue),
+        ("job.task_path", log_filter.task_path),
+    ):
+        if value is not None:
+            filters.append({"term": {field: value}})
+    if log_filter.text is not None:
+        filters.append({"query_string": {"query": log_filter.text}})
+    if not filters:
+        return {"match_all": {}}
+    return {"bool": {"filter": filters}}
+
+
+def _search_page_body(
+    query: Dict[str, Any],
+    *,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    page_size: int,
+    pit_id: Optional[str] = None,
+    search_after: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    body: Dict[str, Any] = {
+        "size": page_size,
+        "query": _with_time_range(query, since, until),
+        "sort": [{"timestamp": {"order": "desc"}}],
+        # Lets sorted indices stop collecting hits once the page is full.
+        "track_total_hits": False,
+    }
+    if pit_id is not None:
+        body["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+    if search_after is not None:
+        body["search_after"] = search_after
+    return body
+
+
+def _logs_by_type_query(type: Optional[str]) -> Dict[str, Any]:
+    if type is None:
+        return {"match_all": {}}
+    return {"term": {"type": type}}
+
+
+def _split_first_page(
+    hits: List[Dict[str, Any]], page_size: int
+) -> Optional[Tuple[List[Dict[str, Any]], List[Any]]]:
+    """Split the page_size + 1 hits of a first page searched without a PIT.
+
+    Return the hits of the page and where to resume it in a point in time,
+    None when every hit has the same timestamp.  A point in time breaks
+    timestamp ties by ``_shard_doc``, which the first search didn't sort on,
+    so the hits tied with the first hit left out are left for the next page,
+    resumed before any ``_shard_doc`` of their timestamp.
+    """
+    boundary = hits[page_size]["sort"]
+    page = hits[:page_size]
+    while page and page[-1]["sort"] == boundary:
+        page.pop()
+    if not page:
+        return None
+    return page, boundary + [-1]
+
+
+def _job_documents_query(log_filter: LogFilter) -> Dict[str, Any]:
+    """Compile a filter to the job documents that can hold matching logs."""
+    filters: List[Dict[str, Any]] = []
+    for field, value in (
+        ("task_id", log_filter.task_id),
+        ("event_types", log_filter.type),
+        ("queue", log_filter.queue),
+        ("task_path", log_filter.task_path),
+    ):
+        if value is not None:
+            filters.append({"term": {field: value}})
+    if log_filter.text is not None:
+        filters.append({"query_string": {"query": log_filter.text}})
+    if not filters:
+        return {"match_all": {}}
+    return {"bool": {"filter": filters}}
+
+
+def _job_documents_body(
+    query: Dict[str, Any],
+    *,
+    since: Optional[datetime],
+    page_size: int,
+    pit_id: str,
+    search_after: Optional[List[Any]],
+) -> Dict[str, Any]:
+    # A job's updated_at is its most recent log, older jobs have no log
+    # since that time.
+    filters = []
+    if since is not None:
+        filters.append(_time_range("updated_at", since, None))
+    body: Dict[str, Any] = {
+        "size": page_size,
+        "query": {"bool": {"must": [query], "filter": filters}},
+        "sort": [{"updated_at": {"order": "desc"}}],
+        "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+        "track_total_hits": False,
+    }
+    if search_after is not None:
+        body["search_after"] = search_after
+    return body
+
+
+def _find_jobs_body(
+    job_ids: List[str], since: Optional[datetime], until: Optional[datetime]
+) -> Dict[str, Any]:
+    return {
+        "size": FIND_JOBS_SIZE,
+        "query": _with_time_range({"terms": {"job_id": job_ids}}, since, until),
+        "sort": [{"timestamp": {"order": "desc"}}],
+        "track_total_hits": False,
+    }
+
+
+def _jobs_by_status_body(statuses: Iterable[JobStatus], limit: int) -> Dict[str, Any]:
+    return {
+        "size": limit,
+        "query": {"terms": {"status": list(statuses)}},
+        "sort": [{"updated_at": {"order": "desc"}}],
+    }
+
+
+def _log_counts_body(
+    interval: timedelta, since: Optional[datetime], until: Optional[datetime]
+) -> Dict[str, Any]:
+    fixed_interval = "%dms" % (interval // timedelta(milliseconds=1))
+    return {
+        "size": 0,
+        "query": _with_time_range({"match_all": {}}, since, until),
+        "aggs": {
+            "buckets": {
+                "date_histogram": {
+                    "field": "timestamp",
+                    "fixed_interval": fixed_interval,
+                    "min_doc_count": 1,
+                },
+                "aggs": {
+                    "tasks": {
+                        "terms": {"field": "task_id", "size": STATS_MAX_GROUPS},
+                        "aggs": {
+                            "types": {"terms": {"field": "type", "size": len(LogType)}}
+                        },
+                    }
+                },
+            }
+        },
+    }
+
+
+def _load_log_counts(response: Dict[str, Any]) -> List[LogCount]:
+    # Searches matching no index have no aggregations.
+    aggregations = response.get("aggregations")
+    if not aggregations:
+        return []
+
+    counts = []
+    for bucket in aggregations["buckets"]["buckets"]:
+        start = EPOCH + timedelta(milliseconds=bucket["key"])
+        for task in bucket["tasks"]["buckets"]:
+            for type in task["types"]["buckets"]:
+                counts.append(
+                    LogCount(
+                        start=start,
+                        key=task["key"],
+                        type=LogType(type["key"]),
+                        count=type["doc_count"],
+                    )
+                )
+    return sort_log_counts(counts)
+
+
+def _load_job_queues(response: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    return {
+        doc["_id"]: doc["_source"].get("queue") if doc.get("found") else None
+        for doc in response["docs"]
+    }
+
+
+def _queue_latency_body(
+    group_by: str,
+    percentiles: Sequence[float],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> Dict[str, Any]:
+    filters = [{"script": {"script": {"source": DEQUEUED_SCRIPT, "lang": "painless"}}}]
+    if since is not None or until is not None:
+        filters.append(_time_range("enqueued_at", since, until))
+    return {
+        "size": 0,
+        "query": {"bool": {"filter": filters}},
+        "aggs": {
+            "groups": {
+                "terms": {"field": group_by, "size": STATS_MAX_GROUPS},
+                "aggs": {
+                    "latency": {
+                        "percentiles": {
+                            "script": {
+                                "source": QUEUE_LATENCY_SCRIPT,
+                                "lang": "painless",
+                            },
+                            "percents": list(percentiles),
+                        }
+                    }
+                },
+            }
+        },
+    }
+
+
+def _load_queue_latency(response: Dict[str, Any]) -> Dict[str, Dict[float, float]]:
+    aggregations = response.get("aggregations")
+    if not aggregations:
+        return {}
+
+    return {
+        group["key"]: {
+            float(percentile): value
+            for percentile, value in group["latency"]["values"].items()
+        }
+        for group in aggregations["groups"]["buckets"]
+    }
+
+
+def _traceback_source(traceback: StoredTraceback) -> Dict[str, Any]:
+    return {
+        "fingerprint": traceback.fingerprint,
+        "exception_class": traceback.exception_class,
+        "traceback": traceback.traceback,
+    }
+
+
+def _exception_fingerprints_body(
+    since: Optional[datetime], until: Optional[datetime]
+) -> Dict[str, Any]:
+    return {
+        "size": 0,
+        "query": _with_time_range({"term": {"type": LogType.EXCEPTION}}, since, until),
+        "aggs": {
+            "fingerprints": {
+                "terms": {"field": "fingerprint", "size": STATS_MAX_GROUPS}
+            }
+        },
+    }
+
+
+def _load_exception_fingerprints(response: Dict[str, Any]) -> Dict[str, int]:
+    aggregations = response.get("aggregations")
+    if not aggregations:
+        return {}
+
+    return {
+        bucket["key"]: bucket["doc_count"]
+        for bucket in aggregations["fingerprints"]["buckets"]
+    }
+
+
+def _load_events(
+    source: Dict[str, Any],
+    type: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> List[Log]:
+    """Load the logs of a job document, newest first."""
+    logs = []
+    for event in source.get("events", ()):
+        if type is not None and event["type"] != type:
+            continue
+        log = decode_log(event)
+        if in_time_range(log, since, until):
+            logs.append(log)
+
+    # Events are in the order they were written, the sort is stable.
+    logs.reverse()
+    logs.sort(key=lambda log: log.timestamp, reverse=True)
+    return logs
+
+
+@dataclasses.dataclass(frozen=True)
+class IndexRollover:
+    """Roll log indices over by size instead of writing to daily indices.
+
+    The write index is rolled over once its primary shards hold
+    ``max_primary_shard_size``, or once it holds ``max_docs`` logs or is
+    ``max_age`` old.  Indices are force merged to a single segment
+    ``force_merge_after`` their rollover, and deleted ``delete_after`` their
+    rollover.  Durations and sizes use the Elasticsearch units, and None
+    disables a threshold or a phase.  The index lifecycle policy is updated
+    by each backend's first write.
+    """
+
+    max_primary_shard_size: Optional[str] = "30gb"
+    max_docs: Optional[int] = None
+    max_age: Optional[str] = None
+    force_merge_after: Optional[str] = "2d"
+    delete_after: Optional[str] = "30d"
+
+    def __post_init__(self) -> None:
+        if (
+            self.max_primary_shard_size is None
+            and self.max_docs is None
+            and self.max_age is None
+        ):
+            raise ValueError("IndexRollover needs at least one rollover threshold.")
+
+    def policy(self) -> Dict[str, Any]:
+        """Return the index lifecycle policy of the rollover indices."""
+        rollover = {
+            name: value
+            for name, value in (
+                ("max_primary_shard_size", self.max_primary_shard_size),
+                ("max_docs", self.max_docs),
+                ("max_age", self.max_age),
+            )
+            if value is not None
+        }
+        phases: Dict[str, Any] = {"hot": {"actions": {"rollover": rollover}}}
+        if self.force_merge_after is not None:
+            phases["warm"] = {
+                "min_age": self.force_merge_after,
+                "actions": {"forcemerge": {"max_num_segments": 1}},
+            }
+        if self.delete_after is not None:
+            phases["delete"] = {
+                "min_age": self.delete_after,
+                "actions": {"delete": {}},
+            }
+        # Compared by the backends to only update a policy that changed.
+        meta = {"rollover": dataclasses.asdict(self)}
+        return {"policy": {"phases": phases, "_meta": meta}}
 
 
 class JSONSerializerWithError(JSONSerializer):
     def default(self, data: Any) -> Any:
         if isinstance(data, BaseException):
-            return "\n".join(
-                traceback.format_exception(
-                    etype=type(data), value=data, tb=data.__traceback__
-                )
-            )
+            return format_exception(data)
         return super().default(data)
 
 
-class ElasticsearchBackend(WriterBackend, ReaderBackend):
+def create_client(connections: Any, **options: Any) -> Elasticsearch:
+    """Create a client, and its connection pool, to share between backends."""
+    return Elasticsearch(connections, serializer=JSONSerializerWithError(), **options)
+
+
+def _template_is_current(
+    response: Dict[str, Any], name: str, template: Dict[str, Any]
+) -> bool:
+    """Check a get_template response holds the version of template, or newer."""
+    installed = response.get(name) or {}
+    return bool(installed.get("version", 0) >= template["version"])
+
+
+def _policy_is_current(response: Dict[str, Any], policy: Dict[str, Any]) -> bool:
+    """Check a get_lifecycle response holds the rollover policy."""
+    installed = (response.get(ROLLOVER_POLICY) or {}).get("policy") or {}
+    return bool(installed.get("_meta") == policy["policy"]["_meta"])
+
+
+def _client_method(client: Any, name: str) -> Callable[..., Any]:
+    return cast(Callable[..., Any], functools.reduce(getattr, name.split("."), client))
+
+
+class _ElasticsearchBase:
+    """Build requests and load responses for the Elasticsearch backends.
+
+    Shared by ElasticsearchBackend and AioElasticsearchBackend, which only
+    differ by the client sending the requests: the ``_*_requests()``
+    generators hold the logic of each operation, and the backends send their
+    Requests with ``_send()``.
+
+    Both install their index templates before their first write, skipping the
+    templates already installed with the same version.  Pass them a shared
+    ``client`` so their connections are pooled.
+    """
+
+    index_postfix: str
+    rollover: Optional[IndexRollover]
+    job_states: bool
+    job_documents = False
+    fingerprint_exceptions: bool
+    _stored_fingerprints: "collections.OrderedDict[str, None]"
+    _pending_fingerprints: Set[str]
+    _stored_fingerprints_lock: threading.Lock
+
+    def _templates(self) -> List[Tuple[str, Dict[str, Any]]]:
+        templates = [("task-logs-template", TASK_LOGS_TEMPLATE)]
+        if self.rollover is not None:
+            templates.append(("task-logs-rollover-template", ROLLOVER_TEMPLATE))
+        if self.job_states or self.job_documents:
+            templates.append(("task-jobs-template", JOB_STATES_TEMPLATE))
+        if self.fingerprint_exceptions:
+            templates.append(("task-tracebacks-template", TRACEBACKS_TEMPLATE))
+        return templates
+
+    def _new_traceback(self, log: Log) -> Optional[StoredTraceback]:
+        """Return the traceback of a log if it wasn't stored by this backend.
+
+        The traceback is pending until _traceback_written() is called, other
+        logs with the same fingerprint don't write it meanwhile.
+        """
+        _, traceback = split_traceback(log)
+        if traceback is None:
+            return None
+
+        with self._stored_fingerprints_lock:
+            if traceback.fingerprint in self._stored_fingerprints:
+                self._stored_fingerprints.move_to_end(traceback.fingerprint)
+                return None
+            if traceback.fingerprint in self._pending_fingerprints:
+                return None
+            self._pending_fingerprints.add(traceback.fingerprint)
+        return traceback
+
+    def _traceback_written(self, fingerprint: str, stored: bool) -> None:
+        """Mark a pending traceback as stored, or to write again if it failed."""
+        with self._stored_fingerprints_lock:
+            self._pending_fingerprints.discard(fingerprint)
+            if stored:
+                self._stored_fingerprints[fingerprint] = None
+                if len(self._stored_fingerprints) > MAX_STORED_FINGERPRINTS:
+                    self._stored_fingerprints.popitem(last=False)
+
+    def _bulk_written(self, response: Optional[Dict[str, Any]]) -> None:
+        """Mark the tracebacks of a bulk request, None if the request failed."""
+        if response is None:
+            # Which tracebacks were in the request isn't known, write all
+            # the pending ones again.
+            with self._stored_fingerprints_lock:
+                self._pending_fingerprints.clear()
+            return
+
+        for item in response["items"]:
+            result = item.get("index", {})
+            if result.get("_index") == TRACEBACKS_INDEX:
+                stored = 200 <= result.get("status", 500) < 300
+                self._traceback_written(result["_id"], stored)
+
+    def _index_name(self, log: Log) -> str:
+        if self.rollover is not None:
+            return ROLLOVER_ALIAS
+        return INDEX_PREFIX + log.timestamp.strftime(self.index_postfix)
+
+    def _bulk_action(self, log: Log) -> bytes:
+        action = b""
+        traceback = self._new_traceback(log)
+        if traceback is not None:
+            header = dumps(
+                {"index": {"_index": TRACEBACKS_INDEX, "_id": traceback.fingerprint}}
+            )
+            action = header + b"\n" + dumps(_traceback_source(traceback)) + b"\n"
+        if not self.job_documents:
+            header = dumps({"index": {"_index": self._index_name(log)}})
+            action += header + b"\n" + encode_log(log) + b"\n"
+        if self.job_states or self.job_documents:
+            header = dumps(
+                {
+                    "update": {
+                        "_index": JOB_STATES_INDEX,
+                        "_id": log.job_id,
+                        "retry_on_conflict": JOB_STATE_RETRIES,
+                    }
+                }
+            )
+            update = _job_state_update(log, with_event=self.job_documents)
+            action += header + b"\n" + dumps(update) + b"\n"
+        return action
+
+    def _indices(self, since: Optional[datetime], until: Optional[datetime]) -> str:
+        """Return the indices that can hold logs between since and until.
+
+        Index names are computed from ``index_postfix`` so a query over a
+        bounded time range only fans out to the matching daily indices.  We
+        fallback to every index when the range is unbounded or too wide.
+        Rollover indices can't be selected by name, they are always queried
+        and Elasticsearch skips the shards outside of the range.
+        """
+        step = _postfix_step(self.index_postfix)
+        if since is None or step is None:
+            return INDEX_PREFIX + "*"
+
+        until = until or datetime.now()
+        if (until - since) / step > MAX_QUERY_INDICES * 31 * 24:
+            return INDEX_PREFIX + "*"
+
+        names: Dict[str, None] = {}
+        current = since
+        while current < until:
+            names[INDEX_PREFIX + current.strftime(self.index_postfix)] = None
+            current += step
+        names[INDEX_PREFIX + until.strftime(self.index_postfix)] = None
+
+        if len(names) > MAX_QUERY_INDICES:
+            return INDEX_PREFIX + "*"
+        names[ROLLOVER_INDEX_PREFIX + "*"] = None
+        return ",".join(names)
+
+    @staticmethod
+    def _load_response(response: Dict[str, Any]) -> List[Log]:
+        return decode_logs(hit["_source"] for hit in response["hits"].get("hits", []))
+
+    def _init_requests(self) -> Requests[None]:
+        """Install the templates, and the rollover policy and first index."""
+        installed = set()
+        for name, template in self._templates():
+            response = yield "indices.get_template", {"name": name, "ignore": 404}
+            if not _template_is_current(response, name, template):
+                yield "indices.put_template", {"name": name, "body": template}
+                installed.add(name)
+        if self.rollover is not None:
+            policy = self.rollover.policy()
+            response = yield "ilm.get_lifecycle", {
+                "policy": ROLLOVER_POLICY,
+                "ignore": 404,
+            }
+            if not _policy_is_current(response, policy):
+                yield "ilm.put_lifecycle", {"policy": ROLLOVER_POLICY, "body": policy}
+            exists = yield "indices.exists_alias", {"name": ROLLOVER_ALIAS}
+            if not exists:
+                # Ignore the error of a backend creating it concurrently.
+                yield "indices.create", {
+                    "index": ROLLOVER_FIRST_INDEX,
+                    "body": ROLLOVER_FIRST_INDEX_BODY,
+                    "ignore": 400,
+                }
+        # Add the new properties to the indices created by an older template,
+        # when upgrading it.
+        if self.job_documents and "task-jobs-template" in installed:
+            yield "indices.put_mapping", {
+                "index": JOB_STATES_INDEX,
+                "body": {"properties": JOB_EVENTS_PROPERTIES},
+                "ignore": 404,
+            }
+        if not self.job_documents and "task-logs-template" in installed:
+            yield "indices.put_mapping", {
+                "index": INDEX_PREFIX + "*",
+                "body": {"properties": ADDED_LOG_PROPERTIES},
+                "ignore": 404,
+            }
+
+    def _job_state_requests(self, job_id: str) -> Requests[Optional[JobState]]:
+        try:
+            response = yield "get", {"index": JOB_STATES_INDEX, "id": job_id}
+        except NotFoundError:
+            return None
+        return _load_job_state(response["_source"])
+
+    def _jobs_by_status_requests(
+        self, statuses: Iterable[JobStatus], limit: int
+    ) -> Requests[List[JobState]]:
+        response = yield "search", {
+            "index": JOB_STATES_INDEX,
+            "body": _jobs_by_status_body(statuses, limit),
+            "ignore_unavailable": True,
+        }
+        return [_load_job_state(hit["_source"]) for hit in response["hits"]["hits"]]
+
+    def _traceback_requests(self, fingerprint: str) -> Requests[Optional[str]]:
+        try:
+            response = yield "get", {"index": TRACEBACKS_INDEX, "id": fingerprint}
+        except NotFoundError:
+            return None
+        return cast(str, response["_source"]["traceback"])
+
+    def _exception_fingerprints_requests(
+        self, since: Optional[datetime], until: Optional[datetime]
+    ) -> Requests[Dict[str, int]]:
+        response = yield "search", {
+            "index": self._indices(since, until),
+            "body": _exception_fingerprints_body(since, until),
+            "ignore_unavailable": True,
+        }
+        return _load_exception_fingerprints(response)
+
+    def _log_counts_requests(
+        self,
+        interval: timedelta,
+        since: Optional[datetime],
+        until: Optional[datetime],
+    ) -> Requests[List[LogCount]]:
+        response = yield "search", {
+            "index": self._indices(since, until),
+            "body": _log_counts_body(interval, since, until),
+            "ignore_unavailable": True,
+        }
+        return _load_log_counts(response)
+
+    def _queue_latency_requests(
+        self,
+        group_by: str,
+        percentiles: Sequence[float],
+        since: Optional[datetime],
+        until: Optional[datetime],
+    ) -> Requests[Dict[str, Dict[float, float]]]:
+        check_stats_group(group_by)
+        if not (self.job_states or self.job_documents):
+            raise NotImplementedError("queue_latency() needs job_states=True.")
+        response = yield "search", {
+            "index": JOB_STATES_INDEX,
+            "body": _queue_latency_body(group_by, percentiles, since, until),
+            "ignore_unavailable": True,
+        }
+        return _load_queue_latency(response)
+
+    def _job_queues_requests(
+        self, job_ids: Iterable[str]
+    ) -> Requests[Dict[str, Optional[str]]]:
+        """Read the queue of each job from its job state."""
+        job_ids = list(dict.fromkeys(job_ids))
+        queues: Dict[str, Optional[str]] = {}
+        for start in range(0, len(job_ids), FIND_JOBS_SIZE):
+            response = yield "mget", {
+                "index": JOB_STATES_INDEX,
+                "body": {"ids": job_ids[start : start + FIND_JOBS_SIZE]},
+                "_source_includes": ["queue"],
+            }
+            queues.update(_load_job_queues(response))
+        return queues
+
+    def _find_jobs_requests(
+        self,
+        job_ids: Iterable[str],
+        since: Optional[datetime],
+        until: Optional[datetime],
+    ) -> Requests[Dict[str, List[Log]]]:
+        job_ids = list(dict.fromkeys(job_ids))
+        if not job_ids:
+            return {}
+        if self.job_documents:
+            response = yield "mget", {
+                "index": JOB_STATES_INDEX,
+                "body": {"ids": job_ids},
+            }
+            sources = {
+                doc["_id"]: doc["_source"]
+                for doc in response["docs"]
+                if doc.get("found")
+            }
+            return {
+                job_id: _load_events(sources.get(job_id, {}), None, since, until)
+                for job_id in job_ids
+            }
+
+        response = yield "search", {
+            "index": self._indices(since, until),
+            "body": _find_jobs_body(job_ids, since, until),
+            "ignore_unavailable": True,
+        }
+        if len(response["hits"]["hits"]) < FIND_JOBS_SIZE:
+            return _group_jobs(job_ids, self._load_response(response))
+
+        jobs = _group_jobs(job_ids, [])
+        cursor: Optional[str] = None
+        while True:
+            page = yield from self._search_page_requests(
+                {"terms": {"job_id": job_ids}},
+                since=since,
+                until=until,
+                page_size=FIND_JOBS_SIZE,
+                cursor=cursor,
+            )
+            for log in page.logs:
+                jobs[log.job_id].append(log)
+            if page.cursor is None:
+                return jobs
+            cursor = page.cursor
+
+    def _search_page_requests(
+        self,
+        query: Dict[str, Any],
+        *,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        page_size: int,
+        cursor: Optional[str],
+    ) -> Requests[LogPage]:
+        """Fetch a page of logs with search_after over a point in time.
+
+        The first page is a plain search of one more log than the page, a
+        point in time is only opened when that extra log shows more pages
+        follow.  The first page is still returned from that search, see
+        _split_first_page().  The cursor holds the point in time id and the
+        sort values of the last returned hit, so a page can be resumed for as
+        long as the point in time is kept alive (``PIT_KEEP_ALIVE`` after the
+        last request).  It's closed after the last page, or a failed search.
+        """
+        check_page_size(page_size)
+        search_after = None
+        if cursor is None:
+            response = yield "search", {
+                "index": self._indices(since, until),
+                "body": _search_page_body(
+                    query, since=since, until=until, page_size=page_size + 1
+                ),
+                "ignore_unavailable": True,
+            }
+            hits = response["hits"]["hits"]
+            if len(hits) <= page_size:
+                return LogPage(logs=self._load_response(response), cursor=None)
+
+            response = yield "open_point_in_time", {
+                "index": self._indices(since, until),
+                "keep_alive": PIT_KEEP_ALIVE,
+                "ignore_unavailable": True,
+            }
+            pit_id = response["id"]
+            first_page = _split_first_page(hits, page_size)
+            if first_page is not None:
+                page, search_after = first_page
+                return LogPage(
+                    logs=decode_logs(hit["_source"] for hit in page),
+                    cursor=_encode_cursor(pit_id, search_after),
+                )
+        else:
+            pit_id, search_after, _ = _decode_cursor(cursor)
+
+        body = _search_page_body(
+            query,
+            since=since,
+            until=until,
+            page_size=page_size,
+            pit_id=pit_id,
+            search_after=search_after,
+        )
+        try:
+            response = yield "search", {"body": body}
+        except Exception:
+            yield "close_point_in_time", {"body": {"id": pit_id}, "ignore": 404}
+            raise
+        pit_id = response.get("pit_id", pit_id)
+        hits = response["hits"]["hits"]
+        logs = self._load_response(response)
+        if len(hits) < page_size:
+            yield "close_point_in_time", {"body": {"id": pit_id}}
+            return LogPage(logs=logs, cursor=None)
+
+        cursor = _encode_cursor(pit_id, hits[-1]["sort"])
+        return LogPage(logs=logs, cursor=cursor)  # noqa: B901
+
+
+class ElasticsearchBackend(_ElasticsearchBase, WriterBackend, ReaderBackend):
+    """Store logs in daily Elasticsearch indices.
+
+    By default every log is indexed with its own request, and ``write_many()``
+    sends its logs in a single ``_bulk`` request.  With ``bulk=True``,
+    logs are buffered in memory and sent through the ``_bulk`` API once
+    ``bulk_max_docs`` logs or ``bulk_max_bytes`` bytes are buffered, or once
+    the oldest buffered log is ``bulk_max_age`` seconds old.  Call ``flush()``
+    or ``close()`` to send the remaining logs on shutdown.
+
+    With ``job_states=True``, the summary of each job in ``JOB_STATES_INDEX``
+    is updated along with every log, so ``job_state()``, ``in_flight_jobs()``
+    and ``failed_jobs()`` don't have to aggregate logs.  ``log_counts()`` by
+    task is computed with aggregations.  By queue, it counts the logs read
+    back, as only enqueued logs hold their queue.  ``queue_latency()``, and
+    so ``stats()``, need job states: it's an aggregation over them, and
+    raises NotImplementedError without them.
+
+    With ``job_documents=True``, logs aren't indexed on their own: they are
+    appended to the ``events`` of the job summary instead, so each job is a
+    single document.  ``find_job()`` returns the same logs from that document.
+    The other readers page through the matching job documents, most recently
+    updated first, and return the logs of each job newest first: logs aren't
+    sorted across jobs.  Events aren't indexed, so a search, or the ``text``
+    of a LogFilter, only matches the fields of the job summary, such as its
+    ``last_exception``, and returns every log of the matching jobs.
+
+    With ``fingerprint_exceptions=True``, exception logs only hold their
+    fingerprint, class and message.  Tracebacks are indexed once per
+    fingerprint in ``TRACEBACKS_INDEX``.
+
+    With ``rollover``, an IndexRollover, logs are written through
+    ``ROLLOVER_ALIAS`` to indices rolled over by size and deleted by their
+    lifecycle policy.  Readers query both layouts, so daily indices written
+    before switching to rollover are still read, ``index_postfix`` is used
+    to select them.
+    """
+
     def __init__(
         self,
-        connections: Any,
+        connections: Any = None,
         *,
+        client: Optional[Elasticsearch] = None,
         index_postfix: str = "%Y.%m.%d",
+        rollover: Optional[IndexRollover] = None,
         force_refresh: bool = False,
+        bulk: bool = False,
+        bulk_max_docs: int = 500,
+        bulk_max_bytes: int = 5 * 1024 * 1024,
+        bulk_max_age: Optional[float] = 1.0,
+        job_states: bool = False,
+        job_documents: bool = False,
+        fingerprint_exceptions: bool = False,
         **options: Any,
     ) -> None:
-        self.es = Elasticsearch(
-            connections, serializer=JSONSerializerWithError(), **options
-        )
+        if client is None:
+            client = create_client(connections, **options)
+        elif connections is not None or options:
+            raise ValueError("Pass either a client or connections and options.")
+        self.es = client
         self.index_postfix = index_postfix
+        self.rollover = rollover
         self.force_refresh = force_refresh
+        self.job_states = job_states
+        self.job_documents = job_documents
+        self.fingerprint_exceptions = fingerprint_exceptions
+        self._stored_fingerprints = collections.OrderedDict()
+        self._pending_fingerprints = set()
+        self._stored_fingerprints_lock = threading.Lock()
 
-        self._init()
+        self.bulk = bulk
+        self.bulk_max_docs = bulk_max_docs
+        self.bulk_max_bytes = bulk_max_bytes
+        self.bulk_max_age = bulk_max_age
+        self._bulk_lock = threading.Lock()
+        self._bulk_buffer: List[bytes] = []
+        self._bulk_buffer_bytes = 0
+        self._bulk_buffer_since = 0.0
+        self._bulk_closed = threading.Event()
+        self._bulk_flusher: Optional[threading.Thread] = None
+        if bulk and bulk_max_age is not None:
+            self._bulk_flusher = threading.Thread(
+                target=self._flush_periodically,
+                name="task-logs-bulk-flusher",
+                daemon=True,
+            )
+            self._bulk_flusher.start()
+
+        self._initialized = False
+        self._init_lock = threading.Lock()
 
     def write(self, log: Log) -> None:
-        index = INDEX_PREFIX + log.timestamp.strftime(self.index_postfix)
-        self.es.index(
-            index=index, body=dataclasses.asdict(log), refresh=self.force_refresh
-        )
+        if self.bulk:
+            self.write_many([log])
+            return
+
+        self._init()
+        traceback = self._new_traceback(log)
+        if traceback is not None:
+            try:
+                self.es.index(
+                    index=TRACEBACKS_INDEX,
+                    id=traceback.fingerprint,
+                    body=dumps(_traceback_source(traceback)),
+                    refresh=self.force_refresh,
+                )
+            except Exception:
+                self._traceback_written(traceback.fingerprint, stored=False)
+                raise
+            self._traceback_written(traceback.fingerprint, stored=True)
+        if not self.job_documents:
+            self.es.index(
+                index=self._index_name(log),
+                body=encode_log(log),
+                refresh=self.force_refresh,
+            )
+        if self.job_states or self.job_documents:
+            self.es.update(
+                index=JOB_STATES_INDEX,
+                id=log.job_id,
+                body=dumps(_job_state_update(log, with_event=self.job_documents)),
+                retry_on_conflict=JOB_STATE_RETRIES,
+                refresh=self.force_refresh,
+            )
+
+    def write_many(self, logs: Iterable[Log]) -> None:
+        actions = [self._bulk_action(log) for log in logs]
+        if not self.bulk:
+            if actions:
+                self._send_bulk(actions)
+            return
+
+        with self._bulk_lock:
+            if not self._bulk_buffer:
+                self._bulk_buffer_since = time.monotonic()
+            for action in actions:
+                self._bulk_buffer.append(action)
+                self._bulk_buffer_bytes += len(action)
+            payload = None
+            if (
+                len(self._bulk_buffer) >= self.bulk_max_docs
+                or self._bulk_buffer_bytes >= self.bulk_max_bytes
+            ):
+                payload = self._take_bulk_buffer()
+
+        if payload:
+            self._send_bulk(payload)
+
+    def flush(self) -> None:
+        with self._bulk_lock:
+            payload = self._take_bulk_buffer()
+        if payload:
+            self._send_bulk(payload)
+
+    def close(self) -> None:
+        self._bulk_closed.set()
+        if self._bulk_flusher is not None:
+            self._bulk_flusher.join()
+        self.flush()
+
+    def _take_bulk_buffer(self) -> List[bytes]:
+        payload = self._bulk_buffer
+        self._bulk_buffer = []
+        self._bulk_buffer_bytes = 0
+        return payload
+
+    def _send_bulk(self, payload: List[bytes]) -> None:
+        self._init()
+        try:
+            response = self.es.bulk(body=b"".join(payload), refresh=self.force_refresh)
+        except Exception:
+            self._bulk_written(None)
+            raise
+        self._bulk_written(response)
+        _check_bulk_response(response)
+
+    def _flush_periodically(self) -> None:
+        assert self.bulk_max_age is not None
+        timeout = self.bulk_max_age
+        while not self._bulk_closed.wait(timeout):
+            timeout = self.bulk_max_age
+            payload = None
+            with self._bulk_lock:
+                if self._bulk_buffer:
+                    age = time.monotonic() - self._bulk_buffer_since
+                    if age >= self.bulk_max_age:
+                        payload = self._take_bulk_buffer()
+                    else:
+                        timeout = self.bulk_max_age - age
+
+            if not payload:
+                continue
+
+            try:
+                self._send_bulk(payload)
+            except Exception:
+                logger.exception("Failed to flush %d buffered log(s).", len(payload))
 
     def _init(self) -> None:
-        self.es.indices.put_template(name="task-logs-template", body=TASK_LOGS_TEMPLATE)
-
-    def search(self, query: str) -> List[Log]:
-        response = self.es.search(
-            index=INDEX_PREFIX + "*",
-            body={
-                "query": {"query_string": {"query": query}},
-                "sort": [{"timestamp": {"order": "desc"}}],
-            },
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            self._send(self._init_requests())
+            self._initialized = True
+
+    def _send(self, requests: Requests[T]) -> T:
+        """Send the requests of an operation, and return its result."""
+        try:
+            request = next(requests)
+            while True:
+                method, kwargs = request
+                try:
+                    response = _client_method(self.es, method)(**kwargs)
+                except Exception as error:
+                    request = requests.throw(error)
+                else:
+                    request = requests.send(response)
+        except StopIteration as stop:
+            return cast(T, stop.value)
+
+    def job_state(self, job_id: str) -> Optional[JobState]:
+        return self._send(self._job_state_requests(job_id))
+
+    def jobs_by_status(
+        self, *statuses: JobStatus, limit: int = DEFAULT_PAGE_SIZE
+    ) -> List[JobState]:
+        return self._send(self._jobs_by_status_requests(statuses, limit))
+
+    def traceback(self, fingerprint: str) -> Optional[str]:
+        return self._send(self._traceback_requests(fingerprint))
+
+    def exception_fingerprints(
+        self, *, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        if self.job_documents:
+            return super().exception_fingerprints(since=since, until=until)
+        return self._send(self._exception_fingerprints_requests(since, until))
+
+    def log_counts(
+        self,
+        *,
+        interval: timedelta = DEFAULT_STATS_INTERVAL,
+        group_by: str = "task_id",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[LogCount]:
+        check_stats_group(group_by)
+        if self.job_documents or group_by == "queue":
+            return super().log_counts(
+                interval=interval, group_by=group_by, since=since, until=until
+            )
+        return self._send(self._log_counts_requests(interval, since, until))
+
+    def queue_latency(
+        self,
+        *,
+        group_by: str = "task_id",
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Dict[float, float]]:
+        return self._send(
+            self._queue_latency_requests(group_by, percentiles, since, until)
         )
 
-        return self._load_response(response)
+    def _job_queues(self, job_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        if not (self.job_states or self.job_documents):
+            return super()._job_queues(job_ids)
+        return self._send(self._job_queues_requests(job_ids))
 
-    def find_job(self, job_id: str) -> List[Log]:
-        response = self.es.search(
-            index=INDEX_PREFIX + "*",
-            body={
-                "query": {"term": {"job_id": job_id}},
-                "sort": [{"timestamp": {"order": "desc"}}],
-            },
+    def search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return list(self.iter_search(query, since=since, until=until))
+
+    def find_job(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        if self.job_documents:
+            try:
+                response = self.es.get(index=JOB_STATES_INDEX, id=job_id)
+            except NotFoundError:
+                return []
+            return _load_events(response["_source"], None, since, until)
+        return list(self.iter_find_job(job_id, since=since, until=until))
+
+    def find_jobs(
+        self,
+        job_ids: Iterable[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, List[Log]]:
+        """Fetch the logs of every job with a single terms query.
+
+        Logs past the first FIND_JOBS_SIZE are fetched through a point in
+        time.  With job_documents, the job documents are fetched with mget.
+        """
+        return self._send(self._find_jobs_requests(job_ids, since, until))
+
+    def logs_by_type(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return list(self.iter_logs_by_type(type, since=since, until=until))
+
+    def search_page(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        if self.job_documents:
+            return self._job_documents_page(
+                {"query_string": {"query": query}},
+                since=since,
+                until=until,
+                page_size=page_size,
+                cursor=cursor,
+            )
+        return self._search_page(
+            {"query_string": {"query": query}},
+            since=since,
+            until=until,
+            page_size=page_size,
+            cursor=cursor,
         )
 
-        return self._load_response(response)
+    def find_job_page(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        if self.job_documents:
+            return super().find_job_page(
+                job_id, since=since, until=until, page_size=page_size, cursor=cursor
+            )
+        return self._search_page(
+            {"term": {"job_id": job_id}},
+            since=since,
+            until=until,
+            page_size=page_size,
+            cursor=cursor,
+        )
 
-    def logs_by_type(self, type: Optional[str]) -> List[Log]:
-        query: Dict[str, Any] = {"match_all": {}}
-        if type is not None:
-            query = {"term": {"type": type}}
+    def logs_by_type_page(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        if self.job_documents:
+            query: Dict[str, Any] = {"match_all": {}}
+            if type is not None:
+                query = {"term": {"event_types": type}}
+            return self._job_documents_page(
+                query,
+                type=type,
+                since=since,
+                until=until,
+                page_size=page_size,
+                cursor=cursor,
+            )
+        return self._search_page(
+            _logs_by_type_query(type),
+            since=since,
+            until=until,
+            page_size=page_size,
+            cursor=cursor,
+        )
 
-        response = self.es.search(
-            index=INDEX_PREFIX + "*",
-            body={"query": query, "sort": [{"timestamp": {"order": "desc"}}]},
+    def filter_logs(self, log_filter: LogFilter) -> List[Log]:
+        return list(self.iter_filter_logs(log_filter))
+
+    def filter_logs_page(
+        self,
+        log_filter: LogFilter,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        if self.job_documents:
+            # The text only matches job documents, not their logs.
+            matches = dataclasses.replace(log_filter, text=None).matches
+            return self._job_documents_page(
+                _job_documents_query(log_filter),
+                type=log_filter.type,
+                matches=matches,
+                since=log_filter.since,
+                until=log_filter.until,
+                page_size=page_size,
+                cursor=cursor,
+            )
+        return self._search_page(
+            _filter_query(log_filter),
+            since=log_filter.since,
+            until=log_filter.until,
+            page_size=page_size,
+            cursor=cursor,
         )
 
-        return self._load_response(response)
+    def _job_documents_page(
+        self,
+        query: Dict[str, Any],
+        *,
+        type: Optional[str] = None,
+        matches: Optional[Callable[[Log], bool]] = None,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        page_size: int,
+        cursor: Optional[str],
+    ) -> LogPage:
+        """Fetch a page of the logs of the job documents matching query.
+
+        Job documents are updated by every log, so they are read through a
+        point in time opened by the first page.  A page holds at most
+        page_size logs, it stops in the middle of a job holding more: the
+        cursor holds the sort values of the last job whose logs were all
+        returned, and how many logs of the next job were.
+        """
+        check_page_size(page_size)
+        if cursor is None:
+            pit_id = self.es.open_point_in_time(
+                index=JOB_STATES_INDEX,
+                keep_alive=PIT_KEEP_ALIVE,
+                ignore_unavailable=True,
+            )["id"]
+            search_after, skip = None, 0
+        else:
+            pit_id, search_after, skip = _decode_cursor(cursor)
 
-    @classmethod
-    def _load_response(cls, response: Dict[str, Any]) -> List[Log]:
         logs: List[Log] = []
-        for hit in response["hits"].get("hits", []):
-            log_data = cls._load_datetimes(hit["_source"])
-            log = LOG_TYPE_FACTORIES[log_data["type"]](**log_data)
-            logs.append(log)
+        try:
+            while True:
+                body = _job_documents_body(
+                    query,
+                    since=since,
+                    page_size=page_size,
+                    pit_id=pit_id,
+                    search_after=search_after,
+                )
+                response = self.es.search(body=body)
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                for hit in hits:
+                    events = _load_events(hit["_source"], type, since, until)
+                    if matches is not None:
+                        events = [log for log in events if matches(log)]
+                    taken = events[skip : skip + page_size - len(logs)]
+                    logs.extend(taken)
+                    if skip + len(taken) < len(events):
+                        cursor = _encode_cursor(pit_id, search_after, skip + len(taken))
+                        return LogPage(logs=logs, cursor=cursor)
+                    search_after, skip = hit["sort"], 0
+                    if len(logs) == page_size:
+                        cursor = _encode_cursor(pit_id, search_after)
+                        return LogPage(logs=logs, cursor=cursor)
+                if len(hits) < page_size:
+                    break
+        except Exception:
+            self.es.close_point_in_time(body={"id": pit_id}, ignore=404)
+            raise
 
-        return logs
+        self.es.close_point_in_time(body={"id": pit_id})
+        return LogPage(logs=logs, cursor=None)
 
-    @staticmethod
-    def _load_datetimes(hit: Dict[str, Any]) -> Dict[str, Any]:
-        hit["timestamp"] = datetime.strptime(hit["timestamp"][:19], "%Y-%m-%dT%H:%M:%S")
-        job = hit.get("job")
-        if job and job.get("execute_at"):
-            job["execute_at"] = datetime.strptime(
-                job["execute_at"], "%Y-%m-%dT%H:%M:%S"
+    def _search_page(
+        self,
+        query: Dict[str, Any],
+        *,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        page_size: int,
+        cursor: Optional[str],
+    ) -> LogPage:
+        return self._send(
+            self._search_page_requests(
+                query, since=since, until=until, page_size=page_size, cursor=cursor
             )
-        return hit
+        )
@@ -0,0 +1,352 @@
+import bisect
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .backend import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_PERCENTILES,
+    DEFAULT_STATS_INTERVAL,
+    JobState,
+    JobStatus,
+    Log,
+    LogCount,
+    LogFilter,
+    LogPage,
+    LogType,
+    ReaderBackend,
+    Task,
+    WriterBackend,
+    apply_job_log,
+    check_page_size,
+    check_stats_group,
+    count_logs,
+    in_time_range,
+    job_latencies,
+    split_traceback,
+)
+
+
+class _Index:
+    """Logs in the order they were written, with their sequence number.
+
+    Sequence numbers increase, so the logs before a pagination cursor are
+    found by bisection.  Evicted logs are only removed from the lists once
+    they are half of them, which keeps eviction O(1) amortized.
+    """
+
+    __slots__ = ("sequences", "logs", "start")
+
+    def __init__(self) -> None:
+        self.sequences: List[int] = []
+        self.logs: List[Log] = []
+        self.start = 0
+
+    def __len__(self) -> int:
+        return len(self.logs) - self.start
+
+    def append(self, sequence: int, log: Log) -> None:
+        self.sequences.append(sequence)
+        self.logs.append(log)
+
+    def popleft(self) -> Log:
+        log = self.logs[self.start]
+        self.start += 1
+        if self.start * 2 >= len(self.logs):
+            del self.sequences[: self.start]
+            del self.logs[: self.start]
+            self.start = 0
+        return log
+
+    def newest_first(self, before: Optional[int] = None) -> Iterator[Tuple[int, Log]]:
+        """Iterate over the logs written before the ``before`` sequence."""
+        end = len(self.logs)
+        if before is not None:
+            end = bisect.bisect_left(self.sequences, before, self.start, end)
+        for i in range(end - 1, self.start - 1, -1):
+            yield self.sequences[i], self.logs[i]
+
+
+class MemoryBackend(ReaderBackend, WriterBackend):
+    """Keep logs in memory, indexed by job id, task id and log type.
+
+    Writes are O(1) and readers only walk the logs of the requested job, task
+    or type, newest first.  With ``capacity``, only the most recent logs are
+    kept: the oldest log is evicted when a new log is written.
+
+    With ``fingerprint_exceptions``, tracebacks are kept once per fingerprint
+    and aren't evicted.
+    """
+
+    def __init__(
+        self, *, capacity: Optional[int] = None, fingerprint_exceptions: bool = False
+    ) -> None:
+        self.capacity = capacity
+        self.fingerprint_exceptions = fingerprint_exceptions
+
+        self._lock = threading.Lock()
+        self._sequence = 0
+        # Logs are stored with a sequence number, used as pagination cursor.
+        self._logs = _Index()
+        self._by_job: Dict[str, _Index] = {}
+        self._by_task: Dict[str, _Index] = {}
+        self._by_type: Dict[str, _Index] = {}
+        self._job_states: Dict[str, JobState] = {}
+        self._tracebacks: Dict[str, str] = {}
+
+    def write(self, log: Log) -> None:
+        log, traceback = split_traceback(log)
+        with self._lock:
+            if traceback is not None:
+                self._tracebacks.setdefault(traceback.fingerprint, traceback.traceback)
+            if self.capacity is not None and len(self._logs) >= self.capacity:
+                self._evict()
+
+            sequence = self._sequence
+            self._sequence += 1
+            self._logs.append(sequence, log)
+            self._by_job.setdefault(log.job_id, _Index()).append(sequence, log)
+            self._by_task.setdefault(log.task_id, _Index()).append(sequence, log)
+            self._by_type.setdefault(log.type, _Index()).append(sequence, log)
+
+            apply_job_log(self._job_states, log)
+
+    def _evict(self) -> None:
+        # Indexes are appended in the same order as _logs, so the evicted log
+        # is always the first entry of its indexes.
+        log = self._logs.popleft()
+        for index, key in (
+            (self._by_job, log.job_id),
+            (self._by_task, log.task_id),
+            (self._by_type, log.type),
+        ):
+            entries = index[key]
+            entries.popleft()
+            if not entries:
+                del index[key]
+        if log.job_id not in self._by_job:
+            del self._job_states[log.job_id]
+
+    def __len__(self) -> int:
+        return len(self._logs)
+
+    def search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return self._select(self._logs, since, until, lambda log: query in str(log))
+
+    def find_job(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return self._select(self._by_job.get(job_id), since, until)
+
+    def logs_by_type(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return self._select(self._type_entries(type), since, until)
+
+    def search_page(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return self._page(
+            self._logs,
+            since,
+            until,
+            page_size,
+            cursor,
+            lambda log: query in str(log),
+        )
+
+    def find_job_page(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return self._page(self._by_job.get(job_id), since, until, page_size, cursor)
+
+    def logs_by_type_page(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return self._page(self._type_entries(type), since, until, page_size, cursor)
+
+    def filter_logs(self, log_filter: LogFilter) -> List[Log]:
+        return self._select(
+            self._filter_entries(log_filter),
+            log_filter.since,
+            log_filter.until,
+            log_filter.matches,
+        )
+
+    def filter_logs_page(
+        self,
+        log_filter: LogFilter,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        return self._page(
+            self._filter_entries(log_filter),
+            log_filter.since,
+            log_filter.until,
+            page_size,
+            cursor,
+            log_filter.matches,
+        )
+
+    def list_task(self) -> List[Task]:
+        with self._lock:
+            return [Task(id=task_id) for task_id in self._by_task]
+
+    def job_state(self, job_id: str) -> Optional[JobState]:
+        return self._job_states.get(job_id)
+
+    def jobs_by_status(
+        self, *statuses: JobStatus, limit: int = DEFAULT_PAGE_SIZE
+    ) -> List[JobState]:
+        with self._lock:
+            states = [s for s in self._job_states.values() if s.status in statuses]
+        states.sort(key=lambda s: s.updated_at, reverse=True)
+        return states[:limit]
+
+    def traceback(self, fingerprint: str) -> Optional[str]:
+        return self._tracebacks.get(fingerprint)
+
+    def log_counts(
+        self,
+        *,
+        interval: timedelta = DEFAULT_STATS_INTERVAL,
+        group_by: str = "task_id",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[LogCount]:
+        check_stats_group(group_by)
+        logs = self._select(self._logs, since, until)
+        if group_by == "task_id":
+            return count_logs(logs, interval, lambda log: log.task_id)
+        # Job states aren't evicted, they keep the queue of evicted jobs.
+        with self._lock:
+            queues = {log.job_id: self._job_states[log.job_id].queue for log in logs}
+        return count_logs(logs, interval, lambda log: queues[log.job_id])
+
+    def queue_latency(
+        self,
+        *,
+        group_by: str = "task_id",
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Dict[float, float]]:
+        check_stats_group(group_by)
+        with self._lock:
+            states = list(self._job_states.values())
+        return job_latencies(states, group_by, percentiles, since, until)
+
+    def _type_entries(self, type: Optional[str]) -> Optional[_Index]:
+        if type is None:
+            return self._logs
+        return self._by_type.get(type)
+
+    def _filter_entries(self, log_filter: LogFilter) -> Optional[_Index]:
+        """Return the smallest index holding every log matching the filter."""
+        keys = []
+        if log_filter.task_id is not None:
+            keys.append((self._by_task, log_filter.task_id))
+        if log_filter.type is not None:
+            keys.append((self._by_type, log_filter.type))
+        if log_filter.job_details:
+            keys.append((self._by_type, LogType.ENQUEUED))
+
+        entries = self._logs
+        for index, key in keys:
+            candidate = index.get(key)
+            if candidate is None:
+                return None
+            if len(candidate) < len(entries):
+                entries = candidate
+        return entries
+
+    def _select(
+        self,
+        entries: Optional[_Index],
+        since: Optional[datetime],
+        until: Optional[datetime],
+        predicate: Optional[Callable[[Log], bool]] = None,
+    ) -> List[Log]:
+        if entries is None:
+            return []
+
+        with self._lock:
+            if since is None and until is None and predicate is None:
+                return [log for _, log in entries.newest_first()]
+            return [
+                log
+                for _, log in entries.newest_first()
+                if in_time_range(log, since, until)
+                and (predicate is None or predicate(log))
+            ]
+
+    def _page(
+        self,
+        entries: Optional[_Index],
+        since: Optional[datetime],
+        until: Optional[datetime],
+        page_size: int,
+        cursor: Optional[str],
+        predicate: Optional[Callable[[Log], bool]] = None,
+    ) -> LogPage:
+        """Return the logs written before the cursor, newest first.
+
+        The cursor is the sequence number of the last returned log, so pages
+        stay consistent while new logs are written.
+        """
+        check_page_size(page_size)
+        try:
+            before = int(cursor) if cursor is not None else None
+        except ValueError:
+            raise ValueError("Invalid cursor: {!r}".format(cursor)) from None
+
+        logs: List[Log] = []
+        if entries is None:
+            return LogPage(logs=logs, cursor=None)
+
+        last_sequence = None
+        with self._lock:
+            for sequence, log in entries.newest_first(before):
+                if not in_time_range(log, since, until):
+                    continue
+                if predicate is not None and not predicate(log):
+                    continue
+                if len(logs) == page_size:
+                    return LogPage(logs=logs, cursor=str(last_sequence))
+                logs.append(log)
+                last_sequence = sequence
+
+        return LogPage(logs=logs, cursor=None)
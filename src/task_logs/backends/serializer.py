@@ -0,0 +1,230 @@
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, cast
+
+from .backend import (
+    CompletedLog,
+    DequeuedLog,
+    EnqueuedLog,
+    ExceptionLog,
+    FailedLog,
+    FingerprintedExceptionLog,
+    JobDetails,
+    Log,
+    LogType,
+    format_exception,
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+def _default(data: Any) -> Any:
+    if isinstance(data, BaseException):
+        return format_exception(data)
+    if isinstance(data, (datetime, date)):
+        return data.isoformat()
+    if isinstance(data, uuid.UUID):
+        return str(data)
+    if isinstance(data, Decimal):
+        return float(data)
+    raise TypeError("Unable to serialize %r (type: %s)" % (data, type(data)))
+
+
+def _json_dumps(data: Any) -> bytes:
+    return json.dumps(
+        data, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+if orjson is not None:
+
+    def dumps(data: Any) -> bytes:
+        try:
+            return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson only encodes integers of up to 64 bits.
+            return _json_dumps(data)
+
+    loads = orjson.loads
+
+else:  # pragma: no cover
+    dumps = _json_dumps
+    loads = json.loads
+
+
+def _encode_log(log: Log) -> Dict[str, Any]:
+    return {
+        "type": log.type,
+        "timestamp": log.timestamp,
+        "job_id": log.job_id,
+        "task_id": log.task_id,
+    }
+
+
+def _encode_enqueued(log: Log) -> Dict[str, Any]:
+    job = cast(EnqueuedLog, log).job
+    data = _encode_log(log)
+    data["job"] = {
+        "queue": job.queue,
+        "task_path": job.task_path,
+        "execute_at": job.execute_at,
+        "args": job.args,
+        "kwargs": job.kwargs,
+        "options": job.options,
+    }
+    return data
+
+
+def _encode_completed(log: Log) -> Dict[str, Any]:
+    data = _encode_log(log)
+    data["result"] = cast(CompletedLog, log).result
+    return data
+
+
+def _encode_exception(log: Log) -> Dict[str, Any]:
+    data = _encode_log(log)
+    log = cast(ExceptionLog, log)
+    data["exception"] = format_exception(log.exception)
+    data["exception_class"] = log.exception_class
+    if isinstance(log, FingerprintedExceptionLog):
+        data["fingerprint"] = log.fingerprint
+    return data
+
+
+LOG_ENCODERS: Dict[LogType, Callable[[Log], Dict[str, Any]]] = {
+    LogType.ENQUEUED: _encode_enqueued,
+    LogType.DEQUEUED: _encode_log,
+    LogType.COMPLETED: _encode_completed,
+    LogType.EXCEPTION: _encode_exception,
+    LogType.FAILED: _encode_log,
+}
+
+
+def encode_log(log: Log, *, with_traceback: bool = False) -> bytes:
+    """Serialize a log to JSON without copying its payloads.
+
+    The result is the same document ``dataclasses.asdict`` would produce, but
+    ``args``, ``kwargs``, ``options`` and ``result`` are handed as-is to the
+    JSON encoder.  orjson is used when it is installed.  The traceback of
+    fingerprinted exceptions, stored apart, is only kept with
+    ``with_traceback``.
+    """
+    data = LOG_ENCODERS[log.type](log)
+    if with_traceback and isinstance(log, FingerprintedExceptionLog):
+        data["traceback"] = log.traceback
+    return dumps(data)
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, keeping its microseconds and offset."""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        # fromisoformat() only accepts the "Z" suffix since Python 3.11.
+        if value.endswith("Z"):
+            return datetime.fromisoformat(value[:-1] + "+00:00")
+        raise
+
+
+def _parse_optional_datetime(value: Optional[str]) -> Optional[datetime]:
+    return parse_datetime(value) if value else None
+
+
+def _decode_enqueued(data: Dict[str, Any]) -> Log:
+    job = data["job"]
+    return EnqueuedLog(
+        LogType.ENQUEUED,
+        parse_datetime(data["timestamp"]),
+        data["job_id"],
+        data["task_id"],
+        JobDetails(
+            job["queue"],
+            job.get("task_path"),
+            _parse_optional_datetime(job.get("execute_at")),
+            job.get("args"),
+            job.get("kwargs"),
+            job.get("options"),
+        ),
+    )
+
+
+def _decode_dequeued(data: Dict[str, Any]) -> Log:
+    return DequeuedLog(
+        LogType.DEQUEUED,
+        parse_datetime(data["timestamp"]),
+        data["job_id"],
+        data["task_id"],
+    )
+
+
+def _decode_completed(data: Dict[str, Any]) -> Log:
+    return CompletedLog(
+        LogType.COMPLETED,
+        parse_datetime(data["timestamp"]),
+        data["job_id"],
+        data["task_id"],
+        data.get("result"),
+    )
+
+
+def _decode_exception(data: Dict[str, Any]) -> Log:
+    timestamp = parse_datetime(data["timestamp"])
+    fingerprint = data.get("fingerprint")
+    if fingerprint is not None:
+        return FingerprintedExceptionLog(
+            LogType.EXCEPTION,
+            timestamp,
+            data["job_id"],
+            data["task_id"],
+            data["exception"],
+            data["exception_class"],
+            fingerprint,
+            data.get("traceback"),
+        )
+    return ExceptionLog(
+        LogType.EXCEPTION,
+        timestamp,
+        data["job_id"],
+        data["task_id"],
+        data["exception"],
+        data.get("exception_class"),
+    )
+
+
+def _decode_failed(data: Dict[str, Any]) -> Log:
+    return FailedLog(
+        LogType.FAILED,
+        parse_datetime(data["timestamp"]),
+        data["job_id"],
+        data["task_id"],
+    )
+
+
+LOG_DECODERS: Dict[str, Callable[[Dict[str, Any]], Log]] = {
+    LogType.ENQUEUED: _decode_enqueued,
+    LogType.DEQUEUED: _decode_dequeued,
+    LogType.COMPLETED: _decode_completed,
+    LogType.EXCEPTION: _decode_exception,
+    LogType.FAILED: _decode_failed,
+}
+
+
+def decode_log(data: Dict[str, Any]) -> Log:
+    """Build a log from a document produced by ``encode_log``."""
+    return LOG_DECODERS[data["type"]](data)
+
+
+def decode_logs(documents: Iterable[Dict[str, Any]]) -> List[Log]:
+    """Build the logs of a page of documents produced by ``encode_log``.
+
+    Timestamps are parsed with ``datetime.fromisoformat``, so microseconds and
+    UTC offsets are kept, and each log is built positionally by the decoder
+    of its type.  The documents aren't modified.
+    """
+    decoders = LOG_DECODERS
+    return [decoders[data["type"]](data) for data in documents]
@@ -0,0 +1,218 @@
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Iterable, Optional, Set
+
+from .async_writer import AsyncWriterBackend
+from .backend import Log, WriterBackend
+from .serializer import decode_log, encode_log, loads
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two connection attempts while the shipper isn't listening.
+CONNECT_RETRY_DELAY = 0.1
+
+
+class ShippingBackend(WriterBackend):
+    """Send logs to the LogShipper listening on the Unix socket at ``path``.
+
+    Logs are sent one JSON document per line over a connection opened on the
+    first write.  The first connection is retried for up to ``timeout``
+    seconds, so processes can start before the shipper.  A failed send is
+    retried once on a new connection, then the error is raised.  Once the
+    shipper was unavailable, connecting is only tried again after
+    ``retry_interval`` seconds and writes until then raise ConnectionError
+    without waiting: wrap the backend with SpoolingBackend to keep the logs
+    while the shipper is unavailable.  ``fingerprint_exceptions`` must match
+    the option of the shipper backend.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        timeout: float = 5.0,
+        retry_interval: float = 1.0,
+        fingerprint_exceptions: bool = False,
+    ) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.fingerprint_exceptions = fingerprint_exceptions
+
+        self._lock = threading.Lock()
+        self._socket: Optional[socket.socket] = None
+        self._wait_for_shipper = True
+        self._retry_at = 0.0
+
+    def write(self, log: Log) -> None:
+        self.write_many([log])
+
+    def write_many(self, logs: Iterable[Log]) -> None:
+        data = b"".join(encode_log(log, with_traceback=True) + b"\n" for log in logs)
+        if not data:
+            return
+
+        with self._lock:
+            connection = self._connection()
+            try:
+                connection.sendall(data)
+            except OSError:
+                self._disconnect()
+                self._connection().sendall(data)
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+    def _connection(self) -> socket.socket:
+        if self._socket is not None:
+            return self._socket
+
+        now = time.monotonic()
+        if now < self._retry_at:
+            raise ConnectionError(
+                "The log shipper at {} is unavailable.".format(self.path)
+            )
+
+        # Only the first connection waits for the shipper to start.
+        deadline = now + self.timeout if self._wait_for_shipper else now
+        self._wait_for_shipper = False
+        while True:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            try:
+                connection.connect(self.path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                connection.close()
+                if time.monotonic() >= deadline:
+                    self._retry_at = time.monotonic() + self.retry_interval
+                    raise
+                time.sleep(CONNECT_RETRY_DELAY)
+                continue
+            except OSError:
+                connection.close()
+                self._retry_at = time.monotonic() + self.retry_interval
+                raise
+            self._socket = connection
+            return connection
+
+    def _disconnect(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class LogShipper:
+    """Receive logs from ShippingBackends and write them to ``backend``.
+
+    One shipper per host lets every worker process share the connections of
+    a single backend.  Received logs are written by an AsyncWriterBackend,
+    in batches of up to ``batch_size`` logs.  ``close()`` waits up to
+    ``timeout`` seconds for the connected processes to disconnect, then
+    writes the remaining logs and closes the backend.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        backend: WriterBackend,
+        *,
+        batch_size: int = 500,
+        max_queue_size: int = 10000,
+        timeout: float = 10.0,
+    ) -> None:
+        self.path = path
+        self.backend = backend
+        self.timeout = timeout
+
+        self._writer = AsyncWriterBackend(
+            backend, max_size=max_queue_size, batch_size=batch_size
+        )
+        self._connections: Set[socket.socket] = set()
+        self._disconnected = threading.Condition()
+
+        # A socket left by a shipper which didn't close.
+        if os.path.exists(path):
+            os.remove(path)
+        self._server = _Server(path, self)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="task-logs-shipper", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        # Stop new connections, then accept those already waiting.
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self._server.shutdown()
+        self._thread.join()
+        self._server.socket.setblocking(False)
+        while True:
+            try:
+                request, address = self._server.get_request()
+            except BlockingIOError:
+                break
+            self._server.process_request(request, address)
+
+        with self._disconnected:
+            if not self._disconnected.wait_for(
+                lambda: not self._connections, self.timeout
+            ):
+                logger.warning(
+                    "Closing the log shipper with %d process(es) connected.",
+                    len(self._connections),
+                )
+                # Their next write fails and reconnects to the next shipper.
+                for connection in self._connections:
+                    try:
+                        connection.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+        self._server.server_close()
+        self._writer.close()
+
+    def _connected(self, connection: socket.socket) -> None:
+        with self._disconnected:
+            self._connections.add(connection)
+
+    def _receive(self, connection: socket.socket, lines: Iterable[bytes]) -> None:
+        try:
+            for line in lines:
+                try:
+                    log = decode_log(loads(line))
+                except Exception:
+                    logger.warning("Skipping invalid log: %r.", line[:100])
+                    continue
+                self._writer.write(log)
+        finally:
+            with self._disconnected:
+                self._connections.discard(connection)
+                self._disconnected.notify_all()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        self.server.shipper._receive(self.connection, self.rfile)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Connections left open past the close() timeout are abandoned.
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, path: str, shipper: LogShipper) -> None:
+        self.shipper = shipper
+        super().__init__(path, _Handler)
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        # Count the connection before shutdown() returns.
+        self.shipper._connected(request)
+        super().process_request(request, client_address)
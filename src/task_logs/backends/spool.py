@@ -0,0 +1,291 @@
+import logging
+import os
+import threading
+import time
+from typing import BinaryIO, Dict, Iterable, List, Optional
+
+from .backend import Log, WriterBackend
+from .serializer import decode_log, encode_log, loads
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".spool"
+
+
+class _Segment:
+    __slots__ = ("path", "size", "logs", "replayed", "created_at")
+
+    def __init__(self, path: str, size: int, logs: int, created_at: float) -> None:
+        self.path = path
+        self.size = size
+        self.logs = logs
+        # Logs at the start of the segment already written to the backend.
+        self.replayed = 0
+        self.created_at = created_at
+
+
+class SpoolingBackend(WriterBackend):
+    """Spool logs to local files while the wrapped backend is failing.
+
+    Logs are written to the backend directly until a write fails.  The log is
+    then appended to a spool in ``directory``, as are the following logs until
+    the spool is drained.  Spooled logs are stored one per line in segment
+    files of up to ``segment_max_bytes``.  A replayer thread sends them to the
+    backend with ``write_many()`` in batches of ``batch_size`` logs, waiting
+    from ``backoff_initial`` up to ``backoff_max`` seconds between failures.
+
+    The spool holds at most ``max_bytes``, the oldest segments are dropped
+    beyond that.  Segments left by a previous process are replayed, logs are
+    delivered at least once.  See ``metrics()`` to monitor the spool.
+
+    The backend must write synchronously: an ElasticsearchBackend with
+    ``bulk=True`` is rejected, since it sends buffered logs from its own
+    thread where a failure can't be spooled.  Its ``write_many()`` already
+    sends a single ``_bulk`` request without buffering.
+    """
+
+    def __init__(
+        self,
+        backend: WriterBackend,
+        directory: str,
+        *,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        max_bytes: int = 1024 * 1024 * 1024,
+        batch_size: int = 500,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 60.0,
+    ) -> None:
+        # Checked by attribute, the Elasticsearch client is an optional extra.
+        if getattr(backend, "bulk", False):
+            raise ValueError(
+                "SpoolingBackend can't wrap a backend buffering logs, "
+                "pass bulk=False."
+            )
+
+        self.backend = backend
+        self.fingerprint_exceptions = backend.fingerprint_exceptions
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        self._active: Optional[_Segment] = None
+        self._active_file: Optional[BinaryIO] = None
+        self._replaying: Optional[_Segment] = None
+        self._next_sequence = 0
+        self._spooling = False
+        self._dropped = 0
+        self._replay_failures = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_segments()
+
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="task-logs-replayer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, log: Log) -> None:
+        self.write_many([log])
+
+    def write_many(self, logs: Iterable[Log]) -> None:
+        logs = list(logs)
+        if not logs:
+            return
+
+        if not self._spooling:
+            try:
+                self.backend.write_many(logs)
+                return
+            except Exception:
+                logger.warning(
+                    "Failed to write %d log(s), spooling to %s.",
+                    len(logs),
+                    self.directory,
+                    exc_info=True,
+                )
+        self._spool(logs)
+
+    def flush(self) -> None:
+        try:
+            self.backend.flush()
+        except Exception:
+            logger.exception("Failed to flush the backend.")
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wakeup.set()
+        self._thread.join()
+        with self._lock:
+            self._close_active()
+        try:
+            self.backend.close()
+        except Exception:
+            logger.exception("Failed to close the backend.")
+
+    def metrics(self) -> Dict[str, float]:
+        """Return the spool depth and how far behind the replay is.
+
+        ``replay_lag_seconds`` is the age of the oldest segment not yet
+        replayed, 0 when the spool is empty.
+        """
+        with self._lock:
+            segments = self._all_segments()
+            oldest = min((s.created_at for s in segments), default=None)
+            return {
+                "spooled_logs": sum(s.logs - s.replayed for s in segments),
+                "spool_bytes": sum(s.size for s in segments),
+                "spool_segments": len(segments),
+                "dropped_logs": self._dropped,
+                "replay_failures": self._replay_failures,
+                "replay_lag_seconds": (
+                    max(time.time() - oldest, 0.0) if oldest is not None else 0.0
+                ),
+            }
+
+    def _all_segments(self) -> List[_Segment]:
+        segments = list(self._segments)
+        if self._replaying is not None:
+            segments.insert(0, self._replaying)
+        if self._active is not None:
+            segments.append(self._active)
+        return segments
+
+    def _load_segments(self) -> None:
+        names = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        for name in names:
+            path = os.path.join(self.directory, name)
+            with open(path, "rb") as f:
+                logs = sum(1 for _ in f)
+            stat = os.stat(path)
+            self._segments.append(_Segment(path, stat.st_size, logs, stat.st_mtime))
+            self._next_sequence = int(name[: -len(SEGMENT_SUFFIX)]) + 1
+        if self._segments:
+            self._spooling = True
+
+    def _spool(self, logs: List[Log]) -> None:
+        lines = [encode_log(log, with_traceback=True) + b"\n" for log in logs]
+        with self._lock:
+            self._spooling = True
+            for line in lines:
+                if self._active is None or (
+                    self._active.size + len(line) > self.segment_max_bytes
+                    and self._active.logs
+                ):
+                    self._rotate()
+                assert self._active is not None and self._active_file is not None
+                self._active_file.write(line)
+                self._active.size += len(line)
+                self._active.logs += 1
+            if self._active_file is not None:
+                self._active_file.flush()
+            self._enforce_max_bytes()
+        self._wakeup.set()
+
+    def _rotate(self) -> None:
+        self._close_active()
+        path = os.path.join(
+            self.directory, "%012d%s" % (self._next_sequence, SEGMENT_SUFFIX)
+        )
+        self._next_sequence += 1
+        self._active = _Segment(path, 0, 0, time.time())
+        self._active_file = open(path, "ab")
+
+    def _close_active(self) -> None:
+        if self._active_file is not None:
+            self._active_file.close()
+            self._active_file = None
+        if self._active is not None:
+            self._segments.append(self._active)
+            self._active = None
+
+    def _enforce_max_bytes(self) -> None:
+        # The active and the replaying segments are never dropped.
+        total = sum(s.size for s in self._all_segments())
+        while total > self.max_bytes and self._segments:
+            segment = self._segments.pop(0)
+            total -= segment.size
+            self._dropped += segment.logs
+            _remove(segment.path)
+            logger.warning(
+                "Spool is full, dropped %d log(s) from %s.", segment.logs, segment.path
+            )
+
+    def _claim_segment(self) -> Optional[_Segment]:
+        with self._lock:
+            if self._replaying is None:
+                if not self._segments and self._active is not None:
+                    self._close_active()
+                if self._segments:
+                    self._replaying = self._segments.pop(0)
+                else:
+                    self._spooling = False
+            return self._replaying
+
+    def _run(self) -> None:
+        backoff = self.backoff_initial
+        while not self._closed.is_set():
+            segment = self._claim_segment()
+            if segment is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            try:
+                if not self._replay(segment):
+                    return
+            except Exception:
+                logger.warning(
+                    "Failed to replay %s, retrying in %.1fs.",
+                    segment.path,
+                    backoff,
+                    exc_info=True,
+                )
+                with self._lock:
+                    self._replay_failures += 1
+                self._closed.wait(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+                continue
+
+            backoff = self.backoff_initial
+            with self._lock:
+                _remove(segment.path)
+                self._replaying = None
+                if not self._segments and self._active is None:
+                    self._spooling = False
+
+    def _replay(self, segment: _Segment) -> bool:
+        """Write the logs of the segment, False if interrupted by close()."""
+        with open(segment.path, "rb") as f:
+            lines = f.readlines()
+
+        for start in range(segment.replayed, len(lines), self.batch_size):
+            if self._closed.is_set():
+                return False
+            batch = []
+            for line in lines[start : start + self.batch_size]:
+                try:
+                    batch.append(decode_log(loads(line)))
+                except Exception:
+                    # A partial line left by a crash.
+                    logger.warning("Skipping corrupted log in %s.", segment.path)
+            if batch:
+                self.backend.write_many(batch)
+            with self._lock:
+                segment.replayed = min(start + self.batch_size, len(lines))
+        return True
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,607 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .async_writer import AsyncWriterBackend
+from .backend import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_PERCENTILES,
+    DEFAULT_STATS_INTERVAL,
+    EPOCH,
+    JobState,
+    JobStatus,
+    Log,
+    LogCount,
+    LogFilter,
+    LogPage,
+    LogType,
+    ReaderBackend,
+    Task,
+    WriterBackend,
+    _group_jobs,
+    check_page_size,
+    check_stats_group,
+    job_latencies,
+    sort_log_counts,
+    split_traceback,
+    utc_naive,
+)
+from .serializer import decode_log, encode_log, loads
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_job_id ON logs (job_id, timestamp);
+CREATE INDEX IF NOT EXISTS logs_task_id ON logs (task_id, timestamp);
+CREATE INDEX IF NOT EXISTS logs_type ON logs (type, timestamp);
+CREATE INDEX IF NOT EXISTS logs_timestamp ON logs (timestamp);
+
+CREATE TABLE IF NOT EXISTS job_states (
+    job_id TEXT PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    queue TEXT,
+    task_path TEXT,
+    enqueued_at TEXT,
+    dequeued_at TEXT,
+    completed_at TEXT,
+    attempts INTEGER NOT NULL,
+    last_exception TEXT
+);
+CREATE INDEX IF NOT EXISTS job_states_status ON job_states (status, updated_at);
+
+CREATE TABLE IF NOT EXISTS tracebacks (
+    fingerprint TEXT PRIMARY KEY,
+    exception_class TEXT NOT NULL,
+    traceback TEXT NOT NULL
+);
+"""
+
+# Contentless full-text index of the log documents, kept up to date by a
+# trigger.  search() falls back to LIKE when SQLite is built without FTS5.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(data, content='');
+CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+    INSERT INTO logs_fts (rowid, data) VALUES (new.id, new.data);
+END;
+"""
+
+JOB_STATE_COLUMNS = (
+    "job_id",
+    "task_id",
+    "status",
+    "updated_at",
+    "queue",
+    "task_path",
+    "enqueued_at",
+    "dequeued_at",
+    "completed_at",
+    "attempts",
+    "last_exception",
+)
+
+JOB_STATE_DATETIMES = ("updated_at", "enqueued_at", "dequeued_at", "completed_at")
+
+# Jobs queried at once by find_jobs(), SQLite before 3.32 binds at most 999
+# parameters.
+FIND_JOBS_BATCH_SIZE = 500
+
+
+def _format_timestamp(timestamp: datetime) -> str:
+    # A fixed width format so timestamps are ordered as text, without offset.
+    return utc_naive(timestamp).isoformat(timespec="microseconds")
+
+
+class SQLiteBackend(ReaderBackend, WriterBackend):
+    """Store logs in a local SQLite database.
+
+    The database uses WAL mode so readers never block the writer.  Logs are
+    handed to a writer thread which inserts them in batches of up to
+    ``batch_size`` logs, one transaction per batch.  Readers wait for the
+    logs written so far to be inserted before querying.  Logs the writer
+    thread failed to insert are counted in ``failed``, logs dropped after
+    ``close()`` in ``dropped``.  Reading after ``close()`` raises
+    RuntimeError.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        batch_size: int = 500,
+        max_queue_size: int = 10000,
+        timeout: float = 30.0,
+        fingerprint_exceptions: bool = False,
+    ) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.fingerprint_exceptions = fingerprint_exceptions
+
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+        connection = self._connect(check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        try:
+            connection.executescript(FTS_SCHEMA)
+            self.full_text_search = True
+        except sqlite3.OperationalError:  # pragma: no cover
+            self.full_text_search = False
+
+        self._writer = AsyncWriterBackend(
+            _SQLiteWriter(connection), max_size=max_queue_size, batch_size=batch_size
+        )
+
+    def write(self, log: Log) -> None:
+        self._writer.write(log)
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def close(self) -> None:
+        self._writer.close()
+        with self._connections_lock:
+            self._closed = True
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local.connection = None
+
+    @property
+    def dropped(self) -> int:
+        return self._writer.dropped
+
+    @property
+    def failed(self) -> int:
+        return self._writer.failed
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=check_same_thread,
+        )
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    @property
+    def _reader(self) -> sqlite3.Connection:
+        connection: Optional[sqlite3.Connection] = getattr(
+            self._local, "connection", None
+        )
+        if self._closed:
+            raise RuntimeError("The SQLite backend is closed.")
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        condition, param = self._text_condition(query)
+        return self._page([condition], [param], since, until, -1, None).logs
+
+    def find_job(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return self._page(["job_id = ?"], [job_id], since, until, -1, None).logs
+
+    def find_jobs(
+        self,
+        job_ids: Iterable[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, List[Log]]:
+        job_ids = list(dict.fromkeys(job_ids))
+        logs: List[Log] = []
+        for start in range(0, len(job_ids), FIND_JOBS_BATCH_SIZE):
+            batch = job_ids[start : start + FIND_JOBS_BATCH_SIZE]
+            condition = "job_id IN ({})".format(", ".join("?" * len(batch)))
+            logs += self._page([condition], batch, since, until, -1, None).logs
+        return _group_jobs(job_ids, logs)
+
+    def logs_by_type(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        conditions, params = _type_conditions(type)
+        return self._page(conditions, params, since, until, -1, None).logs
+
+    def search_page(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        check_page_size(page_size)
+        condition, param = self._text_condition(query)
+        return self._page([condition], [param], since, until, page_size, cursor)
+
+    def find_job_page(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        check_page_size(page_size)
+        return self._page(["job_id = ?"], [job_id], since, until, page_size, cursor)
+
+    def logs_by_type_page(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        check_page_size(page_size)
+        conditions, params = _type_conditions(type)
+        return self._page(conditions, params, since, until, page_size, cursor)
+
+    def filter_logs(self, log_filter: LogFilter) -> List[Log]:
+        conditions, params = self._filter_conditions(log_filter)
+        return self._page(
+            conditions, params, log_filter.since, log_filter.until, -1, None
+        ).logs
+
+    def filter_logs_page(
+        self,
+        log_filter: LogFilter,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> LogPage:
+        check_page_size(page_size)
+        conditions, params = self._filter_conditions(log_filter)
+        return self._page(
+            conditions, params, log_filter.since, log_filter.until, page_size, cursor
+        )
+
+    def _filter_conditions(self, log_filter: LogFilter) -> Tuple[List[str], List[Any]]:
+        conditions: List[str] = []
+        params: List[Any] = []
+        if log_filter.task_id is not None:
+            conditions.append("task_id = ?")
+            params.append(log_filter.task_id)
+        if log_filter.type is not None:
+            conditions.append("type = ?")
+            params.append(log_filter.type)
+        if log_filter.job_details:
+            conditions.append("type = ?")
+            params.append(LogType.ENQUEUED)
+        for field, value in (
+            ("queue", log_filter.queue),
+            ("task_path", log_filter.task_path),
+        ):
+            if value is not None:
+                conditions.append("json_extract(data, '$.job.{}') = ?".format(field))
+                params.append(value)
+        if log_filter.text is not None:
+            condition, param = self._text_condition(log_filter.text)
+            conditions.append(condition)
+            params.append(param)
+        return conditions, params
+
+    def list_task(self) -> List[Task]:
+        self.flush()
+        rows = self._reader.execute("SELECT DISTINCT task_id FROM logs").fetchall()
+        return [Task(id=task_id) for task_id, in rows]
+
+    def job_state(self, job_id: str) -> Optional[JobState]:
+        self.flush()
+        return _load_job_state(self._reader, job_id)
+
+    def jobs_by_status(
+        self, *statuses: JobStatus, limit: int = DEFAULT_PAGE_SIZE
+    ) -> List[JobState]:
+        self.flush()
+        rows = self._reader.execute(
+            "SELECT {} FROM job_states WHERE status IN ({}) "
+            "ORDER BY updated_at DESC LIMIT ?".format(
+                ", ".join(JOB_STATE_COLUMNS), ", ".join("?" * len(statuses))
+            ),
+            [*statuses, limit],
+        ).fetchall()
+        return [_job_state_from_row(row) for row in rows]
+
+    def traceback(self, fingerprint: str) -> Optional[str]:
+        self.flush()
+        row = self._reader.execute(
+            "SELECT traceback FROM tracebacks WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def exception_fingerprints(
+        self, *, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        self.flush()
+        conditions, params = _time_range_conditions("timestamp", since, until)
+        rows = self._reader.execute(
+            "SELECT fingerprint, COUNT(*) FROM ("
+            "SELECT json_extract(data, '$.fingerprint') AS fingerprint FROM logs "
+            "WHERE {}) WHERE fingerprint IS NOT NULL GROUP BY fingerprint".format(
+                " AND ".join(["type = ?", *conditions])
+            ),
+            [LogType.EXCEPTION, *params],
+        ).fetchall()
+        return dict(rows)
+
+    def log_counts(
+        self,
+        *,
+        interval: timedelta = DEFAULT_STATS_INTERVAL,
+        group_by: str = "task_id",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[LogCount]:
+        check_stats_group(group_by)
+        # Buckets are computed on whole seconds.
+        if interval % timedelta(seconds=1):
+            return super().log_counts(
+                interval=interval, group_by=group_by, since=since, until=until
+            )
+
+        self.flush()
+        conditions, params = _time_range_conditions("logs.timestamp", since, until)
+        if group_by == "task_id":
+            key, join = "logs.task_id", ""
+        else:
+            # Only enqueued logs hold a queue, the job state keeps the last one.
+            key, join = "job_states.queue", " JOIN job_states USING (job_id)"
+            conditions.append("job_states.queue IS NOT NULL")
+        sql = (
+            "SELECT CAST(strftime('%s', logs.timestamp) AS INTEGER) / ? AS bucket, "
+            "{} AS key, logs.type, COUNT(*) FROM logs{}".format(key, join)
+        )
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " GROUP BY bucket, key, logs.type"
+
+        rows = self._reader.execute(
+            sql, [interval // timedelta(seconds=1), *params]
+        ).fetchall()
+        return sort_log_counts(
+            LogCount(
+                start=EPOCH + bucket * interval,
+                key=key,
+                type=LogType(type),
+                count=count,
+            )
+            for bucket, key, type, count in rows
+        )
+
+    def queue_latency(
+        self,
+        *,
+        group_by: str = "task_id",
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Dict[float, float]]:
+        check_stats_group(group_by)
+        self.flush()
+        conditions, params = _time_range_conditions("enqueued_at", since, until)
+        conditions.append("dequeued_at >= enqueued_at")
+        rows = self._reader.execute(
+            "SELECT {} FROM job_states WHERE {}".format(
+                ", ".join(JOB_STATE_COLUMNS), " AND ".join(conditions)
+            ),
+            params,
+        ).fetchall()
+        states = [_job_state_from_row(row) for row in rows]
+        return job_latencies(states, group_by, percentiles, since, until)
+
+    def _text_condition(self, text: str) -> Tuple[str, str]:
+        if self.full_text_search:
+            # Match the text as a phrase, so it doesn't use the FTS5 syntax.
+            condition = "id IN (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ?)"
+            return condition, '"{}"'.format(text.replace('"', '""'))
+        else:  # pragma: no cover
+            return "data LIKE ? ESCAPE '\\'", "%{}%".format(
+                text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+
+    def _page(
+        self,
+        conditions: List[str],
+        params: List[Any],
+        since: Optional[datetime],
+        until: Optional[datetime],
+        page_size: int,
+        cursor: Optional[str],
+    ) -> LogPage:
+        """Return logs newest first, a negative page size returns all logs.
+
+        The cursor holds the timestamp and id of the last returned log.
+        """
+        self.flush()
+
+        time_conditions, time_params = _time_range_conditions("timestamp", since, until)
+        conditions = [*conditions, *time_conditions]
+        params = [*params, *time_params]
+        if cursor is not None:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(_decode_cursor(cursor))
+
+        sql = "SELECT id, timestamp, data FROM logs"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp DESC, id DESC"
+        if page_size >= 0:
+            sql += " LIMIT ?"
+            params.append(page_size + 1)
+
+        rows = self._reader.execute(sql, params).fetchall()
+        next_cursor = None
+        if 0 <= page_size < len(rows):
+            rows = rows[:page_size]
+            last_id, last_timestamp, _ = rows[-1]
+            next_cursor = "{}/{}".format(last_timestamp, last_id)
+
+        return LogPage(
+            logs=[decode_log(loads(data)) for _, _, data in rows], cursor=next_cursor
+        )
+
+
+class _SQLiteWriter(WriterBackend):
+    """Insert batches of logs, only ever called from the writer thread."""
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def write(self, log: Log) -> None:
+        self.write_many([log])
+
+    def write_many(self, logs: Iterable[Log]) -> None:
+        logs = list(logs)
+        rows = [
+            (
+                log.type,
+                _format_timestamp(log.timestamp),
+                log.job_id,
+                log.task_id,
+                encode_log(log).decode("utf-8"),
+            )
+            for log in logs
+        ]
+
+        connection = self.connection
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "INSERT INTO logs (type, timestamp, job_id, task_id, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO tracebacks "
+                "(fingerprint, exception_class, traceback) VALUES (?, ?, ?)",
+                _traceback_rows(logs),
+            )
+            self._update_job_states(logs)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _update_job_states(self, logs: List[Log]) -> None:
+        states: Dict[str, JobState] = {}
+        for log in logs:
+            state = states.get(log.job_id) or _load_job_state(
+                self.connection, log.job_id
+            )
+            if state is None:
+                state = JobState.from_log(log)
+            else:
+                state.apply(log)
+            states[log.job_id] = state
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO job_states ({}) VALUES ({})".format(
+                ", ".join(JOB_STATE_COLUMNS), ", ".join("?" * len(JOB_STATE_COLUMNS))
+            ),
+            [_job_state_to_row(state) for state in states.values()],
+        )
+
+
+def _type_conditions(type: Optional[str]) -> Tuple[List[str], List[Any]]:
+    if type is None:
+        return [], []
+    return ["type = ?"], [type]
+
+
+def _traceback_rows(logs: Iterable[Log]) -> List[Tuple[str, str, str]]:
+    rows = []
+    for log in logs:
+        _, traceback = split_traceback(log)
+        if traceback is not None:
+            rows.append(
+                (traceback.fingerprint, traceback.exception_class, traceback.traceback)
+            )
+    return rows
+
+
+def _time_range_conditions(
+    column: str, since: Optional[datetime], until: Optional[datetime]
+) -> Tuple[List[str], List[Any]]:
+    conditions = []
+    params: List[Any] = []
+    if since is not None:
+        conditions.append("{} >= ?".format(column))
+        params.append(_format_timestamp(since))
+    if until is not None:
+        conditions.append("{} < ?".format(column))
+        params.append(_format_timestamp(until))
+    return conditions, params
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        timestamp, _, id = cursor.rpartition("/")
+        return timestamp, int(id)
+    except ValueError:
+        raise ValueError("Invalid cursor: {!r}".format(cursor)) from None
+
+
+def _load_job_state(connection: sqlite3.Connection, job_id: str) -> Optional[JobState]:
+    row = connection.execute(
+        "SELECT {} FROM job_states WHERE job_id = ?".format(
+            ", ".join(JOB_STATE_COLUMNS)
+        ),
+        (job_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    return _job_state_from_row(row)
+
+
+def _job_state_from_row(row: Tuple[Any, ...]) -> JobState:
+    values = {column: row[i] for i, column in enumerate(JOB_STATE_COLUMNS)}
+    for column in JOB_STATE_DATETIMES:
+        if values[column] is not None:
+            values[column] = datetime.fromisoformat(values[column])
+    values["status"] = JobStatus(values["status"])
+    return JobState(**values)
+
+
+def _job_state_to_row(state: JobState) -> Tuple[Any, ...]:
+    values = []
+    for column in JOB_STATE_COLUMNS:
+        value = getattr(state, column)
+        if column in JOB_STATE_DATETIMES and value is not None:
+            value = _format_timestamp(value)
+        values.append(value)
+    return tuple(values)
@@ -1,35 +1,121 @@
-from typing import Any, Optional, Set
+import dataclasses
+from typing import IO, TYPE_CHECKING, Any, Callable, Dict, Optional, Set, Union
 
-from dramatiq import Broker, Message, Middleware
+from dramatiq import Actor, Broker, Message, Middleware, Worker
 
 from .backends.backend import JobDetails, WriterBackend
+from .sampling import LogPolicy, LogSampler
+from .truncation import PayloadLimits, truncate
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .backends.shipping import LogShipper
+
+# Message option holding the sampling decision of jobs with a LogPolicy.
+SAMPLED_OPTION = "log_sampled"
+
+
+@dataclasses.dataclass
+class _ActorInfo:
+    """What the middleware needs to know about an actor, computed once."""
+
+    __slots__ = ("task_path", "log", "policy", "limits")
+
+    task_path: str
+    # The actor log option, and the LogPolicy it describes if not a boolean.
+    log: Any
+    policy: Optional[LogPolicy]
+    limits: PayloadLimits
+
+    @classmethod
+    def from_actor(cls, actor: Actor, limits: PayloadLimits) -> "_ActorInfo":
+        log = actor.options.get("log")
+        policy = None
+        if log is not None and not isinstance(log, bool):
+            policy = LogPolicy.from_option(log)
+        limits_option = actor.options.get("log_limits")
+        if limits_option is not None:
+            limits = PayloadLimits.from_option(limits_option)
+        return cls(
+            task_path=actor.fn.__module__ + "." + actor.fn.__qualname__,
+            log=log,
+            policy=policy,
+            limits=limits,
+        )
 
 
 class TaskLogsMiddleware(Middleware):
-    def __init__(self, backend: WriterBackend):
+    """Log the lifecycle of jobs to a backend.
+
+    The ``log`` actor or message option disables logging when False.  It can
+    also be a LogPolicy, or a sample rate, in which case whether a job is
+    logged is decided once when it's first enqueued and kept in the
+    ``log_sampled`` message option.  Failures of jobs that weren't sampled are
+    still logged.
+
+    Job arguments, options and results larger than the ``payload_limits``
+    budgets, or those of the ``log_limits`` actor option, are replaced by a
+    truncated preview in logs.
+    """
+
+    def __init__(
+        self,
+        backend: WriterBackend,
+        *,
+        payload_limits: Optional[PayloadLimits] = None,
+    ):
         self.backend = backend
+        self.payload_limits = payload_limits or PayloadLimits()
+        self.sampler = LogSampler()
+        self._actors: Dict[str, _ActorInfo] = {}
 
     @property
     def actor_options(self) -> Set[str]:
-        return {"log"}
+        return {"log", "log_limits"}
+
+    def after_declare_actor(self, broker: Broker, actor: Union[Actor, str]) -> None:
+        # Brokers pass the actor name for actors declared before the
+        # middleware was added.  Redeclaring an actor replaces its info.
+        if isinstance(actor, str):
+            actor = broker.get_actor(actor)
+        self._actors[actor.actor_name] = _ActorInfo.from_actor(
+            actor, self.payload_limits
+        )
+
+    def before_enqueue(self, broker: Broker, message: Message, delay: float) -> None:
+        if SAMPLED_OPTION in message.options:
+            return
+
+        option = message.options.get("log")
+        if option is None:
+            policy = self._actor_info(broker, message.actor_name).policy
+        elif isinstance(option, bool):
+            return
+        else:
+            policy = LogPolicy.from_option(option)
+
+        if policy is not None:
+            message.options[SAMPLED_OPTION] = self.sampler.sample(
+                message.actor_name, policy
+            )
 
     def after_enqueue(self, broker: Broker, message: Message, delay: float) -> None:
         if not self.should_log(broker, message):
             return
 
-        actor = broker.get_actor(message.actor_name)
-        task_path = actor.fn.__module__ + "." + actor.fn.__qualname__
-
+        info = self._actor_info(broker, message.actor_name)
+        args = truncate(list(message.args), info.limits.args)
+        if not isinstance(args, list):
+            args = [args]
         self.backend.write_enqueued(
             job_id=message.message_id,
             task_id=message.actor_name,
             job=JobDetails(
                 queue=message.queue_name,
-                task_path=task_path,
+                task_path=info.task_path,
                 execute_at=None,
-                args=message.args,
-                kwargs=message.kwargs,
-                options=message.options,
+                args=args,
+                kwargs=truncate(message.kwargs, info.limits.kwargs),
+                options=truncate(message.options, info.limits.options),
             ),
         )
 
@@ -49,12 +135,15 @@ class TaskLogsMiddleware(Middleware):
         result: Any = None,
         exception: Optional[BaseException] = None,
     ) -> None:
-        if not self.should_log(broker, message):
+        if not self.should_log(broker, message, failure=exception is not None):
             return
 
         if exception is None:
+            limit = self._actor_info(broker, message.actor_name).limits.result
             self.backend.write_completed(
-                job_id=message.message_id, task_id=message.actor_name, result=result
+                job_id=message.message_id,
+                task_id=message.actor_name,
+                result=truncate(result, limit),
             )
         else:
             self.backend.write_exception(
@@ -64,16 +153,84 @@ class TaskLogsMiddleware(Middleware):
             )
 
     def after_nack(self, broker: Broker, message: Message) -> None:
-        if not self.should_log(broker, message):
+        if not self.should_log(broker, message, failure=True):
             return
 
         self.backend.write_exception(
             job_id=message.message_id, task_id=message.actor_name, exception="Failed"
         )
 
-    def should_log(self, broker: Broker, message: Message) -> bool:
-        actor = broker.get_actor(message.actor_name)
-        should_log: Optional[bool] = message.options.get("log")
-        if should_log is not None:
-            return should_log
-        return actor.options.get("log") is not False
+    def before_worker_shutdown(self, broker: Broker, worker: Worker) -> None:
+        self.backend.flush()
+
+    def after_worker_shutdown(self, broker: Broker, worker: Worker) -> None:
+        self.backend.close()
+
+    def should_log(
+        self, broker: Broker, message: Message, *, failure: bool = False
+    ) -> bool:
+        sampled: Optional[bool] = message.options.get(SAMPLED_OPTION)
+        if sampled is not None:
+            return sampled or failure
+
+        option = message.options.get("log")
+        if option is None:
+            option = self._actor_info(broker, message.actor_name).log
+        return option is not False
+
+    def _actor_info(self, broker: Broker, actor_name: str) -> _ActorInfo:
+        info = self._actors.get(actor_name)
+        if info is None:
+            info = _ActorInfo.from_actor(
+                broker.get_actor(actor_name), self.payload_limits
+            )
+            self._actors[actor_name] = info
+        return info
+
+
+class LogShipperMiddleware(Middleware):
+    """Run a LogShipper in one worker process per host.
+
+    Once booted, worker processes race for a lock on ``path + ".lock"``.  The
+    process holding it runs a LogShipper listening on ``path``, writing to
+    the backend returned by ``backend_factory``, with the LogShipper
+    ``options``.  It is closed when the worker shuts down.
+
+    Worker processes log with ``TaskLogsMiddleware(ShippingBackend(path))``.
+    Add this middleware before TaskLogsMiddleware, so the shipper closes
+    after the log backend of its own process.
+    """
+
+    def __init__(
+        self, path: str, backend_factory: Callable[[], WriterBackend], **options: Any
+    ):
+        self.path = path
+        self.backend_factory = backend_factory
+        self.options = options
+        self.shipper: Optional["LogShipper"] = None
+        self._lock_file: Optional[IO[str]] = None
+
+    def after_process_boot(self, broker: Broker) -> None:
+        # Only available on POSIX, where the shipper's Unix sockets are.
+        import fcntl
+
+        from .backends.shipping import LogShipper
+
+        lock_file = open(self.path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Another process runs the shipper.
+            lock_file.close()
+            return
+
+        self._lock_file = lock_file
+        self.shipper = LogShipper(self.path, self.backend_factory(), **self.options)
+
+    def after_worker_shutdown(self, broker: Broker, worker: Worker) -> None:
+        if self.shipper is not None:
+            self.shipper.close()
+            self.shipper = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
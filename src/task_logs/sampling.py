@@ -0,0 +1,89 @@
+import dataclasses
+import random
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+
+@dataclasses.dataclass(frozen=True)
+class LogPolicy:
+    """Log only part of the jobs of an actor.
+
+    Each job is logged with a probability of ``sample_rate``, and at most
+    ``rate_limit`` jobs per second of each actor are logged, with bursts of up
+    to ``burst`` jobs (``rate_limit`` by default).  Rate limits are enforced by
+    each process enqueuing jobs.
+
+    As a ``log`` option, a number is a sample rate and a mapping holds the
+    LogPolicy fields, which can be sent along with a message.
+    """
+
+    sample_rate: float = 1.0
+    rate_limit: Optional[float] = None
+    burst: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if not 0 <= self.sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1.")
+        if self.rate_limit is not None and self.rate_limit <= 0:
+            raise ValueError("rate_limit must be positive.")
+
+    @classmethod
+    def from_option(cls, option: Any) -> "LogPolicy":
+        if isinstance(option, LogPolicy):
+            return option
+        if isinstance(option, (int, float)) and not isinstance(option, bool):
+            return cls(sample_rate=option)
+        if isinstance(option, Mapping):
+            return cls(**option)
+        raise TypeError("Invalid log option: {!r}".format(option))
+
+
+class TokenBucket:
+    """Allow ``rate`` events per second, with bursts of ``capacity`` events."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class LogSampler:
+    """Decide which jobs are logged, keeping a token bucket per actor."""
+
+    def __init__(self) -> None:
+        self._buckets: Dict[Tuple[str, float, float], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def sample(self, actor_name: str, policy: LogPolicy) -> bool:
+        if policy.sample_rate < 1 and random.random() >= policy.sample_rate:
+            return False
+        if policy.rate_limit is None:
+            return True
+        return self._bucket(actor_name, policy).take()
+
+    def _bucket(self, actor_name: str, policy: LogPolicy) -> TokenBucket:
+        assert policy.rate_limit is not None
+        capacity = policy.burst if policy.burst is not None else policy.rate_limit
+        key = (actor_name, policy.rate_limit, capacity)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(
+                    key, TokenBucket(policy.rate_limit, max(capacity, 1))
+                )
+        return bucket
@@ -0,0 +1,85 @@
+import dataclasses
+import hashlib
+from typing import Any, Mapping, Optional
+
+from .backends.serializer import dumps
+
+# Key set on the values replacing truncated payloads.
+TRUNCATED_MARKER = "_truncated"
+
+
+@dataclasses.dataclass(frozen=True)
+class PayloadLimits:
+    """Byte budgets of the job payloads kept in logs, None for no limit.
+
+    As the ``log_limits`` actor option, a number is the budget of every field
+    and a mapping holds the PayloadLimits fields.
+    """
+
+    args: Optional[int] = None
+    kwargs: Optional[int] = None
+    options: Optional[int] = None
+    result: Optional[int] = None
+
+    @classmethod
+    def from_option(cls, option: Any) -> "PayloadLimits":
+        if isinstance(option, PayloadLimits):
+            return option
+        if isinstance(option, int) and not isinstance(option, bool):
+            return cls(args=option, kwargs=option, options=option, result=option)
+        if isinstance(option, Mapping):
+            return cls(**option)
+        raise TypeError("Invalid log_limits option: {!r}".format(option))
+
+
+def estimate_size(value: Any, limit: Optional[int] = None) -> int:
+    """Estimate the size of value serialized to JSON.
+
+    Strings are counted in characters, which underestimates non-ASCII text.
+    Other values are counted by their ``repr()``.  The walk stops as soon as
+    the estimate exceeds ``limit``.
+    """
+    size = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            size += len(item) + 2
+        elif isinstance(item, dict):
+            size += 1 + len(item)
+            for key, child in item.items():
+                size += len(key) + 3 if isinstance(key, str) else 8
+                stack.append(child)
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            size += 1 + len(item)
+            stack.extend(item)
+        else:
+            size += len(repr(item))
+        if limit is not None and size > limit:
+            break
+    return size
+
+
+def truncate(value: Any, limit: Optional[int]) -> Any:
+    """Return value, or a preview of it if it's serialized over limit bytes.
+
+    The value is only serialized when its estimated size is over the limit.
+    The replacement holds the first ``limit`` bytes of the serialized value,
+    its full size and its SHA-1.  A value that can't be serialized is
+    previewed from its ``repr()``.
+    """
+    if limit is None or estimate_size(value, limit) <= limit:
+        return value
+
+    try:
+        data = dumps(value)
+    except TypeError:
+        data = dumps(repr(value))
+    if len(data) <= limit:
+        return value
+    return {
+        TRUNCATED_MARKER: True,
+        "size": len(data),
+        "sha1": hashlib.sha1(data).hexdigest(),
+        "preview": data[:limit].decode("utf-8", "ignore"),
+    }
@@ -0,0 +1,162 @@
+import asyncio
+from datetime import datetime
+from typing import Any, List, Optional
+
+from task_logs.backends import MemoryBackend
+from task_logs.backends.aio import AioReaderBackend, AioWriterBackend
+from task_logs.backends.backend import JobStatus, Log, LogFilter, LogType
+
+from ..conftest import aio_elastic_backend
+from ..utils import fake_factory
+
+
+class AioMemoryBackend(AioWriterBackend, AioReaderBackend):
+    """Only implement the abstract methods, to test the default ones."""
+
+    def __init__(self) -> None:
+        self.backend = MemoryBackend()
+
+    async def write(self, log: Log) -> None:
+        self.backend.write(log)
+
+    async def find_job(
+        self,
+        job_id: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return self.backend.find_job(job_id, since=since, until=until)
+
+    async def logs_by_type(
+        self,
+        type: Optional[str],
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return self.backend.logs_by_type(type, since=since, until=until)
+
+    async def search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Log]:
+        return self.backend.search(query, since=since, until=until)
+
+
+def _fake_logs() -> List[Log]:
+    backend = MemoryBackend()
+    fake_factory(backend)
+    return backend.all()[::-1]
+
+
+def test_aio_backend_defaults() -> None:
+    async def run() -> None:
+        backend = AioMemoryBackend()
+        await backend.write_many(_fake_logs())
+        await backend.write_dequeued(job_id="new", task_id="task")
+
+        assert len(await backend.all()) == 12
+        assert len(await backend.dequeued()) == 5
+        assert len(await backend.completed()) == 2
+
+        page = await backend.logs_by_type_page(LogType.DEQUEUED, page_size=3)
+        assert page.cursor is not None
+        rest = [
+            log
+            async for log in backend.iter_logs_by_type(
+                LogType.DEQUEUED, page_size=3, cursor=page.cursor
+            )
+        ]
+        assert page.logs + rest == await backend.dequeued()
+
+        job_ids = ["2fffe3e4-144d-40e1-9014-34a298c65bfc", "unknown"]
+        jobs = await backend.find_jobs(job_ids)
+        assert [len(logs) for logs in jobs.values()] == [3, 0]
+
+        log_filter = LogFilter(task_id="other_task", type=LogType.DEQUEUED)
+        assert len(await backend.filter_logs(log_filter)) == 3
+        assert len(await backend.filter_logs(LogFilter(queue="test_queue"))) == 3
+
+        stats = await backend.stats(percentiles=[50])
+        assert sum(c.count for c in stats.counts) == 12
+        assert stats.latency == {
+            "simple_task": {50.0: 10.0},
+            "other_task": {50.0: 60.0},
+        }
+
+        await backend.close()
+
+    asyncio.run(run())
+
+
+def test_aio_elastic_backend() -> None:
+    async def run() -> None:
+        backend = aio_elastic_backend()
+        try:
+            logs = _fake_logs()
+            await backend.write_many(logs[:5])
+            for log in logs[5:]:
+                await backend.write(log)
+
+            assert await backend.all() == logs[::-1]
+            job_id = "bbed01b8-226c-411e-9d0f-5e4fa4445bf7"
+            find_job, search = await asyncio.gather(
+                backend.find_job(job_id), backend.search("ValueError")
+            )
+            assert [log.job_id for log in find_job] == [job_id] * 7
+            assert [log.type for log in search] == [LogType.EXCEPTION] * 2
+
+            page = await backend.find_job_page(job_id, page_size=4)
+            rest = [
+                log
+                async for log in backend.iter_find_job(
+                    job_id, page_size=4, cursor=page.cursor
+                )
+            ]
+            assert page.logs + rest == find_job
+
+            jobs = await backend.find_jobs([job_id, "unknown"])
+            assert jobs == {job_id: find_job, "unknown": []}
+
+            log_filter = LogFilter(task_id="other_task", type=LogType.EXCEPTION)
+            assert await backend.filter_logs(log_filter) == search
+
+            state = await backend.job_state("2fffe3e4-144d-40e1-9014-34a298c65bfc")
+            assert state is not None and state.status == JobStatus.COMPLETED
+            assert await backend.job_state("unknown") is None
+            assert [s.job_id for s in await backend.in_flight_jobs()] == [
+                "e308282a-5f6a-4553-a2c0-8612368ab917"
+            ]
+        finally:
+            await backend.close()
+
+    asyncio.run(run())
+
+
+def test_aio_elastic_backend_concurrent_init() -> None:
+    async def run() -> None:
+        backend = aio_elastic_backend()
+        calls: List[str] = []
+        get_template = backend.es.indices.get_template
+
+        async def counting_get_template(**kwargs: Any) -> Any:
+            calls.append(kwargs["name"])
+            return await get_template(**kwargs)
+
+        backend.es.indices.get_template = counting_get_template  # type: ignore
+        try:
+            await asyncio.gather(
+                *(
+                    backend.write_dequeued(job_id="job-%d" % i, task_id="task")
+                    for i in range(5)
+                )
+            )
+            assert len(calls) == len(backend._templates())
+        finally:
+            await backend.close()
+
+    asyncio.run(run())
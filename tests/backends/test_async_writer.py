@@ -0,0 +1,110 @@
+import threading
+from typing import Iterable, List
+
+import pytest
+
+from task_logs.backends import AsyncWriterBackend, OverflowPolicy, StubBackend
+from task_logs.backends.backend import Log, WriterBackend
+
+from ..utils import fake_factory
+
+
+class GatedBackend(WriterBackend):
+    def __init__(self) -> None:
+        self.logs: List[Log] = []
+        self.gate = threading.Event()
+        self.started = threading.Event()
+
+    def write(self, log: Log) -> None:
+        self.write_many([log])
+
+    def write_many(self, logs: Iterable[Log]) -> None:
+        self.started.set()
+        self.gate.wait()
+        self.logs.extend(logs)
+
+
+def _job_ids(logs: List[Log]) -> List[str]:
+    return [log.job_id for log in logs]
+
+
+def test_async_writer_flush() -> None:
+    stub = StubBackend()
+    backend = AsyncWriterBackend(stub)
+
+    fake_factory(backend)
+    backend.flush()
+
+    assert len(stub.all()) == 11
+    assert len(stub.enqueued()) == 3
+
+    backend.close()
+
+
+def test_async_writer_close_drains() -> None:
+    stub = StubBackend()
+    backend = AsyncWriterBackend(stub, batch_size=3)
+
+    fake_factory(backend)
+    backend.close()
+    assert len(stub.all()) == 11
+
+    # The wrapped backend is closed, later logs are dropped.
+    backend.write_dequeued(job_id="late", task_id="task")
+    assert len(stub.all()) == 11
+    assert backend.dropped == 1
+
+
+@pytest.mark.parametrize(
+    "overflow,expected",
+    [
+        (OverflowPolicy.DROP_NEWEST, ["job-0", "job-1", "job-2"]),
+        (OverflowPolicy.DROP_OLDEST, ["job-0", "job-3", "job-4"]),
+    ],
+)
+def test_async_writer_overflow(overflow: OverflowPolicy, expected: List[str]) -> None:
+    gated = GatedBackend()
+    backend = AsyncWriterBackend(gated, max_size=2, overflow=overflow)
+
+    backend.write_dequeued(job_id="job-0", task_id="task")
+    # Wait for the writer thread to hold job-0 so the queue is empty.
+    assert gated.started.wait(timeout=5)
+
+    for i in range(1, 5):
+        backend.write_dequeued(job_id="job-%d" % i, task_id="task")
+
+    assert backend.dropped == 2
+
+    gated.gate.set()
+    backend.close()
+    assert _job_ids(gated.logs) == expected
+
+
+def test_async_writer_close_with_blocked_writer() -> None:
+    gated = GatedBackend()
+    backend = AsyncWriterBackend(gated, max_size=1)
+
+    backend.write_dequeued(job_id="job-0", task_id="task")
+    assert gated.started.wait(timeout=5)
+    backend.write_dequeued(job_id="job-1", task_id="task")
+
+    # The queue is full, this writer blocks until the writer thread drains.
+    writer = threading.Thread(
+        target=backend.write_dequeued, kwargs={"job_id": "job-2", "task_id": "task"}
+    )
+    writer.start()
+    while not backend._putting:
+        writer.join(timeout=0.01)
+    closer = threading.Thread(target=backend.close)
+    closer.start()
+    while not backend._closing:
+        closer.join(timeout=0.01)
+
+    # Neither the blocked writer nor close() hold up other writers.
+    backend.write_dequeued(job_id="late", task_id="task")
+    assert backend.dropped == 1
+
+    gated.gate.set()
+    writer.join(timeout=5)
+    closer.join(timeout=5)
+    assert _job_ids(gated.logs) == ["job-0", "job-1", "job-2"]
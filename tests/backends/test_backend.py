@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+
+from task_logs.backends.backend import DequeuedLog, EnqueuedLog, JobDetails, LogType
+
+
+def test_logs_are_slotted() -> None:
+    log = EnqueuedLog(
+        type=LogType.ENQUEUED,
+        timestamp=datetime(2019, 1, 14),
+        job_id="job",
+        task_id="task",
+        job=JobDetails(
+            queue="queue",
+            task_path=None,
+            execute_at=None,
+            args=[],
+            kwargs={},
+            options={},
+        ),
+    )
+
+    assert not hasattr(log, "__dict__")
+    assert not hasattr(log.job, "__dict__")
+    with pytest.raises(AttributeError):
+        log.unknown = True  # type: ignore
+
+
+def test_logs_equality() -> None:
+    timestamp = datetime(2019, 1, 14)
+    log = DequeuedLog(
+        type=LogType.DEQUEUED, timestamp=timestamp, job_id="job", task_id="task"
+    )
+
+    assert log == DequeuedLog(
+        type=LogType.DEQUEUED, timestamp=timestamp, job_id="job", task_id="task"
+    )
+    assert log != DequeuedLog(
+        type=LogType.DEQUEUED, timestamp=timestamp, job_id="other", task_id="task"
+    )
@@ -1,8 +1,37 @@
-from typing import List
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List
 
-from task_logs.backends.backend import Log, LogType
-from task_logs.backends.elastic import ElasticsearchBackend
+import pytest
 
+from task_logs.backends import SpoolingBackend, StubBackend
+from task_logs.backends.backend import (
+    DequeuedLog,
+    FingerprintedExceptionLog,
+    Log,
+    LogType,
+    exception_log,
+)
+from task_logs.backends.elastic import (
+    INDEX_PREFIX,
+    JOB_STATES_INDEX,
+    ROLLOVER_ALIAS,
+    ROLLOVER_FIRST_INDEX,
+    ROLLOVER_POLICY,
+    TASK_LOGS_TEMPLATE,
+    TRACEBACKS_INDEX,
+    ElasticsearchBackend,
+    IndexRollover,
+    _policy_is_current,
+    _split_first_page,
+    _decode_cursor,
+    _template_is_current,
+    create_client,
+)
+from task_logs.backends.serializer import encode_log, loads
+
+from ..config import ELASTICSEARCH_URL
+from ..conftest import _elastic_backend, check_elastic
 from ..utils import fake_factory
 
 
@@ -21,7 +50,7 @@ def test_elastic_backend(elastic_backend: ElasticsearchBackend) -> None:
     assert len(elastic_backend.dequeued()) == 4
     assert len(elastic_backend.completed()) == 2
     assert len(elastic_backend.exception()) == 2
-    assert len(elastic_backend.all()) == 10
+    assert len(elastic_backend.all()) == 11
 
     assert _ids(elastic_backend.search("timestamp:[2000-01-01T00:05:00Z TO *]")) == [
         "bbed01b8-226c-411e-9d0f-5e4fa4445bf7"
@@ -64,3 +93,337 @@ def test_elastic_backend(elastic_backend: ElasticsearchBackend) -> None:
         "dequeued",
         "enqueued",
     ]
+
+
+def test_elastic_backend_point_in_time(
+    elastic_backend: ElasticsearchBackend, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fake_factory(elastic_backend)
+    es = elastic_backend.es
+    opened: List[str] = []
+    closed: List[str] = []
+    open_point_in_time = es.open_point_in_time
+    close_point_in_time = es.close_point_in_time
+
+    def open_pit(**kwargs: Any) -> Any:
+        response = open_point_in_time(**kwargs)
+        opened.append(response["id"])
+        return response
+
+    def close_pit(**kwargs: Any) -> Any:
+        closed.append(kwargs["body"]["id"])
+        return close_point_in_time(**kwargs)
+
+    searches: List[Any] = []
+    search = es.search
+
+    def counting_search(**kwargs: Any) -> Any:
+        searches.append(kwargs["body"].get("pit"))
+        return search(**kwargs)
+
+    monkeypatch.setattr(es, "open_point_in_time", open_pit)
+    monkeypatch.setattr(es, "close_point_in_time", close_pit)
+    monkeypatch.setattr(es, "search", counting_search)
+
+    # Reads fitting a page are a single search.
+    assert len(elastic_backend.find_job("bbed01b8-226c-411e-9d0f-5e4fa4445bf7")) == 7
+    assert elastic_backend.logs_by_type_page(None, page_size=11).cursor is None
+    assert opened == [] and len(searches) == 2
+
+    # The first page comes from the search that found more logs.
+    page = elastic_backend.logs_by_type_page(None, page_size=10)
+    assert len(page.logs) == 10 and len(opened) == 1 and closed == []
+    assert searches[2:] == [None]
+
+    last = elastic_backend.logs_by_type_page(None, page_size=10, cursor=page.cursor)
+    assert page.logs + last.logs == elastic_backend.all()
+    assert last.cursor is None and closed == opened
+
+    page = elastic_backend.logs_by_type_page(None, page_size=10)
+
+    # A failed search closes its point in time.
+    def failing_search(**kwargs: Any) -> Any:
+        raise ConnectionError("search failed")
+
+    monkeypatch.setattr(es, "search", failing_search)
+    with pytest.raises(ConnectionError):
+        elastic_backend.logs_by_type_page(None, page_size=10, cursor=page.cursor)
+    assert len(closed) == 2
+
+
+def test_split_first_page() -> None:
+    hits = [{"sort": [sort]} for sort in [5, 4, 3, 3, 3]]
+    # The hits tied with the extra hit are left for the next page.
+    assert _split_first_page(hits, 4) == (hits[:2], [3, -1])
+    assert _split_first_page(hits[:4], 3) == (hits[:2], [3, -1])
+    assert _split_first_page(hits[2:], 2) is None
+
+
+def test_search_page_requests() -> None:
+    backend = ElasticsearchBackend(client=object())
+    logs = [
+        DequeuedLog(
+            type=LogType.DEQUEUED,
+            timestamp=datetime(2019, 1, 14, 12, minute),
+            job_id=str(minute),
+            task_id="task",
+        )
+        for minute in (3, 2, 1)
+    ]
+    hits = [
+        {"_source": loads(encode_log(log)), "sort": [minute]}
+        for minute, log in zip((3, 2, 1), logs)
+    ]
+
+    # The first page comes from the plain search, a point in time is opened
+    # for the next one.
+    requests = backend._search_page_requests(
+        {"match_all": {}}, since=None, until=None, page_size=2, cursor=None
+    )
+    assert next(requests)[0] == "search"
+    assert requests.send({"hits": {"hits": hits}})[0] == "open_point_in_time"
+    with pytest.raises(StopIteration) as stop:
+        requests.send({"id": "pit"})
+    page = stop.value.value
+    assert page.logs == logs[:2]
+    assert _decode_cursor(page.cursor) == ("pit", [1, -1], 0)
+
+    # The point in time is closed when a search fails.
+    requests = backend._search_page_requests(
+        {"match_all": {}}, since=None, until=None, page_size=2, cursor=page.cursor
+    )
+    method, kwargs = next(requests)
+    assert method == "search"
+    assert kwargs["body"]["search_after"] == [1, -1]
+    error = ConnectionError()
+    method, kwargs = requests.throw(error)
+    assert method == "close_point_in_time"
+    assert kwargs["body"] == {"id": "pit"}
+    with pytest.raises(ConnectionError) as raised:
+        requests.send({})
+    assert raised.value is error
+
+
+def test_elastic_backend_bulk(elastic_bulk_backend: ElasticsearchBackend) -> None:
+    backend = elastic_bulk_backend
+    fake_factory(backend)
+
+    # Two full batches of 4 logs were sent, 3 logs are still buffered.
+    assert len(backend.all()) == 8
+
+    backend.flush()
+
+    assert len(backend.all()) == 11
+    assert len(backend.enqueued()) == 3
+    assert _types(backend.find_job("2fffe3e4-144d-40e1-9014-34a298c65bfc")) == [
+        "completed",
+        "dequeued",
+        "enqueued",
+    ]
+
+
+def test_elastic_backend_write_many(
+    elastic_bulk_backend: ElasticsearchBackend,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    # Buffered logs are flushed in the background, out of reach of the spool.
+    with pytest.raises(ValueError):
+        SpoolingBackend(elastic_bulk_backend, str(tmp_path))
+
+    backend = _elastic_backend()
+    reference = StubBackend()
+    fake_factory(reference)
+    requests: List[int] = []
+    bulk = backend.es.bulk
+
+    def counting_bulk(**kwargs: Any) -> Any:
+        requests.append(len(kwargs["body"].splitlines()) // 2)
+        return bulk(**kwargs)
+
+    monkeypatch.setattr(backend.es, "bulk", counting_bulk)
+    backend.write_many(reference.all())
+    assert requests == [11]
+    assert len(backend.all()) == 11
+
+
+def test_elastic_backend_job_documents() -> None:
+    backend = _elastic_backend(job_documents=True, bulk=True, bulk_max_age=None)
+    reference = StubBackend()
+    fake_factory(backend)
+    fake_factory(reference)
+    backend.flush()
+
+    assert backend.es.count(index=INDEX_PREFIX + "*")["count"] == 0
+    assert backend.es.count(index=JOB_STATES_INDEX)["count"] == 3
+    job_id = "bbed01b8-226c-411e-9d0f-5e4fa4445bf7"
+    assert _types(backend.find_job(job_id)) == _types(reference.find_job(job_id))
+    assert _ids(backend.exception()) == [job_id] * 2
+
+
+def test_elastic_backend_job_documents_pages(monkeypatch: pytest.MonkeyPatch) -> None:
+    backend = _elastic_backend(job_documents=True)
+    fake_factory(backend)
+    hits: List[int] = []
+    search = backend.es.search
+
+    def counting_search(**kwargs: Any) -> Any:
+        response = search(**kwargs)
+        hits.append(len(response["hits"]["hits"]))
+        return response
+
+    monkeypatch.setattr(backend.es, "search", counting_search)
+
+    # The most recently updated job holds 7 logs, the page stops in it.
+    page = backend.logs_by_type_page(None, page_size=2)
+    assert len(page.logs) == 2 and hits == [2]
+    assert {log.job_id for log in page.logs} == {"bbed01b8-226c-411e-9d0f-5e4fa4445bf7"}
+
+    rest = list(backend.iter_logs_by_type(None, page_size=2, cursor=page.cursor))
+    assert page.logs + rest == backend.all()
+    assert max(hits) <= 2
+
+
+def test_elastic_backend_indices(elastic_backend: ElasticsearchBackend) -> None:
+    indices = elastic_backend._indices
+
+    assert indices(None, None) == "task-logs-*"
+    assert indices(None, datetime(2000, 1, 2)) == "task-logs-*"
+    assert indices(datetime(2000, 1, 1, 12), datetime(2000, 1, 1, 13)) == (
+        "task-logs-2000.01.01,task-logs-rollover-*"
+    )
+    assert indices(datetime(2000, 1, 1, 23), datetime(2000, 1, 3, 1)) == (
+        "task-logs-2000.01.01,task-logs-2000.01.02,task-logs-2000.01.03,"
+        "task-logs-rollover-*"
+    )
+    # Too many indices to list them.
+    assert indices(datetime(1999, 1, 1), datetime(2000, 1, 1)) == "task-logs-*"
+
+
+def test_elastic_backend_rollover() -> None:
+    rollover = IndexRollover(max_docs=5, force_merge_after=None)
+    daily = _elastic_backend()
+    backend = _elastic_backend(rollover=rollover)
+    daily.write_dequeued(job_id="daily", task_id="task")
+    fake_factory(backend)
+
+    assert list(backend.es.indices.get_alias(name=ROLLOVER_ALIAS)) == [
+        ROLLOVER_FIRST_INDEX
+    ]
+    policy = backend.es.ilm.get_lifecycle(policy=ROLLOVER_POLICY)[ROLLOVER_POLICY]
+    assert policy["policy"]["phases"]["hot"]["actions"]["rollover"] == {
+        "max_docs": 5,
+        "max_primary_shard_size": "30gb",
+    }
+    # Both layouts are read, with or without a time range.
+    for reader in (daily, backend):
+        assert len(reader.all()) == 12
+        assert _ids(reader.find_job("daily")) == ["daily"]
+        logs = reader.logs_by_type(
+            None, since=datetime(2000, 1, 1), until=datetime(2000, 1, 2)
+        )
+        assert len(logs) == 11
+
+
+def test_index_rollover_policy() -> None:
+    phases = IndexRollover(max_docs=1000, delete_after="7d").policy()["policy"][
+        "phases"
+    ]
+
+    assert phases["hot"]["actions"]["rollover"] == {
+        "max_primary_shard_size": "30gb",
+        "max_docs": 1000,
+    }
+    assert phases["warm"]["actions"] == {"forcemerge": {"max_num_segments": 1}}
+    assert phases["delete"] == {"min_age": "7d", "actions": {"delete": {}}}
+    assert "delete" not in IndexRollover(delete_after=None).policy()["policy"]["phases"]
+    with pytest.raises(ValueError):
+        IndexRollover(max_primary_shard_size=None)
+
+
+def test_policy_is_current() -> None:
+    policy = IndexRollover(max_docs=1000).policy()
+    installed = {ROLLOVER_POLICY: {"version": 1, **policy}}
+
+    assert _policy_is_current(installed, policy)
+    assert not _policy_is_current(installed, IndexRollover(max_docs=10).policy())
+    assert not _policy_is_current({"error": {}, "status": 404}, policy)
+
+
+def test_elastic_backend_index_settings(elastic_backend: ElasticsearchBackend) -> None:
+    elastic_backend.write_exception(
+        job_id="job", task_id="task", exception=ValueError("Failed")
+    )
+    elastic_backend.write_dequeued(job_id="job", task_id="task")
+
+    settings = elastic_backend.es.indices.get_settings(index=INDEX_PREFIX + "*")
+    for index in settings.values():
+        assert index["settings"]["index"]["sort"] == {
+            "field": "timestamp",
+            "order": "desc",
+        }
+        assert index["settings"]["index"]["codec"] == "best_compression"
+    response = elastic_backend.es.count(
+        index=INDEX_PREFIX + "*",
+        body={"query": {"term": {"exception_class": "ValueError"}}},
+    )
+    assert response["count"] == 1
+
+
+def test_elastic_backend_traceback_after_failure(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    backend = _elastic_backend(fingerprint_exceptions=True)
+    try:
+        raise ValueError("failed")
+    except ValueError as e:
+        log = exception_log(job_id="job", task_id="task", exception=e, fingerprint=True)
+    assert isinstance(log, FingerprintedExceptionLog)
+    index = backend.es.index
+
+    def failing_index(**kwargs: Any) -> Any:
+        if kwargs["index"] == TRACEBACKS_INDEX:
+            raise ConnectionError("index failed")
+        return index(**kwargs)
+
+    monkeypatch.setattr(backend.es, "index", failing_index)
+    with pytest.raises(ConnectionError):
+        backend.write(log)
+    monkeypatch.undo()
+
+    # The traceback wasn't stored, the next log with its fingerprint stores it.
+    backend.write(log)
+    assert backend.traceback(log.fingerprint) is not None
+
+
+def test_elastic_backend_shared_client() -> None:
+    # Nothing is sent until the first write, the port is never connected to.
+    client = create_client(["http://localhost:1"])
+    first = ElasticsearchBackend(client=client)
+    second = ElasticsearchBackend(client=client, job_states=True)
+
+    assert first.es is second.es is client
+    with pytest.raises(ValueError):
+        ElasticsearchBackend(["http://localhost:1"], client=client)
+
+
+def test_elastic_backend_lazy_templates() -> None:
+    check_elastic([ELASTICSEARCH_URL])
+    client = create_client([ELASTICSEARCH_URL])
+    client.indices.delete_template(name="task-logs-template", ignore=404)
+    backend = ElasticsearchBackend(client=client, force_refresh=True)
+
+    assert not client.indices.exists_template(name="task-logs-template")
+    backend.write_dequeued(job_id="job", task_id="task")
+    template = client.indices.get_template(name="task-logs-template")
+    assert _template_is_current(template, "task-logs-template", TASK_LOGS_TEMPLATE)
+    assert len(ElasticsearchBackend(client=client).all()) == 1
+
+
+def test_template_is_current() -> None:
+    name = "task-logs-template"
+
+    assert not _template_is_current({}, name, TASK_LOGS_TEMPLATE)
+    assert not _template_is_current({name: {"version": 1}}, name, {"version": 2})
+    assert _template_is_current({name: {"version": 2}}, name, {"version": 2})
+    assert _template_is_current({name: {"version": 3}}, name, {"version": 2})
@@ -0,0 +1,46 @@
+from task_logs.backends.backend import (
+    LogFilter,
+    LogType,
+    ReaderBackend,
+    WriterBackend,
+)
+
+from ..utils import fake_factory
+
+
+def test_filter_logs(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+    logs = backend.logs_by_type(None)
+
+    filters = [
+        LogFilter(),
+        LogFilter(task_id="other_task"),
+        LogFilter(task_id="simple_task", type=LogType.DEQUEUED),
+        LogFilter(queue="test_queue"),
+        LogFilter(task_path="task_logs.tests.simple_task"),
+        LogFilter(type=LogType.DEQUEUED, queue="test_queue"),
+        LogFilter(task_id="missing_task"),
+        LogFilter(type=LogType.EXCEPTION, text="ValueError"),
+        LogFilter(since=logs[4].timestamp, until=logs[1].timestamp),
+    ]
+    for log_filter in filters:
+        expected = [log for log in logs if log_filter.matches(log)]
+        assert backend.filter_logs(log_filter) == expected, log_filter
+
+    assert len(backend.filter_logs(LogFilter(task_id="other_task"))) == 7
+    assert len(backend.filter_logs(LogFilter(queue="test_queue"))) == 3
+    assert len(backend.filter_logs(LogFilter(since=logs[4].timestamp))) == 5
+
+
+def test_iter_filter_logs(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+
+    log_filter = LogFilter(task_id="other_task", type=LogType.DEQUEUED)
+    first = backend.filter_logs_page(log_filter, page_size=2)
+    assert first.cursor is not None
+    rest = list(backend.iter_filter_logs(log_filter, page_size=2, cursor=first.cursor))
+
+    assert first.logs + rest == backend.filter_logs(log_filter)
+    assert len(rest) == 1
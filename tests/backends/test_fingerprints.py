@@ -0,0 +1,120 @@
+import sys
+from typing import Any, Dict, List
+
+import pytest
+
+from task_logs.backends.backend import (
+    ExceptionLog,
+    FingerprintedExceptionLog,
+    ReaderBackend,
+    WriterBackend,
+    exception_log,
+    fingerprint_exception,
+)
+
+
+def _fail(message: str) -> BaseException:
+    try:
+        raise ValueError(message)
+    except ValueError as e:
+        return e
+
+
+def _fail_from_key(data: Any) -> BaseException:
+    try:
+        try:
+            data["missing"]
+        except KeyError as e:
+            raise RuntimeError("Invalid data") from e
+    except RuntimeError as e:
+        return e
+
+
+def test_fingerprint_exception() -> None:
+    first, second = _fail("first"), _fail("second")
+
+    assert fingerprint_exception(first) == fingerprint_exception(second)
+    assert fingerprint_exception(first) != fingerprint_exception(_fail_from_key({}))
+    assert fingerprint_exception(_fail_from_key({})) == fingerprint_exception(
+        _fail_from_key({"other": 1})
+    )
+    assert fingerprint_exception(ValueError()) != fingerprint_exception(KeyError())
+
+
+def _fail_in_file(filename: str) -> BaseException:
+    namespace: Dict[str, Any] = {}
+    exec(compile("def fail():\n    raise ValueError()\n", filename, "exec"), namespace)
+    try:
+        namespace["fail"]()
+    except ValueError as e:
+        return e
+    raise AssertionError("Not raised")
+
+
+def test_fingerprint_exception_install_path(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        sys, "path", [*sys.path, "/srv/one/site-packages", "/srv/two/lib"]
+    )
+    first = _fail_in_file("/srv/one/site-packages/app/tasks.py")
+
+    assert fingerprint_exception(first) == fingerprint_exception(
+        _fail_in_file("/srv/two/lib/app/tasks.py")
+    )
+    assert fingerprint_exception(first) != fingerprint_exception(
+        _fail_in_file("/srv/two/lib/app/jobs.py")
+    )
+
+
+def test_exception_log_class() -> None:
+    def log(exception: Any, fingerprint: bool = False) -> ExceptionLog:
+        return exception_log(
+            job_id="job", task_id="task", exception=exception, fingerprint=fingerprint
+        )
+
+    assert log(_fail("text")).exception_class == "ValueError"
+    assert log(_fail("text"), fingerprint=True).exception_class == "ValueError"
+    assert log(_fail("first line\nsecond line")).exception_class == "ValueError"
+    assert log(_fail_from_key({})).exception_class == "RuntimeError"
+    # Failures logged as text have no class.
+    assert log("app.errors.Timeout: too slow\n").exception_class is None
+    assert log("Failed").exception_class is None
+
+
+def test_fingerprinted_exceptions(fingerprint_backend: ReaderBackend) -> None:
+    backend = fingerprint_backend
+    assert isinstance(backend, WriterBackend)
+
+    for exception in [_fail("first"), _fail("second"), _fail_from_key({}), "Failed"]:
+        backend.write_exception(job_id="job", task_id="task", exception=exception)
+    backend.flush()
+
+    logs: List[ExceptionLog] = backend.exception()[::-1]
+    assert [log.exception for log in logs] == [
+        "ValueError: first",
+        "ValueError: second",
+        "RuntimeError: Invalid data",
+        "Failed",
+    ]
+    first, second, other, failed = logs
+    assert isinstance(first, FingerprintedExceptionLog)
+    assert isinstance(second, FingerprintedExceptionLog)
+    assert isinstance(other, FingerprintedExceptionLog)
+    assert not isinstance(failed, FingerprintedExceptionLog)
+    assert first.traceback is None
+    assert first.exception_class == "ValueError"
+    assert first.fingerprint == second.fingerprint != other.fingerprint
+
+    assert backend.exception_fingerprints() == {
+        first.fingerprint: 2,
+        other.fingerprint: 1,
+    }
+
+    traceback = backend.full_exception(second)
+    assert traceback.startswith("Traceback")
+    assert "ValueError: first" in traceback
+    assert "KeyError: 'missing'" in backend.full_exception(other)
+    assert backend.full_exception(failed) == "Failed"
+    assert backend.traceback("unknown") is None
+
+    state = backend.job_state("job")
+    assert state is not None and state.last_exception == "Failed"
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Any
+
+import pytest
+
+from task_logs.backends.backend import (
+    DequeuedLog,
+    EnqueuedLog,
+    JobDetails,
+    JobStatus,
+    LogType,
+    ReaderBackend,
+    WriterBackend,
+)
+
+from ..utils import fake_factory
+
+
+@pytest.fixture(
+    params=["elastic_job_states", "elastic_jobs", "stub", "memory", "sqlite"]
+)
+def backend(request: Any, backends: Any) -> Any:
+    """Elasticsearch backends only keep job states when enabled."""
+    return backends[request.param]()
+
+
+def test_job_states(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+
+    completed = backend.job_state("2fffe3e4-144d-40e1-9014-34a298c65bfc")
+    assert completed is not None
+    assert completed.status == JobStatus.COMPLETED
+    assert completed.task_id == "simple_task"
+    assert completed.queue == "test_queue"
+    assert completed.task_path == "task_logs.tests.simple_task"
+    assert completed.attempts == 1
+    assert completed.enqueued_at is not None
+    assert completed.dequeued_at is not None
+    assert completed.completed_at is not None
+    assert completed.enqueued_at < completed.dequeued_at < completed.completed_at
+    assert completed.last_exception is None
+
+    retried = backend.job_state("bbed01b8-226c-411e-9d0f-5e4fa4445bf7")
+    assert retried is not None
+    assert retried.status == JobStatus.COMPLETED
+    assert retried.attempts == 3
+    assert retried.last_exception == "ValueError"
+
+    assert backend.job_state("unknown") is None
+
+    assert [s.job_id for s in backend.in_flight_jobs()] == [
+        "e308282a-5f6a-4553-a2c0-8612368ab917"
+    ]
+    assert backend.failed_jobs() == []
+
+
+def test_job_states_out_of_order(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+
+    backend.write(
+        DequeuedLog(
+            type=LogType.DEQUEUED,
+            timestamp=datetime(2000, 1, 1, 0, 0, 10),
+            job_id="job",
+            task_id="task",
+        )
+    )
+    backend.write(
+        EnqueuedLog(
+            type=LogType.ENQUEUED,
+            timestamp=datetime(2000, 1, 1),
+            job_id="job",
+            task_id="task",
+            job=JobDetails(
+                queue="queue",
+                task_path=None,
+                execute_at=None,
+                args=[],
+                kwargs={},
+                options={},
+            ),
+        )
+    )
+
+    state = backend.job_state("job")
+    assert state is not None
+    assert state.status == JobStatus.RUNNING
+    assert state.updated_at == datetime(2000, 1, 1, 0, 0, 10)
+    assert state.enqueued_at == datetime(2000, 1, 1)
+    assert state.queue == "queue"
+    assert state.attempts == 1
+    assert [s.job_id for s in backend.in_flight_jobs()] == ["job"]
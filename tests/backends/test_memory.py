@@ -0,0 +1,60 @@
+from task_logs.backends import MemoryBackend
+from task_logs.backends.backend import LogType
+
+from ..utils import fake_factory
+
+
+def test_memory_backend_capacity() -> None:
+    backend = MemoryBackend(capacity=4)
+    fake_factory(backend)
+
+    assert len(backend) == 4
+    assert [log.type for log in backend.all()] == [
+        LogType.COMPLETED,
+        LogType.DEQUEUED,
+        LogType.EXCEPTION,
+        LogType.DEQUEUED,
+    ]
+    assert backend.enqueued() == []
+    assert backend.find_job("2fffe3e4-144d-40e1-9014-34a298c65bfc") == []
+    assert backend.job_state("2fffe3e4-144d-40e1-9014-34a298c65bfc") is None
+    assert len(backend.find_job("bbed01b8-226c-411e-9d0f-5e4fa4445bf7")) == 4
+    assert [task.id for task in backend.list_task()] == ["other_task"]
+
+
+def test_memory_backend_cursor_ignores_new_logs() -> None:
+    backend = MemoryBackend()
+    fake_factory(backend)
+
+    first = backend.logs_by_type_page(LogType.DEQUEUED, page_size=2)
+    backend.write_dequeued(job_id="new", task_id="task")
+    second = backend.logs_by_type_page(
+        LogType.DEQUEUED, page_size=2, cursor=first.cursor
+    )
+
+    assert first.logs + second.logs == backend.dequeued()[1:]
+    assert second.cursor is None
+
+
+def test_memory_backend_pages_with_evictions() -> None:
+    backend = MemoryBackend(capacity=5)
+    for i in range(8):
+        backend.write_dequeued(job_id="job-%d" % i, task_id="task")
+
+    first = backend.logs_by_type_page(None, page_size=2)
+    for i in range(8, 10):
+        backend.write_dequeued(job_id="job-%d" % i, task_id="task")
+    rest = list(backend.iter_logs_by_type(None, page_size=2, cursor=first.cursor))
+
+    # Logs evicted since the first page are no longer returned.
+    assert [log.job_id for log in first.logs + rest] == ["job-7", "job-6", "job-5"]
+
+
+def test_memory_backend_list_task() -> None:
+    backend = MemoryBackend()
+    fake_factory(backend)
+
+    assert sorted(task.id for task in backend.list_task()) == [
+        "other_task",
+        "simple_task",
+    ]
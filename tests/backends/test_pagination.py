@@ -0,0 +1,83 @@
+from typing import List
+
+import pytest
+
+from task_logs.backends.backend import Log, LogType, ReaderBackend, WriterBackend
+
+from ..utils import fake_factory
+
+
+def _ids(logs: List[Log]) -> List[str]:
+    return [log.job_id for log in logs]
+
+
+def test_logs_by_type_pages(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+    expected = backend.all()
+    assert len(expected) == 11
+
+    pages = []
+    page = backend.logs_by_type_page(None, page_size=4)
+    pages.append(page.logs)
+    while page.cursor is not None:
+        page = backend.logs_by_type_page(None, page_size=4, cursor=page.cursor)
+        pages.append(page.logs)
+
+    assert [len(logs) for logs in pages] == [4, 4, 3]
+    assert sum(pages, []) == expected
+
+
+def test_invalid_page_size(backend: ReaderBackend) -> None:
+    with pytest.raises(ValueError):
+        backend.logs_by_type_page(None, page_size=0)
+    with pytest.raises(ValueError):
+        list(backend.iter_find_job("job", page_size=-1))
+
+
+def test_iter_pages_resume(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+
+    first = backend.logs_by_type_page(LogType.DEQUEUED, page_size=3)
+    assert first.cursor is not None
+    rest = list(
+        backend.iter_logs_by_type(LogType.DEQUEUED, page_size=3, cursor=first.cursor)
+    )
+
+    assert first.logs + rest == backend.dequeued()
+    assert len(rest) == 1
+
+
+def test_iter_find_job(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+
+    job_id = "bbed01b8-226c-411e-9d0f-5e4fa4445bf7"
+    logs = list(backend.iter_find_job(job_id, page_size=2))
+
+    assert _ids(logs) == [job_id] * 7
+    assert logs == backend.find_job(job_id)
+
+
+def test_find_jobs(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+
+    job_ids = [
+        "bbed01b8-226c-411e-9d0f-5e4fa4445bf7",
+        "unknown",
+        "2fffe3e4-144d-40e1-9014-34a298c65bfc",
+        "bbed01b8-226c-411e-9d0f-5e4fa4445bf7",
+    ]
+    jobs = backend.find_jobs(job_ids)
+
+    assert list(jobs) == job_ids[:3]
+    assert jobs == {job_id: backend.find_job(job_id) for job_id in job_ids}
+    assert [len(logs) for logs in jobs.values()] == [7, 0, 3]
+    assert backend.find_jobs([]) == {}
+
+    since = backend.find_job(job_ids[0])[1].timestamp
+    assert backend.find_jobs(job_ids, since=since) == {
+        job_id: backend.find_job(job_id, since=since) for job_id in job_ids
+    }
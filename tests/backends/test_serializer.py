@@ -0,0 +1,163 @@
+import dataclasses
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+
+from task_logs.backends.backend import (
+    CompletedLog,
+    DequeuedLog,
+    EnqueuedLog,
+    ExceptionLog,
+    FingerprintedExceptionLog,
+    JobDetails,
+    Log,
+    LogType,
+)
+from task_logs.backends.elastic import ElasticsearchBackend, JSONSerializerWithError
+from task_logs.backends.serializer import (
+    decode_log,
+    decode_logs,
+    encode_log,
+    parse_datetime,
+)
+
+TIMESTAMP = datetime(2019, 1, 14, 12, 45, 23, 123456)
+
+
+def _error() -> BaseException:
+    try:
+        raise ValueError("Expected")
+    except ValueError as e:
+        return e
+
+
+LOGS = [
+    EnqueuedLog(
+        type=LogType.ENQUEUED,
+        timestamp=TIMESTAMP,
+        job_id="job",
+        task_id="task",
+        job=JobDetails(
+            queue="queue",
+            task_path="tests.task",
+            execute_at=datetime(2019, 1, 1, 1, 1, 1),
+            args=["a", 1, None],
+            kwargs={"b": {"c": [1.5, "é"]}},
+            options={"time_limit": 1000},
+        ),
+    ),
+    DequeuedLog(
+        type=LogType.DEQUEUED, timestamp=TIMESTAMP, job_id="job", task_id="task"
+    ),
+    CompletedLog(
+        type=LogType.COMPLETED,
+        timestamp=TIMESTAMP,
+        job_id="job",
+        task_id="task",
+        result={"done": True},
+    ),
+    ExceptionLog(
+        type=LogType.EXCEPTION,
+        timestamp=TIMESTAMP,
+        job_id="job",
+        task_id="task",
+        exception="ValueError: Expected",
+        exception_class=None,
+    ),
+    ExceptionLog(
+        type=LogType.EXCEPTION,
+        timestamp=TIMESTAMP,
+        job_id="job",
+        task_id="task",
+        exception="Traceback...\nValueError: Expected\nOn two lines",
+        exception_class="ValueError",
+    ),
+]
+
+
+@pytest.mark.parametrize("log", LOGS, ids=lambda log: str(log.type.value))
+def test_encode_log_matches_asdict(log: Log) -> None:
+    expected: Any = json.loads(JSONSerializerWithError().dumps(dataclasses.asdict(log)))
+
+    assert json.loads(encode_log(log)) == expected
+
+
+def test_encode_log_formats_traceback() -> None:
+    log = ExceptionLog(
+        type=LogType.EXCEPTION,
+        timestamp=TIMESTAMP,
+        job_id="job",
+        task_id="task",
+        exception=_error(),
+        exception_class="ValueError",
+    )
+
+    exception = json.loads(encode_log(log))["exception"]
+    assert exception.startswith("Traceback")
+    assert "in _error" in exception
+    assert "ValueError: Expected" in exception
+
+
+def test_encode_log_keeps_traceback_on_request() -> None:
+    log = FingerprintedExceptionLog(
+        type=LogType.EXCEPTION,
+        timestamp=TIMESTAMP,
+        job_id="job",
+        task_id="task",
+        exception="ValueError: Expected",
+        fingerprint="abc",
+        exception_class="ValueError",
+        traceback="Traceback...",
+    )
+
+    assert "traceback" not in json.loads(encode_log(log))
+    assert decode_log(json.loads(encode_log(log))) == dataclasses.replace(
+        log, traceback=None
+    )
+    assert decode_log(json.loads(encode_log(log, with_traceback=True))) == log
+
+
+def test_encode_log_big_integers() -> None:
+    log = CompletedLog(
+        type=LogType.COMPLETED,
+        timestamp=TIMESTAMP,
+        job_id="job",
+        task_id="task",
+        result={"big": 2**70, 1: -(2**64)},
+    )
+
+    assert json.loads(encode_log(log))["result"] == {"big": 2**70, "1": -(2**64)}
+
+
+def test_decode_logs() -> None:
+    aware = dataclasses.replace(
+        LOGS[1], timestamp=TIMESTAMP.replace(tzinfo=timezone(timedelta(hours=-5)))
+    )
+    logs = LOGS + [aware]
+    documents = [json.loads(encode_log(log)) for log in logs]
+
+    assert decode_logs(documents) == logs
+    assert [decode_log(document) for document in documents] == logs
+    assert decode_logs(documents)[-1].timestamp.utcoffset() == timedelta(hours=-5)
+
+
+def test_decode_elastic_response() -> None:
+    response = {
+        "hits": {"hits": [{"_source": json.loads(encode_log(log))} for log in LOGS]}
+    }
+
+    logs = ElasticsearchBackend._load_response(response)
+
+    assert logs == LOGS
+    assert logs[0].timestamp.microsecond == 123456
+
+
+def test_parse_datetime() -> None:
+    assert parse_datetime("2019-01-14T12:45:23.123456Z") == TIMESTAMP.replace(
+        tzinfo=timezone.utc
+    )
+    assert parse_datetime("2019-01-14T12:45:23") == TIMESTAMP.replace(microsecond=0)
+    with pytest.raises(ValueError):
+        parse_datetime("yesterday")
@@ -0,0 +1,86 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from task_logs.backends import LogShipper, MemoryBackend, ShippingBackend, StubBackend
+
+from ..utils import fake_factory
+
+
+def test_shipping_backend(tmp_path: Path) -> None:
+    path = str(tmp_path / "shipper.sock")
+    reference = StubBackend()
+    target = MemoryBackend()
+    shipper = LogShipper(path, target, batch_size=3)
+
+    clients = [ShippingBackend(path), ShippingBackend(path)]
+    fake_factory(clients[0])
+    fake_factory(reference)
+    clients[1].write_dequeued(job_id="other", task_id="task")
+    for client in clients:
+        client.close()
+    shipper.close()
+
+    assert len(target) == 12
+    job_id = "bbed01b8-226c-411e-9d0f-5e4fa4445bf7"
+    assert [log.type for log in target.find_job(job_id)] == [
+        log.type for log in reference.find_job(job_id)
+    ]
+    assert not Path(path).exists()
+
+
+def test_shipping_backend_waits_for_shipper(tmp_path: Path) -> None:
+    path = str(tmp_path / "shipper.sock")
+    target = MemoryBackend()
+    client = ShippingBackend(path, timeout=5)
+
+    shippers = []
+    timer = threading.Timer(0.2, lambda: shippers.append(LogShipper(path, target)))
+    timer.start()
+    client.write_dequeued(job_id="job", task_id="task")
+    client.close()
+    timer.join()
+    shippers[0].close()
+
+    assert [log.job_id for log in target.all()] == ["job"]
+
+
+def test_shipping_backend_reconnects(tmp_path: Path) -> None:
+    path = str(tmp_path / "shipper.sock")
+    first, second = MemoryBackend(), MemoryBackend()
+    client = ShippingBackend(path)
+
+    shipper = LogShipper(path, first, timeout=0.5)
+    client.write_dequeued(job_id="first", task_id="task")
+    shipper.close()
+
+    shipper = LogShipper(path, second)
+    client.write_dequeued(job_id="second", task_id="task")
+    client.close()
+    shipper.close()
+
+    assert [log.job_id for log in first.all()] == ["first"]
+    assert [log.job_id for log in second.all()] == ["second"]
+
+
+def test_shipping_backend_retry_interval(tmp_path: Path) -> None:
+    path = str(tmp_path / "shipper.sock")
+    target = MemoryBackend()
+    client = ShippingBackend(path, timeout=0.2, retry_interval=0.5)
+
+    with pytest.raises(FileNotFoundError):
+        client.write_dequeued(job_id="first", task_id="task")
+    shipper = LogShipper(path, target)
+    start = time.monotonic()
+    with pytest.raises(ConnectionError):
+        client.write_dequeued(job_id="second", task_id="task")
+    assert time.monotonic() - start < 0.1
+
+    time.sleep(0.5)
+    client.write_dequeued(job_id="third", task_id="task")
+    client.close()
+    shipper.close()
+
+    assert [log.job_id for log in target.all()] == ["third"]
@@ -0,0 +1,94 @@
+import os
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Tuple
+
+from task_logs.backends import SpoolingBackend, StubBackend
+from task_logs.backends.backend import Log
+
+from ..utils import fake_factory
+
+
+class FlakyBackend(StubBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.failing = False
+
+    def write_many(self, logs: Iterable[Log]) -> None:
+        if self.failing:
+            raise ConnectionError("Backend is down.")
+        super().write_many(logs)
+
+
+def _summary(logs: List[Log]) -> List[Tuple[str, str]]:
+    return [(log.type, log.job_id) for log in logs]
+
+
+def _wait_for(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out."
+        time.sleep(0.01)
+
+
+def test_spool_replays_after_recovery(tmp_path: Path) -> None:
+    flaky = FlakyBackend()
+    backend = SpoolingBackend(
+        flaky, str(tmp_path), segment_max_bytes=1024, batch_size=2, backoff_max=0.05
+    )
+    backend.backoff_initial = 0.01
+
+    flaky.failing = True
+    fake_factory(backend)
+    _wait_for(lambda: backend.metrics()["replay_failures"] > 0)
+
+    metrics = backend.metrics()
+    assert metrics["spooled_logs"] == 11
+    assert metrics["spool_segments"] > 1
+    assert metrics["replay_lag_seconds"] > 0
+    assert flaky.all() == []
+
+    flaky.failing = False
+    _wait_for(lambda: backend.metrics()["spool_segments"] == 0)
+
+    reference = StubBackend()
+    fake_factory(reference)
+    assert _summary(flaky.all()) == _summary(reference.all())
+    assert os.listdir(tmp_path) == []
+
+    # Once drained, logs are written directly.
+    backend.write_dequeued(job_id="job", task_id="task")
+    assert len(flaky.all()) == 12
+    backend.close()
+
+
+def test_spool_survives_restart(tmp_path: Path) -> None:
+    flaky = FlakyBackend()
+    flaky.failing = True
+    backend = SpoolingBackend(flaky, str(tmp_path), backoff_initial=60)
+    fake_factory(backend)
+    backend.close()
+    assert os.listdir(tmp_path) != []
+
+    flaky = FlakyBackend()
+    backend = SpoolingBackend(flaky, str(tmp_path))
+    _wait_for(lambda: len(flaky.all()) == 11)
+    backend.close()
+
+
+def test_spool_max_bytes(tmp_path: Path) -> None:
+    flaky = FlakyBackend()
+    flaky.failing = True
+    backend = SpoolingBackend(
+        flaky,
+        str(tmp_path),
+        segment_max_bytes=512,
+        max_bytes=1024,
+        backoff_initial=60,
+    )
+    fake_factory(backend)
+
+    metrics = backend.metrics()
+    assert metrics["dropped_logs"] > 0
+    assert metrics["spooled_logs"] + metrics["dropped_logs"] == 11
+    backend.close()
@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+
+from task_logs.backends import SQLiteBackend, sqlite
+from task_logs.backends.backend import JobStatus, LogType
+
+from ..utils import fake_factory
+
+
+def test_sqlite_backend_persists(tmp_path: Path) -> None:
+    path = str(tmp_path / "task_logs.db")
+    backend = SQLiteBackend(path)
+    fake_factory(backend)
+    logs = backend.all()
+    backend.close()
+
+    backend = SQLiteBackend(path)
+    assert backend.all() == logs
+    state = backend.job_state("2fffe3e4-144d-40e1-9014-34a298c65bfc")
+    assert state is not None and state.status == JobStatus.COMPLETED
+    backend.close()
+
+
+def test_sqlite_backend_wal(tmp_path: Path) -> None:
+    backend = SQLiteBackend(str(tmp_path / "task_logs.db"))
+    mode = backend._reader.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+    backend.close()
+
+
+def test_sqlite_backend_uses_indexes(tmp_path: Path) -> None:
+    backend = SQLiteBackend(str(tmp_path / "task_logs.db"))
+    for column, index in (
+        ("job_id", "logs_job_id"),
+        ("task_id", "logs_task_id"),
+        ("type", "logs_type"),
+    ):
+        plan = backend._reader.execute(
+            "EXPLAIN QUERY PLAN SELECT data FROM logs WHERE {} = ? "
+            "ORDER BY timestamp DESC, id DESC".format(column),
+            ("value",),
+        ).fetchall()
+        details = " ".join(row[-1] for row in plan)
+        assert index in details
+        assert "TEMP B-TREE" not in details
+    backend.close()
+
+
+def test_sqlite_backend_search_syntax(tmp_path: Path) -> None:
+    backend = SQLiteBackend(str(tmp_path / "task_logs.db"))
+    fake_factory(backend)
+
+    # FTS5 operators and quotes are matched literally.
+    assert backend.search('"done" OR') == []
+    assert [log.type for log in backend.search("done!")] == [LogType.COMPLETED] * 2
+    backend.close()
+
+
+def test_sqlite_backend_cursor_ignores_new_logs(tmp_path: Path) -> None:
+    backend = SQLiteBackend(str(tmp_path / "task_logs.db"))
+    fake_factory(backend)
+
+    first = backend.logs_by_type_page(LogType.DEQUEUED, page_size=2)
+    backend.write_dequeued(job_id="new", task_id="task")
+    second = backend.logs_by_type_page(
+        LogType.DEQUEUED, page_size=2, cursor=first.cursor
+    )
+
+    assert first.logs + second.logs == backend.dequeued()[1:]
+    assert second.cursor is None
+    backend.close()
+
+
+def test_sqlite_backend_find_jobs_batches(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(sqlite, "FIND_JOBS_BATCH_SIZE", 2)
+    backend = SQLiteBackend(str(tmp_path / "task_logs.db"))
+    fake_factory(backend)
+
+    job_ids = [log.job_id for log in backend.enqueued()]
+    jobs = backend.find_jobs(job_ids)
+
+    assert jobs == {job_id: backend.find_job(job_id) for job_id in job_ids}
+    assert [len(logs) for logs in jobs.values()] == [1, 7, 3]
+    backend.close()
+
+
+def test_sqlite_backend_failures(tmp_path: Path) -> None:
+    backend = SQLiteBackend(str(tmp_path / "task_logs.db"))
+    backend._reader.execute("DROP TABLE job_states")
+    fake_factory(backend)
+    backend.flush()
+
+    # Every batch failed and was rolled back.
+    assert backend.failed == 11
+    assert backend.all() == []
+    backend.close()
+
+    backend.write_dequeued(job_id="late", task_id="task")
+    assert backend.dropped == 1
+    with pytest.raises(RuntimeError):
+        backend.all()
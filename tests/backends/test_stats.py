@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from task_logs.backends.backend import (
+    DequeuedLog,
+    LogCount,
+    LogType,
+    ReaderBackend,
+    WriterBackend,
+    bucket_start,
+    compute_percentiles,
+)
+from task_logs.backends.elastic import ElasticsearchBackend
+
+from ..utils import fake_factory
+
+
+def test_log_counts(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+
+    start = datetime(2000, 1, 1)
+    assert backend.log_counts() == [
+        LogCount(start=start, key="other_task", type=LogType.COMPLETED, count=1),
+        LogCount(start=start, key="other_task", type=LogType.DEQUEUED, count=3),
+        LogCount(start=start, key="other_task", type=LogType.ENQUEUED, count=1),
+        LogCount(start=start, key="other_task", type=LogType.EXCEPTION, count=2),
+        LogCount(start=start, key="simple_task", type=LogType.COMPLETED, count=1),
+        LogCount(start=start, key="simple_task", type=LogType.DEQUEUED, count=1),
+        LogCount(start=start, key="simple_task", type=LogType.ENQUEUED, count=2),
+    ]
+
+    counts = backend.log_counts(interval=timedelta(minutes=1))
+    assert {c.start for c in counts} == {start, start + timedelta(minutes=1)}
+    assert sum(c.count for c in counts) == 11
+
+    assert backend.log_counts(since=start + timedelta(days=1)) == []
+
+    assert backend.log_counts(group_by="queue") == [
+        LogCount(start=start, key="test_queue", type=LogType.COMPLETED, count=2),
+        LogCount(start=start, key="test_queue", type=LogType.DEQUEUED, count=4),
+        LogCount(start=start, key="test_queue", type=LogType.ENQUEUED, count=3),
+        LogCount(start=start, key="test_queue", type=LogType.EXCEPTION, count=2),
+    ]
+
+    with pytest.raises(ValueError):
+        backend.log_counts(group_by="job_id")
+
+
+def test_log_counts_aware_timestamps(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    for job_id, timestamp in [
+        ("job-0", datetime(2000, 1, 1, 1, 30, tzinfo=timezone(timedelta(hours=2)))),
+        ("job-1", datetime(1999, 12, 31, 23, 45, tzinfo=timezone.utc)),
+    ]:
+        backend.write(
+            DequeuedLog(
+                type=LogType.DEQUEUED,
+                job_id=job_id,
+                task_id="task",
+                timestamp=timestamp,
+            )
+        )
+
+    assert backend.log_counts() == [
+        LogCount(
+            start=datetime(1999, 12, 31, 23),
+            key="task",
+            type=LogType.DEQUEUED,
+            count=2,
+        )
+    ]
+
+
+def test_bucket_start() -> None:
+    interval = timedelta(hours=1)
+    assert bucket_start(datetime(2000, 1, 1, 1, 30), interval) == datetime(
+        2000, 1, 1, 1
+    )
+    aware = datetime(2000, 1, 1, 1, 30, tzinfo=timezone(timedelta(hours=2)))
+    assert bucket_start(aware, interval) == datetime(
+        1999, 12, 31, 23, tzinfo=timezone.utc
+    )
+
+
+def test_queue_latency(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+
+    if isinstance(backend, ElasticsearchBackend) and not (
+        backend.job_states or backend.job_documents
+    ):
+        with pytest.raises(NotImplementedError):
+            backend.queue_latency()
+        return
+
+    assert backend.queue_latency(percentiles=[50]) == {
+        "simple_task": {50.0: pytest.approx(10.0)},
+        "other_task": {50.0: pytest.approx(60.0)},
+    }
+    assert backend.queue_latency(group_by="queue", percentiles=[50]) == {
+        "test_queue": {50.0: pytest.approx(35.0)}
+    }
+    assert backend.queue_latency(until=datetime(2000, 1, 1)) == {}
+
+    stats = backend.stats()
+    assert len(stats.counts) == 7
+    assert set(stats.latency) == {"simple_task", "other_task"}
+
+    with pytest.raises(ValueError):
+        backend.queue_latency(group_by="job_id")
+
+
+def test_compute_percentiles() -> None:
+    assert compute_percentiles([3.0, 1.0, 2.0, 4.0], [0, 50, 100]) == {
+        0.0: 1.0,
+        50.0: 2.5,
+        100.0: 4.0,
+    }
+    assert compute_percentiles([5.0], [99]) == {99.0: 5.0}
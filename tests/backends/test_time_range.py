@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from task_logs.backends.backend import LogType, ReaderBackend, WriterBackend
+
+from ..utils import fake_factory
+
+
+def test_time_range(backend: ReaderBackend) -> None:
+    assert isinstance(backend, WriterBackend)
+    fake_factory(backend)
+
+    job_id = "bbed01b8-226c-411e-9d0f-5e4fa4445bf7"
+    since = datetime(2000, 1, 1)
+    until = datetime(2000, 1, 2)
+
+    assert len(backend.logs_by_type(None, since=since, until=until)) == 11
+    assert len(backend.logs_by_type(LogType.ENQUEUED, since=since)) == 3
+    assert backend.logs_by_type(None, since=until) == []
+    assert backend.logs_by_type(None, until=since) == []
+
+    assert len(backend.find_job(job_id, since=since, until=until)) == 7
+    assert backend.find_job(job_id, since=until) == []
+    assert backend.find_job(job_id, until=since) == []
+
+    assert len(backend.search(job_id, since=since, until=until)) == 7
+    assert backend.search(job_id, since=until) == []
@@ -1,8 +1,17 @@
-from typing import Any, List
+import functools
+from pathlib import Path
+from typing import Any, Generator, List
 
 import pytest
 
-from task_logs.backends import ElasticsearchBackend, StubBackend
+from task_logs.backends import (
+    AioElasticsearchBackend,
+    ElasticsearchBackend,
+    MemoryBackend,
+    SQLiteBackend,
+    StubBackend,
+)
+from task_logs.backends.elastic import JOB_STATES_INDEX, TRACEBACKS_INDEX
 
 from .config import CI, ELASTICSEARCH_URL
 
@@ -19,6 +28,8 @@ def check_elastic(connections: List[str]) -> None:
         raise pytest.skip("No connection to Elasticsearch server.")
     else:
         es.indices.delete("task-logs-*")
+        es.indices.delete(JOB_STATES_INDEX, ignore_unavailable=True)
+        es.indices.delete(TRACEBACKS_INDEX, ignore_unavailable=True)
 
 
 @pytest.fixture
@@ -26,24 +37,65 @@ def elastic_backend() -> ElasticsearchBackend:
     return _elastic_backend()
 
 
-def _elastic_backend() -> ElasticsearchBackend:
+@pytest.fixture
+def elastic_bulk_backend() -> Generator[ElasticsearchBackend, None, None]:
+    backend = _elastic_backend(bulk=True, bulk_max_docs=4, bulk_max_age=None)
+    yield backend
+    backend.close()
+
+
+def _elastic_backend(**options: Any) -> ElasticsearchBackend:
+    connections = [ELASTICSEARCH_URL]
+    check_elastic(connections)
+    return ElasticsearchBackend(connections, force_refresh=True, **options)
+
+
+def aio_elastic_backend() -> AioElasticsearchBackend:
+    """Must be called, and closed, from the event loop running the test."""
     connections = [ELASTICSEARCH_URL]
     check_elastic(connections)
-    return ElasticsearchBackend(connections, force_refresh=True)
+    return AioElasticsearchBackend(connections, force_refresh=True, job_states=True)
 
 
 def stub_backend() -> StubBackend:
     return StubBackend()
 
 
+def memory_backend() -> MemoryBackend:
+    return MemoryBackend()
+
+
+def sqlite_backend(path: Path) -> SQLiteBackend:
+    return SQLiteBackend(str(path / "task_logs.db"))
+
+
 @pytest.fixture
-def backends() -> Any:
+def backends(tmp_path: Path) -> Any:
     return {
         "elastic": _elastic_backend,
+        "elastic_job_states": functools.partial(_elastic_backend, job_states=True),
+        "elastic_jobs": functools.partial(_elastic_backend, job_documents=True),
         "stub": stub_backend,
+        "memory": memory_backend,
+        "sqlite": functools.partial(sqlite_backend, tmp_path),
     }
 
 
-@pytest.fixture(params=["elastic", "stub"])
+@pytest.fixture(
+    params=["elastic", "elastic_job_states", "elastic_jobs", "stub", "memory", "sqlite"]
+)
 def backend(request: Any, backends: Any) -> Any:
     return backends[request.param]()
+
+
+@pytest.fixture(params=["elastic", "elastic_bulk", "memory", "sqlite"])
+def fingerprint_backend(request: Any, tmp_path: Path) -> Any:
+    if request.param == "elastic":
+        return _elastic_backend(fingerprint_exceptions=True, job_states=True)
+    if request.param == "elastic_bulk":
+        return _elastic_backend(
+            fingerprint_exceptions=True, job_states=True, bulk=True, bulk_max_age=None
+        )
+    if request.param == "memory":
+        return MemoryBackend(fingerprint_exceptions=True)
+    return SQLiteBackend(str(tmp_path / "task_logs.db"), fingerprint_exceptions=True)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from pathlib import Path
 from typing import Any, Generator, Optional
 
 import dramatiq
@@ -7,6 +8,7 @@ from dramatiq import Broker, Message, Middleware, Worker
 from dramatiq.brokers.stub import StubBroker
 from freezegun import freeze_time
 
+from task_logs.backends import AsyncWriterBackend, ShippingBackend, StubBackend
 from task_logs.backends.backend import (
     CompletedLog,
     DequeuedLog,
@@ -16,7 +18,9 @@ from task_logs.backends.backend import (
     LogType,
     WriterBackend,
 )
-from task_logs.dramatiq import TaskLogsMiddleware
+from task_logs.dramatiq import LogShipperMiddleware, TaskLogsMiddleware
+from task_logs.sampling import LogPolicy
+from task_logs.truncation import TRUNCATED_MARKER
 
 
 @pytest.fixture()
@@ -162,6 +166,7 @@ def test_dramatiq_failed(
             timestamp=datetime.now(),
             type=LogType.EXCEPTION,
             exception="",
+            exception_class=None,
         )
     ]
 
@@ -219,6 +224,7 @@ def test_dramatiq_error(
             timestamp=datetime.now(),
             type=LogType.EXCEPTION,
             exception="",
+            exception_class="ValueError",
         )
     ]
 
@@ -258,3 +264,161 @@ def test_disabled_log(
     expected = 1 if log_expected else 0
     assert len(backend.dequeued()) == expected
     assert len(backend.completed()) == expected
+
+
+def test_sampled_log(broker: Broker, worker: Worker, backend: WriterBackend) -> None:
+    @dramatiq.actor(queue_name="test", log=0.0)
+    def sampled_task(fail: bool) -> None:
+        if fail:
+            raise ValueError("Expected")
+
+    sampled_task.send(False)
+    failed = sampled_task.send(True)
+    logged = sampled_task.send_with_options(args=(False,), log=1.0)
+    sampled_task.send_with_options(args=(True,), log=False)
+
+    worker.start()
+    broker.join(sampled_task.queue_name)
+    worker.join()
+
+    # Failures are logged even when the job wasn't sampled.
+    assert [log.job_id for log in backend.enqueued()] == [logged.message_id]
+    assert [log.job_id for log in backend.completed()] == [logged.message_id]
+    assert [log.job_id for log in backend.exception()] == [failed.message_id]
+    assert backend.enqueued()[0].job.options == {"log": 1.0, "log_sampled": True}
+
+
+def test_rate_limited_log(
+    broker: Broker, worker: Worker, backend: WriterBackend
+) -> None:
+    @dramatiq.actor(queue_name="test", log=LogPolicy(rate_limit=0.001, burst=2))
+    def rate_limited_task() -> None:
+        pass
+
+    messages = [rate_limited_task.send() for _ in range(5)]
+    other = rate_limited_task.send_with_options(log={"rate_limit": 0.001})
+
+    worker.start()
+    broker.join(rate_limited_task.queue_name)
+    worker.join()
+
+    logged = {log.job_id for log in backend.completed()}
+    assert logged == {messages[0].message_id, messages[1].message_id, other.message_id}
+
+
+def test_truncated_payloads(
+    broker: Broker, worker: Worker, backend: WriterBackend
+) -> None:
+    @dramatiq.actor(queue_name="test", log_limits={"args": 20, "kwargs": 20})
+    def large_payload_task(a: str, b: str) -> str:
+        return "x" * 50
+
+    message = large_payload_task.send("a" * 50, b="small")
+    worker.start()
+    broker.join(large_payload_task.queue_name)
+    worker.join()
+
+    [enqueued] = backend.enqueued()
+    assert enqueued.job_id == message.message_id
+    [args] = enqueued.job.args
+    assert args[TRUNCATED_MARKER] is True
+    assert args["size"] == 54
+    assert args["preview"] == '["' + "a" * 18
+    assert enqueued.job.kwargs == {"b": "small"}
+    assert backend.completed()[0].result == "x" * 50
+
+
+def test_redeclared_actor(broker: Broker, backend: WriterBackend) -> None:
+    @dramatiq.actor(queue_name="test", log=False)
+    def redeclared() -> None:
+        pass
+
+    redeclared.send()
+    redeclared.options["log"] = True
+    broker.declare_actor(redeclared)
+    message = redeclared.send()
+
+    assert [log.job_id for log in backend.enqueued()] == [message.message_id]
+
+
+def test_actor_declared_before_middleware(backend: WriterBackend) -> None:
+    broker = StubBroker(middleware=[])
+    dramatiq.set_broker(broker)
+
+    @dramatiq.actor(queue_name="test")
+    def declared_first() -> None:
+        pass
+
+    middleware = TaskLogsMiddleware(backend=backend)
+    broker.add_middleware(middleware)
+    assert "declared_first" in middleware._actors
+
+    declared_first.send()
+    assert [log.job.task_path for log in backend.enqueued()] == [
+        "tests.test_dramatiq.test_actor_declared_before_middleware.<locals>"
+        ".declared_first"
+    ]
+
+
+def test_dramatiq_async_writer_drained_on_shutdown() -> None:
+    stub_backend = StubBackend()
+    broker = StubBroker(
+        middleware=[TaskLogsMiddleware(backend=AsyncWriterBackend(stub_backend))]
+    )
+    broker.emit_after("process_boot")
+    dramatiq.set_broker(broker)
+
+    @dramatiq.actor(queue_name="test")
+    def simple_task_async() -> None:
+        pass
+
+    message = simple_task_async.send()
+
+    worker = Worker(broker, worker_timeout=100)
+    worker.start()
+    broker.join(simple_task_async.queue_name)
+    worker.join()
+    worker.stop()
+
+    assert [log.type for log in stub_backend.find_job(message.message_id)] == [
+        LogType.COMPLETED,
+        LogType.DEQUEUED,
+        LogType.ENQUEUED,
+    ]
+
+
+def test_dramatiq_log_shipper(tmp_path: Path) -> None:
+    path = str(tmp_path / "shipper.sock")
+    stub_backend = StubBackend()
+    # Two worker processes of a host, only the first one runs the shipper.
+    shippers = [
+        LogShipperMiddleware(path, lambda: stub_backend),
+        LogShipperMiddleware(path, StubBackend),
+    ]
+    broker = StubBroker(
+        middleware=[shippers[0], TaskLogsMiddleware(backend=ShippingBackend(path))]
+    )
+    broker.emit_after("process_boot")
+    shippers[1].after_process_boot(broker)
+    assert shippers[0].shipper is not None
+    assert shippers[1].shipper is None
+    dramatiq.set_broker(broker)
+
+    @dramatiq.actor(queue_name="test")
+    def shipped_task() -> None:
+        pass
+
+    message = shipped_task.send()
+
+    worker = Worker(broker, worker_timeout=100)
+    worker.start()
+    broker.join(shipped_task.queue_name)
+    worker.join()
+    worker.stop()
+    assert shippers[0].shipper is None
+
+    assert [log.type for log in stub_backend.find_job(message.message_id)] == [
+        LogType.COMPLETED,
+        LogType.DEQUEUED,
+        LogType.ENQUEUED,
+    ]
@@ -0,0 +1,28 @@
+import pytest
+from freezegun import freeze_time
+
+from task_logs.sampling import LogPolicy, TokenBucket
+
+
+def test_log_policy_from_option() -> None:
+    assert LogPolicy.from_option(0.5) == LogPolicy(sample_rate=0.5)
+    assert LogPolicy.from_option({"rate_limit": 10}) == LogPolicy(rate_limit=10)
+    policy = LogPolicy(burst=3, rate_limit=1)
+    assert LogPolicy.from_option(policy) is policy
+
+    with pytest.raises(TypeError):
+        LogPolicy.from_option("all")
+    with pytest.raises(ValueError):
+        LogPolicy.from_option(2)
+
+
+def test_token_bucket() -> None:
+    with freeze_time("2000-01-01") as frozen_time:
+        bucket = TokenBucket(rate=2, capacity=2)
+        assert [bucket.take() for _ in range(3)] == [True, True, False]
+
+        frozen_time.tick(0.5)
+        assert [bucket.take() for _ in range(2)] == [True, False]
+
+        frozen_time.tick(10)
+        assert [bucket.take() for _ in range(3)] == [True, True, False]
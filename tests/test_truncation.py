@@ -0,0 +1,47 @@
+import hashlib
+
+import pytest
+
+from task_logs.backends.serializer import dumps
+from task_logs.truncation import (
+    TRUNCATED_MARKER,
+    PayloadLimits,
+    estimate_size,
+    truncate,
+)
+
+
+def test_estimate_size() -> None:
+    value = {"a": [1, "bcd", None], "e": {"f": 1.5}}
+    assert estimate_size(value) >= len(dumps(value))
+    assert estimate_size(["x" * 1000] * 1000, limit=2000) < 10000
+    assert estimate_size([10**100]) >= len(dumps([10**100]))
+
+
+def test_truncate() -> None:
+    value = {"items": list(range(1000))}
+    assert truncate(value, None) is value
+    assert truncate(value, 100000) is value
+
+    data = dumps(value)
+    assert truncate(value, 100) == {
+        TRUNCATED_MARKER: True,
+        "size": len(data),
+        "sha1": hashlib.sha1(data).hexdigest(),
+        "preview": data[:100].decode(),
+    }
+
+
+def test_truncate_unserializable() -> None:
+    value = [object()] * 10
+    data = dumps(repr(value))
+    truncated = truncate(value, 100)
+    assert truncated["size"] == len(data)
+    assert truncated["preview"] == data[:100].decode()
+
+
+def test_payload_limits_from_option() -> None:
+    assert PayloadLimits.from_option(10) == PayloadLimits(10, 10, 10, 10)
+    assert PayloadLimits.from_option({"result": 10}) == PayloadLimits(result=10)
+    with pytest.raises(TypeError):
+        PayloadLimits.from_option("10")